@@ -11,23 +11,7 @@ src_path = os.path.join(current_dir, 'src')
 sys.path.append(src_path)
 
 try:
-    from parameters.pre_synaptic_params import PRE_SYNAPTIC_PARAMS
-    from parameters.ca_params import CA_PARAMS
-    from parameters.glutamate_params import GLUTAMATE_PARAMS
-    from parameters.astrocyte_params import ASTROCYTE_PARAMS
-    from parameters.gliatransmitter_params import GLIATRANSMITTER_PARAMS
-    from parameters.post_synaptic_params import POST_SYNAPTIC_PARAMS
-    from parameters.post_synaptic_ca_params import POST_SYNAPTIC_CA_PARAMS
-    from parameters.camkii_params import CAMKII_PARAMS
-
-    from models.hh import PresynapticHH
-    from models.calcium_model import PresynapticCalciumDynamics
-    from models.presynaptic_glutamate import GlutamateDynamics
-    from models.astrocyte import AstrocyteDynamics
-    from models.gliatransmitter import GliatransmitterDynamics
-    from models.post_synaptic import PostSynapticDynamics
-    from models.post_synaptic_ca import PostSynapticCalciumDynamics
-    from models.camkii import CaMKIIDynamics
+    from simulation.sweep import run_pool
 except ImportError as e:
     print(f"Hata: {e}")
     sys.exit(1)
@@ -35,10 +19,14 @@ except ImportError as e:
 # =========================================================================
 # ⚙️ SENARYO AYARLARI (METİNLE UYUMLU)
 # =========================================================================
-CAMKII_PARAMS['P_half'] = 55e-6   # EŞİK
-CAMKII_PARAMS['K1'] = 0.012       # Üretim Hızı
-CAMKII_PARAMS['K2'] = 50.0        # Yıkım Hızı
-CAMKII_PARAMS['k_h'] = 150.0e-6 
+PARAM_OVERRIDES = {
+    "camkii": {
+        "P_half": 55e-6,   # EŞİK
+        "K1": 0.012,       # Üretim Hızı
+        "K2": 50.0,        # Yıkım Hızı
+        "k_h": 150.0e-6,
+    }
+}
 
 SCENARIOS = [
     {"label": "50Hz",  "current": 6.0},
@@ -47,6 +35,7 @@ SCENARIOS = [
 ]
 
 SAVE_FOLDER = "Tez_Full_Bilesenler"
+RUN_FOLDER = os.path.join(SAVE_FOLDER, "kosular")
 
 def plot_save(time, data, title, ylabel, color, folder, filename, threshold=None):
     plt.figure(figsize=(8, 4))
@@ -62,89 +51,44 @@ def plot_save(time, data, title, ylabel, color, folder, filename, threshold=None
     plt.savefig(f"{folder}/{filename}", dpi=300)
     plt.close()
 
-def run_simulation(scn):
+def run_simulations(scenarios):
+    # Senaryolar 0-10 s arasında aynı: ortak ön koşu bir kez, her akım oradan ayrılır.
+    # Koşular süreç havuzunda paralel; biten koşular RUN_FOLDER'dan okunur, yarıda
+    # kalanlar son checkpoint'ten sürer.
+    print(f"\n>>> KOŞTURULUYOR: {', '.join(s['label'] for s in scenarios)} (ortak ön koşu)...")
+    return run_pool(
+        scenarios,
+        RUN_FOLDER,
+        params=PARAM_OVERRIDES,
+        checkpoint_every=1000.0,
+        verbose=True,
+        T_total=30000.0,
+        dt=0.05,
+        stim_window=(10000.0, 20000.0),
+        record=("V_pre", "Ca_fast", "IP3_astro", "Glu_extra",
+                "V_post", "Ca_post", "CaMKII_P", "alpha"),
+        rec_step=20,
+    )
+
+def plot_scenario(scn, result):
     label = scn["label"]
     curr = scn["current"]
-    print(f"\n>>> KOŞTURULUYOR: {label} (Akım: {curr} uA)...")
+    print(f"\n>>> ÇİZİLİYOR: {label} (Akım: {curr} uA)...")
     
     # Klasör
     freq_folder = os.path.join(SAVE_FOLDER, label)
     if not os.path.exists(freq_folder): os.makedirs(freq_folder)
 
-    # Zaman
-    T_total = 30000.0
-    dt = 0.05
-    steps = int(T_total / dt)
-    time_array = np.linspace(0, T_total, steps)
-    
-    # Modeller
-    hh_model = PresynapticHH(PRE_SYNAPTIC_PARAMS)
-    ca_pre_model = PresynapticCalciumDynamics(CA_PARAMS)
-    glu_pre_model = GlutamateDynamics(GLUTAMATE_PARAMS)
-    astro_model = AstrocyteDynamics(ASTROCYTE_PARAMS)
-    glia_trans_model = GliatransmitterDynamics(GLIATRANSMITTER_PARAMS)
-    post_neuron_model = PostSynapticDynamics(POST_SYNAPTIC_PARAMS)
-    post_ca_model = PostSynapticCalciumDynamics(POST_SYNAPTIC_CA_PARAMS)
-    camkii_model = CaMKIIDynamics(CAMKII_PARAMS)
-
     # Kayıt Dizileri
-    rec_step = 20
-    rec_size = steps // rec_step
-    rec_time = time_array[::rec_step] / 1000.0
-    
-    rec_V_pre = np.zeros(rec_size, dtype=np.float32)
-    rec_Ca_Pre = np.zeros(rec_size, dtype=np.float32)
-    rec_IP3 = np.zeros(rec_size, dtype=np.float32)
-    rec_Glu_Ast = np.zeros(rec_size, dtype=np.float32)
-    
-    # YENİ EKLENEN: Post Voltaj
-    rec_V_post = np.zeros(rec_size, dtype=np.float32)
-    
-    rec_Ca_Post = np.zeros(rec_size, dtype=np.float32)
-    rec_CaMKII_P = np.zeros(rec_size, dtype=np.float32)
-    rec_Alpha = np.zeros(rec_size, dtype=np.float32)
-
-    current_glu_syn = 0.0
-    current_glu_extra = 0.0
-    base_alpha = GLUTAMATE_PARAMS['alpha']
-    current_alpha = base_alpha
-
-    for i in range(steps):
-        t_ms = time_array[i]
-        dt_sec = dt * 1e-3
-        I_stim = curr if 10000 <= t_ms <= 20000 else 0.0
-
-        # Zincir
-        V_pre_mV = hh_model.step(dt, t_ms, I_stim)
-        Ca_pre = ca_pre_model.step(dt_sec, V_pre_mV*1e-3, glu=current_glu_extra*1e-6)
-        
-        glu_pre_model.p['alpha'] = current_alpha
-        current_glu_syn = glu_pre_model.step(dt, ca_pre_model.c_fast * 1e6)
-        
-        Ca_astro = astro_model.compute_derivatives(dt_sec, current_glu_syn * 1e-6)
-        current_glu_extra = glia_trans_model.step(dt, Ca_astro * 1e6)
-
-        V_post_volts = post_neuron_model.step(dt_sec, current_glu_syn, I_soma_injected=0.0)
-        I_AMPA = post_neuron_model.I_AMPA
-        Ca_post = post_ca_model.step(dt_sec, V_post_volts, I_AMPA)
-
-        camkii_model.step(dt_sec, Ca_post)
-        alpha_mod = camkii_model.get_alpha_modulation()
-        current_alpha = base_alpha * (1.0 + alpha_mod)
-
-        if i % rec_step == 0:
-            idx = i // rec_step
-            rec_V_pre[idx] = V_pre_mV
-            rec_Ca_Pre[idx] = ca_pre_model.c_fast * 1e6
-            rec_IP3[idx] = astro_model.p_a * 1e6
-            rec_Glu_Ast[idx] = current_glu_extra
-            
-            # Post Voltajı mV cinsinden kaydediyoruz (x1000)
-            rec_V_post[idx] = V_post_volts * 1000.0 
-            
-            rec_Ca_Post[idx] = Ca_post * 1e6
-            rec_CaMKII_P[idx] = np.sum(camkii_model.P[1:]) * CAMKII_PARAMS["e_k"] * 1e6
-            rec_Alpha[idx] = current_alpha
+    rec_time = result.t_sec
+    rec_V_pre = result["V_pre"]
+    rec_Ca_Pre = result["Ca_fast"]
+    rec_IP3 = result["IP3_astro"]
+    rec_Glu_Ast = result["Glu_extra"]
+    rec_V_post = result["V_post"]   # mV
+    rec_Ca_Post = result["Ca_post"]
+    rec_CaMKII_P = result["CaMKII_P"]
+    rec_Alpha = result["alpha"]
 
     print(f"   -> Veriler işlendi. Grafikler çiziliyor...")
 
@@ -184,6 +128,7 @@ if __name__ == "__main__":
     print("======================================================")
     print("   TAM BİLEŞEN ANALİZİ (Post-Voltaj Dahil)")
     print("======================================================")
+    results = run_simulations(SCENARIOS)
     for scn in SCENARIOS:
-        run_simulation(scn)
+        plot_scenario(scn, results[scn["label"]])
     print(f"\n✅ GRAFİKLER HAZIR: '{SAVE_FOLDER}' klasörüne bak.")
\ No newline at end of file
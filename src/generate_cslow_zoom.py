@@ -38,7 +38,8 @@ def run_cslow_zoom_v2():
     
     # Modelleri Başlat
     hh_model = PresynapticHH(PRE_SYNAPTIC_PARAMS)
-    ca_model = PresynapticCalciumDynamics(CA_PARAMS)
+    # Glutamat girdisi doğrudan Molar veriliyor: tablodaki k_g (bkz. ca_params)
+    ca_model = PresynapticCalciumDynamics(CA_PARAMS.replace(k_g=0.78e-6))
     
     # Kayıt Dizileri
     # Zoom yapacağımız için bu sefer kaydı sık tutalım (Detay kaybolmasın)
@@ -54,7 +55,7 @@ def run_cslow_zoom_v2():
     # 3. SİMÜLASYON (Voltaj + Kalsiyum)
     # ----------------------------------------------------------------
     # c_slow'un hareketlenmesi için sisteme biraz Glutamat (feedback) verelim
-    GLU_INPUT = 2.0 # uM
+    GLU_INPUT = 2.0e-6 # Molar (2 uM)
     
     for i in range(steps):
         t_ms = time_array[i]
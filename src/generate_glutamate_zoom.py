@@ -71,13 +71,12 @@ def run_glutamate_zoom():
         
         # 3. Kalsiyumu Hesapla (Ca_fast artacak)
         ca_model.step(dt_sec, V_pre_volts, glu=0.0)
-        c_fast_uM = ca_model.c_fast * 1e6
-        
-        # 4. Glutamatı Hesapla
-        g_cleft = glu_model.step(dt, c_fast_uM)
-        
-        # Kayıt (Her adımı kaydediyoruz, downsampling yok!)
-        rec_glu[i] = g_cleft
+
+        # 4. Glutamatı Hesapla (SI: saniye, Molar)
+        g_cleft = glu_model.step(dt_sec, ca_model.c_fast)
+
+        # Kayıt (Her adımı kaydediyoruz, downsampling yok!) - uM cinsinden
+        rec_glu[i] = g_cleft * 1e6
 
     print("Simülasyon bitti. Grafik çiziliyor...")
 
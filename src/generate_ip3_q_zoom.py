@@ -1,4 +1,3 @@
-import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.ticker as ticker # Eksen formatı için gerekli
 import sys
@@ -12,24 +11,8 @@ src_path = os.path.join(current_dir, 'src')
 sys.path.append(src_path)
 
 try:
-    # Parametreler ve Modeller
-    from parameters.pre_synaptic_params import PRE_SYNAPTIC_PARAMS
-    from parameters.ca_params import CA_PARAMS
-    from parameters.glutamate_params import GLUTAMATE_PARAMS
-    from parameters.astrocyte_params import ASTROCYTE_PARAMS
-    from parameters.gliatransmitter_params import GLIATRANSMITTER_PARAMS
-    from parameters.post_synaptic_params import POST_SYNAPTIC_PARAMS
-    from parameters.post_synaptic_ca_params import POST_SYNAPTIC_CA_PARAMS
-    from parameters.camkii_params import CAMKII_PARAMS
-
-    from models.hh import PresynapticHH
-    from models.calcium_model import PresynapticCalciumDynamics
-    from models.presynaptic_glutamate import GlutamateDynamics
-    from models.astrocyte import AstrocyteDynamics
-    from models.gliatransmitter import GliatransmitterDynamics
-    from models.post_synaptic import PostSynapticDynamics
-    from models.post_synaptic_ca import PostSynapticCalciumDynamics
-    from models.camkii import CaMKIIDynamics
+    from simulation.synapse import TripartiteSynapse
+    from simulation.cache import cached_run
 
     print("✅ Modüller başarıyla yüklendi.")
 except ImportError as e:
@@ -45,55 +28,27 @@ def run_ip3_q_zoom():
     # ----------------------------------------------------------------
     # 2. AYARLAR
     # ----------------------------------------------------------------
-    T_total = 30000.0  # 30 Saniye
-    dt = 0.05          # Zaman adımı
-    steps = int(T_total / dt)
-    time_array = np.linspace(0, T_total, steps)
-    
-    # Modelleri Başlat
-    hh_model = PresynapticHH(PRE_SYNAPTIC_PARAMS)
-    ca_pre_model = PresynapticCalciumDynamics(CA_PARAMS)
-    glu_pre_model = GlutamateDynamics(GLUTAMATE_PARAMS)
-    astro_model = AstrocyteDynamics(ASTROCYTE_PARAMS)
-    glia_trans_model = GliatransmitterDynamics(GLIATRANSMITTER_PARAMS)
-    
-    # Kayıt Dizileri
-    rec_ip3 = np.zeros(steps, dtype=np.float32)
-    rec_q   = np.zeros(steps, dtype=np.float32)
-    
-    # Değişkenler
-    current_glu_extra = 0.0
-    current_glu_syn = 0.0
-    current_alpha = GLUTAMATE_PARAMS['alpha']
+    # 5 Hz gibi davranması için sürekli akım (I_stim = 10.0), alpha modülasyonu yok.
+    # Her adım kaydedilir (rec_step=1).
+    synapse = TripartiteSynapse(
+        T_total=30000.0,   # 30 Saniye
+        dt=0.05,           # Zaman adımı
+        current=10.0,
+        stim_window=None,
+        record=("IP3_pre", "q_pre"),
+        rec_step=1,
+        alpha_feedback=False,
+    )
     
-    print(f"Simülasyon yapılıyor ({T_total/1000} sn)...")
+    print(f"Simülasyon yapılıyor ({synapse.T_total/1000} sn)...")
     
     # ----------------------------------------------------------------
     # 3. SİMÜLASYON DÖNGÜSÜ
     # ----------------------------------------------------------------
-    for i in range(steps):
-        t_ms = time_array[i]
-        dt_sec = dt * 1e-3
-        
-        # 5 Hz gibi davranması için akım
-        I_stim = 10.0 
-        
-        # --- Pre-Sinaptik Zincir ---
-        V_pre_mV = hh_model.step(dt, t_ms, I_stim)
-        V_pre_volts = V_pre_mV * 1e-3
-        
-        # Calcium Model Step
-        ca_pre_model.step(dt_sec, V_pre_volts, glu=current_glu_extra * 1e-6)
-        
-        # --- KAYIT ---
-        rec_ip3[i] = ca_pre_model.p_ip3 * 1e6 # M -> uM
-        rec_q[i]   = ca_pre_model.q           # 0-1 arası
-        
-        # Döngünün kalanı
-        Ca_pre_uM = ca_pre_model.c_fast * 1e6
-        current_glu_syn = glu_pre_model.step(dt, Ca_pre_uM)
-        Ca_astro = astro_model.compute_derivatives(dt_sec, current_glu_syn * 1e-6)
-        current_glu_extra = glia_trans_model.step(dt, Ca_astro * 1e6)
+    result = cached_run(synapse)
+    time_array = result.time
+    rec_ip3 = result["IP3_pre"] # M -> uM
+    rec_q   = result["q_pre"]   # 0-1 arası
 
     print("Simülasyon bitti. Grafik oluşturuluyor...")
 
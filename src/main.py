@@ -1,8 +1,6 @@
-import numpy as np
 import matplotlib.pyplot as plt
 import sys
 import os
-import time
 
 # =================================================================================
 # KULLANICI AYARLARI (SİMÜLASYON MODU)
@@ -31,25 +29,8 @@ src_path = os.path.join(current_dir, 'src')
 sys.path.append(src_path)
 
 try:
-    # PARAMETRELER
-    from parameters.pre_synaptic_params import PRE_SYNAPTIC_PARAMS
-    from parameters.ca_params import CA_PARAMS
-    from parameters.glutamate_params import GLUTAMATE_PARAMS
-    from parameters.astrocyte_params import ASTROCYTE_PARAMS
-    from parameters.gliatransmitter_params import GLIATRANSMITTER_PARAMS
-    from parameters.post_synaptic_params import POST_SYNAPTIC_PARAMS
-    from parameters.post_synaptic_ca_params import POST_SYNAPTIC_CA_PARAMS
-    from parameters.camkii_params import CAMKII_PARAMS
-
-    # MODELLER
-    from models.hh import PresynapticHH
-    from models.calcium_model import PresynapticCalciumDynamics
-    from models.presynaptic_glutamate import GlutamateDynamics
-    from models.astrocyte import AstrocyteDynamics
-    from models.gliatransmitter import GliatransmitterDynamics
-    from models.post_synaptic import PostSynapticDynamics
-    from models.post_synaptic_ca import PostSynapticCalciumDynamics
-    from models.camkii import CaMKIIDynamics
+    from simulation.synapse import TripartiteSynapse
+    from simulation.kernel import NUMBA_AVAILABLE
 
 except ImportError as e:
     print(f"Kritik Hata: Modüller yüklenemedi. 'src' yapısını kontrol et.\n{e}")
@@ -61,157 +42,66 @@ def run():
     print("======================================================================")
 
     # ---------------------------------------------------------------------
-    # 2. SİMÜLASYON ZAMANI
+    # 2. SİMÜLASYON AYARLARI
     # ---------------------------------------------------------------------
-    T_total = 30000.0  # 30 Saniye
-    dt = 0.05          # 0.05 ms
-    steps = int(T_total / dt)
-    time_array = np.linspace(0, T_total, steps)
-
-    print(f"Toplam Süre: {T_total/1000} saniye")
+    # A. UYARI PROTOKOLÜ: Sadece 10.000 ms - 20.000 ms aralığında akım verilir.
+    # Başlangıç: önbellekteki dinlenme noktası (başlangıç artifactı ve susturma yok).
+    synapse = TripartiteSynapse(
+        T_total=30000.0,   # 30 Saniye
+        dt=0.05,           # 0.05 ms
+        current=CURRENT_AMPLITUDE,
+        stim_window=(10000.0, 20000.0),
+        record=("V_pre", "Ca_fast", "Ca_slow", "Ca_ER", "IP3_pre", "Glu_syn",
+                "Ca_astro", "IP3_astro", "h_gate", "Glu_extra",
+                "V_post", "Ca_post", "I_AMPA",
+                "CaMKII_P", "alpha"),
+        rec_step=20,       # Downsampling (Veri boyutunu yönetilebilir tutmak için)
+        init="rest",
+    )
+
+    print(f"Toplam Süre: {synapse.T_total/1000} saniye")
     
     # Klasör Kontrolü
     if not os.path.exists("results_comparison"):
         os.makedirs("results_comparison")
 
     # ---------------------------------------------------------------------
-    # 3. MODELLERİN OLUŞTURULMASI
-    # ---------------------------------------------------------------------
-    hh_model = PresynapticHH(PRE_SYNAPTIC_PARAMS)
-    ca_pre_model = PresynapticCalciumDynamics(CA_PARAMS)
-    glu_pre_model = GlutamateDynamics(GLUTAMATE_PARAMS)
-    astro_model = AstrocyteDynamics(ASTROCYTE_PARAMS)
-    glia_trans_model = GliatransmitterDynamics(GLIATRANSMITTER_PARAMS)
-    post_neuron_model = PostSynapticDynamics(POST_SYNAPTIC_PARAMS)
-    post_ca_model = PostSynapticCalciumDynamics(POST_SYNAPTIC_CA_PARAMS)
-    camkii_model = CaMKIIDynamics(CAMKII_PARAMS)
-
-    # ---------------------------------------------------------------------
-    # 4. VERİ KAYIT DİZİLERİ
+    # 3. SİMÜLASYON
     # ---------------------------------------------------------------------
-    rec_step = 20  # Downsampling (Veri boyutunu yönetilebilir tutmak için)
-    rec_size = steps // rec_step
-    rec_time = time_array[::rec_step]
+    # Numba kuruluysa derlenmiş döngü (aynı aritmetik, ~200x hızlı)
+    backend = "numba" if NUMBA_AVAILABLE else "python"
+    print(f"Simülasyon koşuyor... (backend: {backend})")
+    result = synapse.run(verbose=True, backend=backend)
+    rec_time = result.time
 
     # Pre-Synaptic
-    rec_V_pre = np.zeros(rec_size, dtype=np.float32)
-    rec_Ca_Fast = np.zeros(rec_size, dtype=np.float32)
-    rec_Ca_Slow = np.zeros(rec_size, dtype=np.float32)
-    rec_Ca_ER = np.zeros(rec_size, dtype=np.float32)
-    rec_IP3_Pre = np.zeros(rec_size, dtype=np.float32)
-    rec_Glu_Syn = np.zeros(rec_size, dtype=np.float32)
+    rec_V_pre = result["V_pre"]
+    rec_Ca_Fast = result["Ca_fast"]
+    rec_Ca_Slow = result["Ca_slow"]
+    rec_Ca_ER = result["Ca_ER"]
+    rec_IP3_Pre = result["IP3_pre"]
+    rec_Glu_Syn = result["Glu_syn"]
 
     # Astrocyte
-    rec_Ca_Astro = np.zeros(rec_size, dtype=np.float32)
-    rec_IP3_Astro = np.zeros(rec_size, dtype=np.float32)
-    rec_h_Gate = np.zeros(rec_size, dtype=np.float32)
-    rec_Glu_Extra = np.zeros(rec_size, dtype=np.float32)
+    rec_Ca_Astro = result["Ca_astro"]
+    rec_IP3_Astro = result["IP3_astro"]
+    rec_h_Gate = result["h_gate"]
+    rec_Glu_Extra = result["Glu_extra"]
 
     # Post-Synaptic
-    rec_V_post = np.zeros(rec_size, dtype=np.float32)
-    rec_Ca_Post = np.zeros(rec_size, dtype=np.float32)
-    rec_I_AMPA = np.zeros(rec_size, dtype=np.float32)
+    rec_V_post = result["V_post"]
+    rec_Ca_Post = result["Ca_post"]
+    rec_I_AMPA = result["I_AMPA"]
 
     # LTP
-    rec_CaMKII_P = np.zeros(rec_size, dtype=np.float32)
-    rec_Alpha_Mod = np.zeros(rec_size, dtype=np.float32)
-
-    # ---------------------------------------------------------------------
-    # 5. SİMÜLASYON DÖNGÜSÜ
-    # ---------------------------------------------------------------------
-    current_glu_syn = 0.0   
-    current_glu_extra = 0.0 
-    
-    base_alpha = GLUTAMATE_PARAMS['alpha']
-    current_alpha = base_alpha
-
-    print("Simülasyon koşuyor...")
-    start_time = time.time()
-
-    for i in range(steps):
-        t_ms = time_array[i]
-        dt_sec = dt * 1e-3
-
-        # A. UYARI PROTOKOLÜ (10.000 ms - 20.000 ms)
-        # ---------------------------------------------------------
-        # Bu blok senkronizasyon için kritiktir. 
-        # Sadece bu aralıkta akım verilir.
-        if 10000 <= t_ms <= 20000:
-            I_stim = CURRENT_AMPLITUDE 
-        else:
-            I_stim = 0.0
-
-        # B. PRE-SINAPTIK ADIM
-        V_pre_mV = hh_model.step(dt, t_ms, I_stim)
-        V_pre_volts = V_pre_mV * 1e-3
-
-        Ca_pre = ca_pre_model.step(dt_sec, V_pre_volts, glu=current_glu_extra * 1e-6)
-        Ca_pre_uM = ca_pre_model.c_fast * 1e6
-        
-        # Alpha modülasyonunu uygula
-        glu_pre_model.p['alpha'] = current_alpha
-        current_glu_syn = glu_pre_model.step(dt, Ca_pre_uM)
-        
-        # [GÜVENLİK] Başlangıç artifactlarını önlemek için ilk 100ms glutamatı sustur
-        if t_ms < 100:
-            current_glu_syn = 0.0
-
-        # C. ASTROCYTE ADIM
-        Ca_astro = astro_model.compute_derivatives(dt_sec, current_glu_syn * 1e-6)
-        current_glu_extra = glia_trans_model.step(dt, Ca_astro * 1e6)
-
-        # D. POST-SINAPTIK ADIM
-        # Not: Post-sinaptik model 'current_glu_syn' ile sürülür. 
-        # Eğer yukarıda I_stim 0 ise -> V_pre yok -> Ca_pre yok -> Glu_syn yok -> Post_V yok.
-        # Bu zincir senkronizasyonu sağlar.
-        V_post_volts = post_neuron_model.step(dt_sec, current_glu_syn, I_soma_injected=0.0)
-        I_AMPA = post_neuron_model.I_AMPA
-        Ca_post = post_ca_model.step(dt_sec, V_post_volts, I_AMPA)
-
-        # E. LTP & RETROGRADE SIGNALING
-        camkii_model.step(dt_sec, Ca_post)
-        alpha_mod_factor = camkii_model.get_alpha_modulation()
-        current_alpha = base_alpha * (1.0 + alpha_mod_factor)
-
-        # -------------------------
-        # KAYIT
-        # -------------------------
-        if i % rec_step == 0:
-            idx = i // rec_step
-            
-            # Pre
-            rec_V_pre[idx] = V_pre_mV
-            rec_Ca_Fast[idx] = ca_pre_model.c_fast * 1e6 
-            rec_Ca_Slow[idx] = ca_pre_model.c_slow * 1e6 
-            rec_Ca_ER[idx] = ca_pre_model.c_ER * 1e6     
-            rec_IP3_Pre[idx] = ca_pre_model.p_ip3 * 1e6  
-            rec_Glu_Syn[idx] = current_glu_syn
-            
-            # Astro
-            rec_Ca_Astro[idx] = Ca_astro * 1e6           
-            rec_IP3_Astro[idx] = astro_model.p_a * 1e6   
-            rec_h_Gate[idx] = astro_model.h_a            
-            rec_Glu_Extra[idx] = current_glu_extra
-            
-            # Post
-            rec_V_post[idx] = V_post_volts * 1e3         
-            rec_Ca_Post[idx] = Ca_post * 1e6             
-            rec_I_AMPA[idx] = I_AMPA * 1e9               
-
-            # LTP
-            rec_CaMKII_P[idx] = np.sum(camkii_model.P[1:]) * CAMKII_PARAMS["e_k"] * 1e6
-            rec_Alpha_Mod[idx] = current_alpha
-
-        # İlerleme Çubuğu
-        if i % (steps // 10) == 0:
-            percent = (i / steps) * 100
-            print(f"%{percent:.0f} tamamlandı. (Simülasyon Zamanı: {t_ms/1000:.1f} s)")
+    rec_CaMKII_P = result["CaMKII_P"]
+    rec_Alpha_Mod = result["alpha"]
 
-    print(f"\n✅ Simülasyon Bitti. Süre: {time.time() - start_time:.2f} sn")
+    print(f"\n✅ Simülasyon Bitti. Süre: {result.wall_time:.2f} sn")
     print("Grafikler oluşturuluyor...")
 
     # ---------------------------------------------------------------------
-    # 6. GÖRSELLEŞTİRME
+    # 4. GÖRSELLEŞTİRME
     # ---------------------------------------------------------------------
     t_axis = rec_time / 1000 # Saniye cinsinden zaman ekseni
     
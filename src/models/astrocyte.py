@@ -1,5 +1,21 @@
 import numpy as np
 
+from models.gating import exp_gate
+
+
+def _hill(x, K, n):
+    """Array-safe x^n / (x^n + K^n) with negative x clamped to 0."""
+    xn = np.maximum(x, 0.0) ** n
+    return xn / (xn + K ** n)
+
+
+def _hill_slope(x, K, n):
+    """d/dx of _hill (right-hand slope at 0); 0 where n < 1 makes it infinite."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = n * np.maximum(x, 0.0) ** (n - 1) * K ** n / (np.maximum(x, 0.0) ** n + K ** n) ** 2
+    return np.where((x > 0) | ((x == 0) & (n >= 1)), s, 0.0)
+
+
 class AstrocyteDynamics:
     """
     Tewari & Majumdar (2012) - Astrocyte Dynamics
@@ -9,6 +25,12 @@ class AstrocyteDynamics:
     Input 'g_syn_molar' must be in Molar!
     """
 
+    # Packed state order (see get_state / derivatives)
+    STATE_VARS = ("c_a", "p_a", "h_a")
+
+    # Lookup tables (models.rate_tables): name -> (exact, lo, hi, step, scale)
+    RATE_TABLES = {"plc_beta": ("exact_plc_beta", 1e-15, 1e-1, 0.01, "log")}  # M
+
     def __init__(self, params):
         self.p = params
         
@@ -17,6 +39,21 @@ class AstrocyteDynamics:
         self.p_a = 0.1e-6  # IP3 (Molar)
         self.h_a = 0.8     # Gating variable (Dimensionless)
 
+        # True: Rush–Larsen update for h_a (models.gating)
+        self.exp_gates = False
+
+        # RateTable of plc_beta over glutamate, or None (exact)
+        self.plc_beta_table = None
+
+    def plc_beta(self, g_syn_molar):
+        """PLC-beta IP3 production v_beta * Hill(g, K_R, 0.7) (M/s)."""
+        if self.plc_beta_table is not None:
+            return self.plc_beta_table(g_syn_molar)
+        return self.exact_plc_beta(g_syn_molar)
+
+    def exact_plc_beta(self, g_syn_molar):
+        return self.p['v_beta'] * _hill(g_syn_molar, self.p['K_R'], 0.7)
+
     def hill(self, x, K, n):
         """
         Generic Hill function: x^n / (x^n + K^n)
@@ -81,7 +118,10 @@ class AstrocyteDynamics:
         # Term: v_beta * Hill(g^0.7, K_R)
         # Not: Hill fonksiyonuna g_syn_molar veriyoruz, K_R de Molar.
         # Fonksiyon içeride kuvvetlerini alıyor (0.7).
-        prod_beta = p['v_beta'] * self.hill(g_syn_molar, p['K_R'], 0.7)
+        if self.plc_beta_table is not None:
+            prod_beta = self.plc_beta_table(g_syn_molar)
+        else:
+            prod_beta = p['v_beta'] * self.hill(g_syn_molar, p['K_R'], 0.7)
         
         # Inhibition factor: 1 + (Kp/KR)*Hill(Ca, K_pi)
         inhib = 1.0 + (p['K_p'] / p['K_R']) * self.hill(c_a, p['K_pi'], 1.0)
@@ -120,11 +160,107 @@ class AstrocyteDynamics:
         # ---------------------------------------------------------------------
         self.c_a += dt * dc_a_dt
         self.p_a += dt * dp_a_dt
-        self.h_a += dt * dh_a_dt
+        if self.exp_gates:
+            self.h_a = exp_gate(h_a, alpha_h, beta_h, dt)
+        else:
+            self.h_a += dt * dh_a_dt
         
         # Sınırlandırmalar
         self.c_a = max(self.c_a, 1e-12) # 0 yerine çok küçük bir sayı (Nan önler)
         self.p_a = max(self.p_a, 0.0)
-        self.h_a = np.clip(self.h_a, 0.0, 1.0)
+        if not self.exp_gates:
+            self.h_a = np.clip(self.h_a, 0.0, 1.0)
+
+        return self.c_a
+
+    # ---------------------------------------------------------------------
+    # Packed State API
+    # ---------------------------------------------------------------------
+    def get_state(self):
+        return np.array([self.c_a, self.p_a, self.h_a], dtype=np.float64)
+
+    def set_state(self, y):
+        self.c_a, self.p_a, self.h_a = (float(v) for v in y)
+
+    def derivatives(self, y, g_syn_molar, out=None):
+        """
+        Pure right-hand side dy/dt (SI, per second) for y = [c_a, p_a, h_a],
+        shape (3,) or (3, k). g_syn_molar: synaptic glutamate (Molar).
+        """
+        p = self.p
+        c_a, p_a, h_a = y[0], y[1], y[2]
+        c1_val = p.get('c1_a', p.get('c1', 0.185))
+
+        # Eq. 10
+        m_inf = _hill(p_a, p['d1'], 1.0)
+        n_inf = _hill(c_a, p['d5'], 1.0)
+        driving = p['c_0'] - (1.0 + c1_val) * c_a
+        J_IP3R = p['r_c'] * (m_inf**3) * (n_inf**3) * (h_a**3) * driving
+        J_SERCA = p['v_ER'] * (c_a**2) / (c_a**2 + p['K_ER']**2)
+        J_Leak = p['r_L'] * driving
+
+        # Eq. 11
+        prod_beta = self.plc_beta(g_syn_molar)
+        inhib = 1.0 + (p['K_p'] / p['K_R']) * _hill(c_a, p['K_pi'], 1.0)
+        term_PLC_delta = (p['v_delta'] / (1.0 + p_a / p['k_delta'])) * _hill(c_a, p['K_PLC_delta'], 2.0)
+        deg_3K = p['v_3k'] * _hill(c_a, p['K_D'], 4.0) * _hill(p_a, p['K_3'], 1.0)
+        deg_5P = p['r_5p'] * p_a
+
+        # Eq. 12
+        alpha_h = p['a2'] * p['d2'] * (p_a + p['d1']) / (p_a + p['d3'])
+        beta_h  = p['a2'] * c_a
+
+        if out is None:
+            out = np.empty_like(y, dtype=np.float64)
+        out[0] = J_IP3R - J_SERCA + J_Leak
+        out[1] = prod_beta / inhib + term_PLC_delta - deg_3K - deg_5P
+        out[2] = alpha_h * (1.0 - h_a) - beta_h * h_a
+        return out
+
+    def jacobian(self, y, g_syn_molar):
+        """
+        Analytic Jacobian of derivatives() (SI, per second) at a single state
+        y of shape (3,). Returns (J, dg): J of shape (3, 3) and the (3,)
+        partial w.r.t. g_syn_molar.
+        """
+        p = self.p
+        c_a, p_a, h_a = y
+        c1_val = p.get('c1_a', p.get('c1', 0.185))
+
+        m_inf, dm_inf = _hill(p_a, p['d1'], 1.0), _hill_slope(p_a, p['d1'], 1.0)
+        n_inf, dn_inf = _hill(c_a, p['d5'], 1.0), _hill_slope(c_a, p['d5'], 1.0)
+        driving = p['c_0'] - (1.0 + c1_val) * c_a
+        rc = p['r_c']
+
+        J = np.zeros((3, 3))
+        # Eq. 10
+        J[0, 0] = (rc * m_inf**3 * h_a**3 * (3 * n_inf**2 * dn_inf * driving
+                                             - n_inf**3 * (1.0 + c1_val))
+                   - p['v_ER'] * 2 * c_a * p['K_ER']**2 / (c_a**2 + p['K_ER']**2)**2
+                   - p['r_L'] * (1.0 + c1_val))
+        J[0, 1] = rc * 3 * m_inf**2 * dm_inf * n_inf**3 * h_a**3 * driving
+        J[0, 2] = rc * m_inf**3 * n_inf**3 * 3 * h_a**2 * driving
+
+        # Eq. 11
+        prod_beta = p['v_beta'] * _hill(g_syn_molar, p['K_R'], 0.7)
+        ratio = p['K_p'] / p['K_R']
+        inhib = 1.0 + ratio * _hill(c_a, p['K_pi'], 1.0)
+        plc_delta = p['v_delta'] / (1.0 + p_a / p['k_delta'])
+        h2 = _hill(c_a, p['K_PLC_delta'], 2.0)
+        h4 = _hill(c_a, p['K_D'], 4.0)
+        J[1, 0] = (-prod_beta / inhib**2 * ratio * _hill_slope(c_a, p['K_pi'], 1.0)
+                   + plc_delta * _hill_slope(c_a, p['K_PLC_delta'], 2.0)
+                   - p['v_3k'] * _hill_slope(c_a, p['K_D'], 4.0) * _hill(p_a, p['K_3'], 1.0))
+        J[1, 1] = (-plc_delta / p['k_delta'] / (1.0 + p_a / p['k_delta']) * h2
+                   - p['v_3k'] * h4 * _hill_slope(p_a, p['K_3'], 1.0)
+                   - p['r_5p'])
+
+        # Eq. 12
+        alpha_h = p['a2'] * p['d2'] * (p_a + p['d1']) / (p_a + p['d3'])
+        J[2, 0] = -p['a2'] * h_a
+        J[2, 1] = p['a2'] * p['d2'] * (p['d3'] - p['d1']) / (p_a + p['d3'])**2 * (1.0 - h_a)
+        J[2, 2] = -alpha_h - p['a2'] * c_a
 
-        return self.c_a
\ No newline at end of file
+        dg = np.zeros(3)
+        dg[1] = p['v_beta'] * _hill_slope(g_syn_molar, p['K_R'], 0.7) / inhib
+        return J, dg
@@ -1,12 +1,22 @@
 import numpy as np
 
+from models.gating import exp_gate
+
 class PresynapticCalciumDynamics:
     """
     Tewari & Majumdar (2012) Implementation
-    Units Strategy: INTERNAL CALCS IN SI (Molar, Ampere, Volt, Meter, Second).
-    Inputs: mV, ms (OR detected Volts/Seconds)
-    Outputs: uM (micromolar)
+    Units: SI throughout (Molar, Ampere, Volt, Meter, Second) – inputs,
+    state and outputs alike; no unit detection.
     """
+    # Packed state order (see get_state / derivatives)
+    STATE_VARS = ("c_fast", "c_slow", "c_ER", "p_ip3", "m_Ca", "q")
+
+    # Lookup tables (models.rate_tables): name -> (exact, lo, hi, step, scale)
+    RATE_TABLES = {
+        "m_inf": ("exact_vgcc_m_inf", -0.1, 0.06, 5e-5, "linear"),        # V
+        "ip3_prod": ("exact_ip3_production", 1e-9, 1e5, 0.01, "log"),    # M (k_g = 0.78 M)
+    }
+
     def __init__(self, p):
         self.p = p
         
@@ -33,52 +43,78 @@ class PresynapticCalciumDynamics:
         self.m_Ca   = 0.0              # Gate closed
         self.q      = 0.5              # IP3R gating
 
-    def step(self, dt_input, V_pre_input, glu=0.0):
+        # True: Rush–Larsen updates for m_Ca and q (models.gating)
+        self.exp_gates = False
+
+        # RateTables for vgcc_m_inf / ip3_production, or None (exact)
+        self.m_inf_table = None
+        self.ip3_prod_table = None
+
+    def step(self, dt, V_pre, glu=0.0):
         """
-        dt_input: Time step (Expected ms, but robust to seconds)
-        V_pre_input: Membrane voltage (Expected mV, but robust to Volts)
-        glu: Glutamate concentration in uM
+        dt: Time step (s)
+        V_pre: Membrane voltage (V)
+        glu: Extrasynaptic glutamate (Molar)
+        Returns the cytosolic Ca2+ c_fast + c_slow (Molar).
         """
+        # Current Cytosolic Calcium (Molar), shared by both parts
+        c_i = self.cytosolic_ca()
+
+        self.step_fast(dt, V_pre, c_i)
+        self.step_slow(dt, glu, c_i)
+        return self.c_fast + self.c_slow
+    
+    # ------------------------------------------------------------
+    # Split step (SI only: dt in seconds, V_pre in Volts)
+    # The fast part (VGCC/PMCA) needs the HH time step; the ER/IP3
+    # part evolves on seconds and can be stepped with a larger dt.
+    # step() == cytosolic_ca() + step_fast() + step_slow().
+    # ------------------------------------------------------------
+    def vgcc_m_inf(self, V_pre):
+        """VGCC steady-state activation (Boltzmann), V_pre in Volts."""
+        if self.m_inf_table is not None:
+            return self.m_inf_table(V_pre)
+        return self.exact_vgcc_m_inf(V_pre)
+
+    def exact_vgcc_m_inf(self, V_pre):
         p = self.p
-        
-        # --- UNIT AUTO-DETECTION & CORRECTION ---
-        # Voltaj: Eğer -1 ile 1 arasındaysa muhtemelen VOLT verilmiştir, mV'ye gerek yok.
-        # Eğer -100, -60 gibiyse mV verilmiştir.
-        if abs(V_pre_input) < 1.0: 
-            V_pre = V_pre_input      # Zaten Volt verilmiş
-        else:
-            V_pre = V_pre_input * 1e-3 # mV verilmiş, Volt'a çevir
-            
-        # Zaman: Eğer dt < 1e-4 ise muhtemelen SANİYE verilmiştir.
-        if dt_input < 1e-4:
-            dt = dt_input            # Zaten Saniye verilmiş
-        else:
-            dt = dt_input * 1e-3     # ms verilmiş, Saniye'ye çevir
+        return 1.0 / (1.0 + np.exp((p["V_mCa"] - V_pre) / p["k_mCa"]))
 
-        # Glutamate: uM -> Molar
-        glu_molar = glu * 1e-6        
-        
-        # Current Cytosolic Calcium (Molar)
+    def ip3_production(self, glu):
+        """Glutamate-driven IP3 production v_g * Hill(glu, k_g, 0.7) (M/s); glu in M."""
+        if self.ip3_prod_table is not None:
+            return self.ip3_prod_table(glu)
+        return self.exact_ip3_production(glu)
+
+    def exact_ip3_production(self, glu):
+        p = self.p
+        return p["v_g"] * (glu**0.7) / (p["k_g"]**0.7 + glu**0.7)
+
+    def cytosolic_ca(self):
+        """c_i = c_fast + c_slow (Molar) with a 1 nM safety floor."""
         c_i = self.c_fast + self.c_slow
-        c_i = max(c_i, 1e-9) # Safety floor (1 nM)
+        return max(c_i, 1e-9)
+
+    def step_fast(self, dt, V_pre, c_i):
+        """VGCC gate and c_fast. c_i: cytosolic Ca at the start of the step."""
+        p = self.p
 
-        # ========================================================
-        # 1. FAST DYNAMICS (VGCC & PMCA)
-        # ========================================================
-        
         # --- VGCC (N-Type) Current ---
         # m_inf (Boltzmann)
-        m_inf = 1.0 / (1.0 + np.exp((p["V_mCa"] - V_pre) / p["k_mCa"]))
-        
+        m_inf = self.vgcc_m_inf(V_pre)
+
         # dm/dt
-        dm_dt = (m_inf - self.m_Ca) / p["tau_mCa"]
-        self.m_Ca += dm_dt * dt
-        
+        if self.exp_gates:
+            self.m_Ca = exp_gate(self.m_Ca, m_inf / p["tau_mCa"], (1.0 - m_inf) / p["tau_mCa"], dt)
+        else:
+            dm_dt = (m_inf - self.m_Ca) / p["tau_mCa"]
+            self.m_Ca += dm_dt * dt
+
         # I_Ca Calculation (Current Density: A/m^2)
         # I = rho * m^2 * g * (V - V_Ca)
         g_total = p["rho_Ca"] * (self.m_Ca**2) * p["g_Ca"]
-        I_Ca_density = g_total * (V_pre - self.V_Ca) 
-        
+        I_Ca_density = g_total * (V_pre - self.V_Ca)
+
         # Convert Density (A/m2) to Current (A)
         I_Ca_amp = I_Ca_density * p["A_btn"]
 
@@ -93,53 +129,175 @@ class PresynapticCalciumDynamics:
         flux_membrane = -(I_Ca_amp + I_PMCA_amp) * self.inv_zFV
         dc_fast_dt = flux_membrane + J_leak
 
-        # ========================================================
-        # 2. SLOW DYNAMICS (ER & IP3)
-        # ========================================================
-        
+        self.c_fast += dc_fast_dt * dt
+        self.c_fast = max(self.c_fast, 0.0)
+
+    def step_slow(self, dt, glu, c_i):
+        """IP3R gate q, c_slow, c_ER and IP3. glu: Molar, as step()."""
+        p = self.p
+
         # IP3 Gating
         m_inf_ip3 = self.p_ip3 / (self.p_ip3 + p["d1"])
         n_inf_ip3 = c_i / (c_i + p["d5"])
-        
+
         alpha_q = p["a2"] * p["d2"] * (self.p_ip3 + p["d1"]) / (self.p_ip3 + p["d3"])
         beta_q  = p["a2"] * c_i
-        dq_dt = alpha_q * (1.0 - self.q) - beta_q * self.q
-        self.q += dq_dt * dt
+        if self.exp_gates:
+            self.q = exp_gate(self.q, alpha_q, beta_q, dt)
+        else:
+            dq_dt = alpha_q * (1.0 - self.q) - beta_q * self.q
+            self.q += dq_dt * dt
 
         # Fluxes (Molar/s)
         prob = (m_inf_ip3**3) * (n_inf_ip3**3) * (self.q**3)
         J_IP3R = p["c1"] * p["v1"] * prob * (self.c_ER - c_i)
-        
+
         J_SERCA = p["v3"] * (c_i**2) / (c_i**2 + p["k3"]**2)
         J_ER_Leak = p["c1"] * p["v2"] * (self.c_ER - c_i)
 
         # dc_slow/dt
         dc_slow_dt = J_IP3R + J_ER_Leak - J_SERCA
-        
+
         # dc_ER/dt
         dc_ER_dt = -(1.0 / p["c1"]) * dc_slow_dt
 
         # IP3 Dynamics (dp/dt)
-        term_prod = p["v_g"] * (glu_molar**0.7) / (p["k_g"]**0.7 + glu_molar**0.7)
+        term_prod = self.ip3_production(glu)
         term_deg  = p["tau_p"] * (self.p_ip3 - p["p0"])
         dp_dt = term_prod - term_deg
 
-        # ========================================================
-        # 3. UPDATE STATES
-        # ========================================================
-        self.c_fast += dc_fast_dt * dt
         self.c_slow += dc_slow_dt * dt
         self.c_ER   += dc_ER_dt   * dt
         self.p_ip3  += dp_dt      * dt
 
         # Sanity Checks
-        self.c_fast = max(self.c_fast, 0.0)
         self.c_slow = max(self.c_slow, 1e-10)
         self.c_ER   = max(self.c_ER, 1e-10)
 
-        # --- OUTPUT CONVERSION (SI -> uM) ---
-        return (self.c_fast + self.c_slow) * 1e6
-    
+    # ------------------------------------------------------------
+    # Packed State API
+    # ------------------------------------------------------------
+    def get_state(self):
+        return np.array([self.c_fast, self.c_slow, self.c_ER,
+                         self.p_ip3, self.m_Ca, self.q], dtype=np.float64)
+
+    def set_state(self, y):
+        (self.c_fast, self.c_slow, self.c_ER,
+         self.p_ip3, self.m_Ca, self.q) = (float(v) for v in y)
+
+    def derivatives(self, y, V_pre, glu=0.0, out=None):
+        """
+        Pure right-hand side dy/dt (SI, per second) for
+        y = [c_fast, c_slow, c_ER, p_ip3, m_Ca, q], shape (6,) or (6, k).
+        V_pre: Volts. glu: Molar, as step().
+        """
+        p = self.p
+        c_fast, c_slow, c_ER, p_ip3, m_Ca, q = y[0], y[1], y[2], y[3], y[4], y[5]
+
+        glu = np.maximum(glu, 0.0)
+        c_i = np.maximum(c_fast + c_slow, 1e-9)
+
+        # --- Fast: VGCC, PMCA, leak ---
+        m_inf = self.vgcc_m_inf(V_pre)
+        dm_dt = (m_inf - m_Ca) / p["tau_mCa"]
+
+        I_Ca_amp = p["rho_Ca"] * (m_Ca**2) * p["g_Ca"] * (V_pre - self.V_Ca) * p["A_btn"]
+        I_PMCA_amp = p["v_PMCA_max"] * (c_i**2) / (c_i**2 + p["K_PMCA"]**2) * p["A_btn"]
+        J_leak = p["v_leak"] * (p["c_ext"] - c_i)
+        dc_fast_dt = -(I_Ca_amp + I_PMCA_amp) * self.inv_zFV + J_leak
+
+        # --- Slow: ER & IP3 ---
+        m_inf_ip3 = p_ip3 / (p_ip3 + p["d1"])
+        n_inf_ip3 = c_i / (c_i + p["d5"])
+        alpha_q = p["a2"] * p["d2"] * (p_ip3 + p["d1"]) / (p_ip3 + p["d3"])
+        beta_q  = p["a2"] * c_i
+        dq_dt = alpha_q * (1.0 - q) - beta_q * q
+
+        prob = (m_inf_ip3**3) * (n_inf_ip3**3) * (q**3)
+        J_IP3R = p["c1"] * p["v1"] * prob * (c_ER - c_i)
+        J_SERCA = p["v3"] * (c_i**2) / (c_i**2 + p["k3"]**2)
+        J_ER_Leak = p["c1"] * p["v2"] * (c_ER - c_i)
+        dc_slow_dt = J_IP3R + J_ER_Leak - J_SERCA
+
+        term_prod = self.ip3_production(glu)
+        dp_dt = term_prod - p["tau_p"] * (p_ip3 - p["p0"])
+
+        if out is None:
+            out = np.empty_like(y, dtype=np.float64)
+        out[0] = dc_fast_dt
+        out[1] = dc_slow_dt
+        out[2] = -(1.0 / p["c1"]) * dc_slow_dt
+        out[3] = dp_dt
+        out[4] = dm_dt
+        out[5] = dq_dt
+        return out
+
+    def jacobian(self, y, V_pre, glu=0.0):
+        """
+        Analytic Jacobian of derivatives() (SI, per second) at a single state
+        y of shape (6,). Returns (J, dV, dglu): J = d(dy/dt)/dy of shape
+        (6, 6) and the (6,) partials w.r.t. the V_pre and glu inputs.
+        """
+        p = self.p
+        c_fast, c_slow, c_ER, p_ip3, m_Ca, q = y
+
+        glu = max(glu, 0.0)
+        c_sum = c_fast + c_slow
+        c_i = max(c_sum, 1e-9)
+        dci = 1.0 if c_sum > 1e-9 else 0.0      # d c_i / d c_fast = d c_i / d c_slow
+
+        # --- Fast ---
+        m_inf = 1.0 / (1.0 + np.exp((p["V_mCa"] - V_pre) / p["k_mCa"]))
+        dI_Ca_dm = 2 * p["rho_Ca"] * m_Ca * p["g_Ca"] * (V_pre - self.V_Ca) * p["A_btn"]
+        dI_Ca_dV = p["rho_Ca"] * (m_Ca**2) * p["g_Ca"] * p["A_btn"]
+        K2 = p["K_PMCA"]**2
+        dI_PMCA_dc = p["v_PMCA_max"] * 2 * c_i * K2 / (c_i**2 + K2)**2 * p["A_btn"]
+        dfast_dc = -dI_PMCA_dc * self.inv_zFV - p["v_leak"]
+
+        # --- Slow ---
+        m_inf_ip3 = p_ip3 / (p_ip3 + p["d1"])
+        dm_inf_ip3 = p["d1"] / (p_ip3 + p["d1"])**2
+        n_inf_ip3 = c_i / (c_i + p["d5"])
+        dn_inf_ip3 = p["d5"] / (c_i + p["d5"])**2
+        alpha_q = p["a2"] * p["d2"] * (p_ip3 + p["d1"]) / (p_ip3 + p["d3"])
+        dalpha_q = p["a2"] * p["d2"] * (p["d3"] - p["d1"]) / (p_ip3 + p["d3"])**2
+
+        c1v1 = p["c1"] * p["v1"]
+        gap = c_ER - c_i
+        prob = (m_inf_ip3**3) * (n_inf_ip3**3) * (q**3)
+        k3_2 = p["k3"]**2
+        dslow_dc = (c1v1 * (3 * n_inf_ip3**2 * dn_inf_ip3 * m_inf_ip3**3 * q**3 * gap - prob)
+                    - p["c1"] * p["v2"]
+                    - p["v3"] * 2 * c_i * k3_2 / (c_i**2 + k3_2)**2)
+        dslow_dp = c1v1 * 3 * m_inf_ip3**2 * dm_inf_ip3 * n_inf_ip3**3 * q**3 * gap
+        dslow_dq = c1v1 * 3 * q**2 * m_inf_ip3**3 * n_inf_ip3**3 * gap
+        dslow_dER = c1v1 * prob + p["c1"] * p["v2"]
+
+        J = np.zeros((6, 6))
+        J[0, 0] = J[0, 1] = dfast_dc * dci
+        J[0, 4] = -dI_Ca_dm * self.inv_zFV
+        J[1, 0] = J[1, 1] = dslow_dc * dci
+        J[1, 2] = dslow_dER
+        J[1, 3] = dslow_dp
+        J[1, 5] = dslow_dq
+        J[2] = -(1.0 / p["c1"]) * J[1]
+        J[3, 3] = -p["tau_p"]
+        J[4, 4] = -1.0 / p["tau_mCa"]
+        J[5, 0] = J[5, 1] = -p["a2"] * q * dci
+        J[5, 3] = dalpha_q * (1.0 - q)
+        J[5, 5] = -alpha_q - p["a2"] * c_i
+
+        dV = np.zeros(6)
+        dV[0] = -dI_Ca_dV * self.inv_zFV
+        dV[4] = m_inf * (1.0 - m_inf) / p["k_mCa"] / p["tau_mCa"]
+
+        # d/d glu of the 0.7-Hill production (infinite slope at 0 -> 0)
+        dglu = np.zeros(6)
+        if glu > 0:
+            a, Ka = glu**0.7, p["k_g"]**0.7
+            dglu[3] = p["v_g"] * 0.7 * a / glu * Ka / (Ka + a)**2
+        return J, dV, dglu
+
     def get_states(self):
         return {
             "c_total": (self.c_fast + self.c_slow) * 1e6,
@@ -1,11 +1,24 @@
 import numpy as np
 
+from models.gating import expm
+
 class CaMKIIDynamics:
     """
     Tewari & Majumdar (2012) — CaMKII phosphorylation model
     Implements equations (28)–(39) exactly as defined in the paper.
     """
 
+    # Packed state order (see get_state / derivatives)
+    STATE_VARS = tuple(f"P{i}" for i in range(11)) + ("ep", "I")
+
+    # Update schemes of the P0..P10 chain for a Ca level frozen over the step:
+    #   "euler"    : forward Euler + clipping (reference)
+    #   "implicit" : backward Euler, (I - dt M) P_new = P
+    #   "exact"    : P_new = expm(dt M) P
+    # M is a rate matrix (columns sum to 0), so the last two keep P >= 0 and
+    # sum(P) = 1 for any dt; v_d is frozen at the start of the step.
+    CHAIN_UPDATES = ("euler", "implicit", "exact")
+
     def __init__(self, params):
         self.p = params
 
@@ -38,6 +51,26 @@ class CaMKIIDynamics:
         self.w[5] = 2.8
         # w0, w1, w9, w10 = 1.0 (zaten öyle)
 
+        # --------------------------------------------------------------
+        # Tridiagonal P0..P10 chain (Eq. 38): dP/dt = M P,
+        #   M = k0 * E0 + v_a * A + v_d * D
+        #   E0: initiation P0 -> P1 (v_phos = k0 * P0, k0 = 10 K1 hill^2)
+        #   A : autophosphorylation P_i -> P_i+1 at w_i   (i = 1..9)
+        #   D : dephosphorylation   P_i -> P_i-1 at i     (i = 1..10)
+        # Stored as the per-state exit-rate bands of A and D.
+        # --------------------------------------------------------------
+        self.up_band = self.w.copy()
+        self.up_band[0] = self.up_band[10] = 0.0
+        self.down_band = np.arange(11, dtype=np.float64)
+        self.update = "euler"
+
+        # Workspace of the scalar step
+        self._up = np.empty(11)
+        self._down = np.empty(11)
+        self._net = np.empty(10)
+        self._dP = np.empty(11)
+        self._M = np.zeros((11, 11))
+
     # ==================================================================
     # CAUTION: c_post burada Molar (M) biriminde olmalı (post-sinaptik Ca²⁺)
     # ==================================================================
@@ -46,55 +79,9 @@ class CaMKIIDynamics:
         P = self.P
 
         # --------------------------------------------------------------
-        # (Hill term) — kullanıldığı yerler: v_phos ve v_a-phos
-        # --------------------------------------------------------------
-        cn = c_post ** p["n_h"]
-        kn = p["k_h"] ** p["n_h"]
-        hill = cn / (kn + cn)
-
-        # --------------------------------------------------------------
-        # (32) Initiation phosphorylation v_phos
-        # --------------------------------------------------------------
-        v_phos = 10.0 * p["K1"] * (hill ** 2) * P[0]
-
-        # --------------------------------------------------------------
-        # (35) Autophosphorylation rate v_a-phos
-        # --------------------------------------------------------------
-        v_a = p["K1"] * hill
-
-        # --------------------------------------------------------------
-        # (37) Dephosphorylation rate v_d-phos
-        # denominator = KM + sum(i * P_i)
+        # (32), (35), (37) Chain rates: k0 (v_phos = k0 * P0), v_a, v_d
         # --------------------------------------------------------------
-        total_phos = np.sum([i * P[i] for i in range(1, 11)])
-        v_d = (p["K2"] * self.ep) / (p["K_M"] + total_phos)
-
-        # --------------------------------------------------------------
-        # (38) dP_i/dt ODE system
-        # --------------------------------------------------------------
-        dP = np.zeros(11)
-
-        # P0
-        dP[0] = -v_phos + v_d * P[1]
-
-        # P1
-        dP[1] = (
-            v_phos
-            - v_d * P[1]
-            - v_a * self.w[1] * P[1]
-            + 2.0 * v_d * P[2]
-        )
-
-        # Pi (i = 2..9)
-        for i in range(2, 10):
-            in_autophos = v_a * self.w[i - 1] * P[i - 1]
-            out_autophos = v_a * self.w[i] * P[i]
-            out_dephos = v_d * i * P[i]
-            in_dephos = v_d * (i + 1) * P[i + 1]
-            dP[i] = in_autophos - out_autophos - out_dephos + in_dephos
-
-        # P10
-        dP[10] = v_a * self.w[9] * P[9] - v_d * 10.0 * P[10]
+        k0, v_a, v_d = self.chain_rates(c_post, P, self.ep)
 
         # --------------------------------------------------------------
         # PP1 ODE (38)
@@ -118,25 +105,107 @@ class CaMKIIDynamics:
         dI_dt = -assoc + dissoc + term_PKA - term_CaN
 
         # --------------------------------------------------------------
-        # State update
+        # State update (in place; clamp to prevent negative concentrations)
         # --------------------------------------------------------------
-        self.P += dt * dP
-        self.ep += dt * dep_dt
-        self.I += dt * dI_dt
+        if self.update == "euler":
+            dP = self.chain_derivative(P, k0, v_a, v_d, out=self._dP)
+            dP *= dt
+            P += dP
+            np.maximum(P, 0.0, out=P)
+        else:
+            self.P = self.chain_propagate(P, k0, v_a, v_d, dt, self.update)
+        self.ep = min(max(self.ep + dt * dep_dt, 0.0), p["ep_0"])
+        self.I = max(self.I + dt * dI_dt, 0.0)
 
-        # Clamp to prevent negative concentrations
-        self.P = np.clip(self.P, 0, None)
-        self.ep = np.clip(self.ep, 0, p["ep_0"])
-        self.I = max(self.I, 0)
+    # ==================================================================
+    # P0..P10 chain kernel (array-safe: P of shape (11,) or (11, k))
+    # ==================================================================
+    def chain_rates(self, c_post, P, ep):
+        """(k0, v_a, v_d) of the chain; c_post in Molar."""
+        p = self.p
+        cn = c_post ** p["n_h"]
+        kn = p["k_h"] ** p["n_h"]
+        hill = cn / (kn + cn)
+        k0 = 10.0 * p["K1"] * (hill ** 2)
+        v_a = p["K1"] * hill
+        total_phos = np.dot(self.down_band[1:], P[1:])   # sum(i * P_i)
+        v_d = (p["K2"] * ep) / (p["K_M"] + total_phos)
+        return k0, v_a, v_d
+
+    def chain_derivative(self, P, k0, v_a, v_d, out=None):
+        """
+        dP/dt = M P via the net flux across each bond of the chain,
+        F_i = up_i P_i - down_i+1 P_i+1: dP_i = F_i-1 - F_i.
+        """
+        if out is None:
+            out = np.empty_like(P, dtype=np.float64)
+        if np.ndim(P) == 1:
+            up, down, net = self._up, self._down, self._net
+            np.multiply(self.up_band, v_a, out=up)
+            np.multiply(self.down_band, v_d, out=down)
+        else:
+            up = self.up_band[:, None] * v_a
+            down = self.down_band[:, None] * v_d
+            net = np.empty((10,) + P.shape[1:])
+        up[0] = k0
+        np.multiply(up, P, out=up)
+        np.multiply(down, P, out=down)
+        np.subtract(up[:-1], down[1:], out=net)
+        out[0] = -net[0]
+        out[10] = net[9]
+        np.subtract(net[:-1], net[1:], out=out[1:10])
+        return out
+
+    def chain_matrix(self, k0, v_a, v_d):
+        """
+        Rate matrix M (dP/dt = M P). Scalar rates: (11, 11) in the step
+        workspace; (k,) rates: stacked (k, 11, 11).
+        """
+        i = np.arange(10)
+        if np.ndim(v_d) == 0:
+            M = self._M
+        else:
+            M = np.zeros(np.shape(v_d) + (11, 11))
+            v_a = np.asarray(v_a)[..., None]
+            v_d = np.asarray(v_d)[..., None]
+            k0 = np.asarray(k0)
+        up = self.up_band * v_a
+        up[..., 0] = k0
+        down = self.down_band * v_d
+        M[..., i + 1, i] = up[..., :-1]
+        M[..., i, i + 1] = down[..., 1:]
+        M[..., np.arange(11), np.arange(11)] = -(up + down)
+        return M
+
+    def chain_propagate(self, P, k0, v_a, v_d, dt, method="exact"):
+        """P after dt with M frozen: "implicit" or "exact" (see CHAIN_UPDATES)."""
+        M = self.chain_matrix(k0, v_a, v_d)
+        if method == "implicit":
+            A = np.eye(11) - dt * M
+        elif method == "exact":
+            A = expm(dt * M)
+        else:
+            raise ValueError(f"Bilinmeyen CaMKII güncellemesi: {method!r} (seçenekler: implicit, exact)")
+        if np.ndim(P) == 1:
+            P_new = np.linalg.solve(A, P) if method == "implicit" else A @ P
+        else:
+            # Batched over the trailing member axis
+            Pk = P.T[..., None]
+            P_new = (np.linalg.solve(A, Pk) if method == "implicit" else A @ Pk)[..., 0].T
+        # Roundoff only; both schemes keep P >= 0
+        return np.maximum(P_new, 0.0)
 
     # ==================================================================
     # (39) Sigmoidal α-modulation (NO effect on presynaptic α increase)
     # ==================================================================
-    def get_alpha_modulation(self):
+    def get_alpha_modulation(self, P=None):
+        """P: optional P0..P10 array (packed state slice); defaults to self.P."""
         p = self.p
+        if P is None:
+            P = self.P
 
         # 1. Adım: Fosforile olmuş alt birimlerin KESRİNİ topla (0.0 ile 1.0 arası bir sayı çıkar)
-        fraction_P = np.sum(self.P[1:])
+        fraction_P = np.sum(P[1:], axis=0)
 
         # 2. Adım: Bunu Molariteye çevir (ÇÜNKÜ P_half PARAMETRESİ MOLAR CİNSİNDEN!)
         # Kesir * Toplam Konsantrasyon = Anlık Molar Değer
@@ -147,8 +216,111 @@ class CaMKIIDynamics:
         exponent = -((total_P_molar - p["P_half"]) / p["k_half"])
         
         # Matematiksel hata (overflow) olmasın diye sınırla
-        exponent = np.clip(exponent, -50, 50)
+        if np.ndim(exponent) == 0:
+            exponent = min(max(exponent, -50.0), 50.0)   # np.clip is slow on scalars
+        else:
+            exponent = np.clip(exponent, -50, 50)
 
         k_syt_eff = p["k_syt"] / (1.0 + np.exp(exponent))
 
-        return k_syt_eff
\ No newline at end of file
+        return k_syt_eff
+
+    # ==================================================================
+    # Packed State API
+    # ==================================================================
+    def get_state(self):
+        return np.concatenate([self.P, [self.ep, self.I]]).astype(np.float64)
+
+    def set_state(self, y):
+        self.P = np.array(y[:11], dtype=np.float64)
+        self.ep = float(y[11])
+        self.I = float(y[12])
+
+    def derivatives(self, y, c_post, out=None):
+        """
+        Pure right-hand side dy/dt (SI, per second) for
+        y = [P0..P10, ep, I], shape (13,) or (13, k). c_post in Molar.
+        """
+        p = self.p
+        P, ep, I = y[:11], y[11], y[12]
+
+        if out is None:
+            out = np.empty_like(y, dtype=np.float64)
+        k0, v_a, v_d = self.chain_rates(c_post, P, ep)
+        self.chain_derivative(P, k0, v_a, v_d, out=out[:11])
+
+        assoc = p["k_F"] * I * ep
+        dissoc = p["k_B"] * (p["ep_0"] - ep)
+        hill_can = (c_post ** 3) / (p["k_h2"] ** 3 + c_post ** 3)
+        term_PKA = p["v_PKA"] * (p["I_0"] / (p["I_0"] + p["K_PKA"]))
+
+        out[11] = -assoc + dissoc + p["k_I"] * p["I_0"]
+        out[12] = -assoc + dissoc + term_PKA - p["v_CaN"] * I * hill_can
+        return out
+
+    def jacobian(self, y, c_post):
+        """
+        Analytic Jacobian of derivatives() (SI, per second) at a single state
+        y of shape (13,). Returns (J, dc): J of shape (13, 13) and the (13,)
+        partial w.r.t. c_post (Molar).
+        """
+        p = self.p
+        P, ep, I = y[:11], y[11], y[12]
+        w = self.w
+        idx = np.arange(11, dtype=np.float64)
+
+        n, k = p["n_h"], p["k_h"]
+        cn = c_post ** n
+        hill = cn / (k ** n + cn)
+        dhill = n * c_post ** (n - 1) * k ** n / (k ** n + cn) ** 2 if c_post > 0 else 0.0
+        v_a = p["K1"] * hill
+        denom = p["K_M"] + np.dot(idx[1:], P[1:])
+        v_d = p["K2"] * ep / denom
+
+        J = np.zeros((13, 13))
+        dc = np.zeros(13)
+        dP = J[:11, :11]
+
+        # Autophosphorylation: P0 -> P1 at 10*K1*hill^2, P_i -> P_i+1 at v_a*w_i
+        dP[0, 0] -= 10.0 * p["K1"] * hill ** 2
+        dP[1, 0] += 10.0 * p["K1"] * hill ** 2
+        dv_phos = 20.0 * p["K1"] * hill * dhill * P[0]
+        dc[0] -= dv_phos
+        dc[1] += dv_phos
+        for i in range(1, 10):
+            dP[i, i] -= v_a * w[i]
+            dP[i + 1, i] += v_a * w[i]
+            flux = p["K1"] * dhill * w[i] * P[i]
+            dc[i] -= flux
+            dc[i + 1] += flux
+
+        # Dephosphorylation: P_i -> P_i-1 at v_d*i, v_d depends on sum(i*P_i) and ep
+        D = -idx * P
+        D[:-1] += idx[1:] * P[1:]
+        for i in range(1, 11):
+            dP[i, i] -= v_d * i
+            dP[i - 1, i] += v_d * i
+        J[:11, :11] += np.outer(D, -v_d / denom * idx)
+        J[:11, 11] = D * p["K2"] / denom
+
+        # ep, I
+        hill_can = (c_post ** 3) / (p["k_h2"] ** 3 + c_post ** 3)
+        dhill_can = 3 * c_post ** 2 * p["k_h2"] ** 3 / (p["k_h2"] ** 3 + c_post ** 3) ** 2
+        J[11, 11] = -p["k_F"] * I - p["k_B"]
+        J[11, 12] = -p["k_F"] * ep
+        J[12, 11] = -p["k_F"] * I - p["k_B"]
+        J[12, 12] = -p["k_F"] * ep - p["v_CaN"] * hill_can
+        dc[12] = -p["v_CaN"] * I * dhill_can
+        return J, dc
+
+    def alpha_modulation_slope(self, P=None):
+        """d(get_alpha_modulation)/dP for P0..P10, shape (11,)."""
+        p = self.p
+        if P is None:
+            P = self.P
+        exponent = -((np.sum(P[1:]) * p["e_k"] - p["P_half"]) / p["k_half"])
+        slope = np.zeros(11)
+        if -50 < exponent < 50:
+            ex = np.exp(exponent)
+            slope[1:] = p["k_syt"] * ex / (1.0 + ex) ** 2 * p["e_k"] / p["k_half"]
+        return slope
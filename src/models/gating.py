@@ -0,0 +1,50 @@
+import numpy as np
+
+
+def exp_relax(x, x_inf, rate, dt):
+    """
+    Exact solution of dx/dt = rate * (x_inf - x) over dt with x_inf and
+    rate frozen at the start of the step. Array-safe.
+    """
+    return x_inf + (x - x_inf) * np.exp(-rate * dt)
+
+
+def exp_gate(x, alpha, beta, dt):
+    """
+    Rush–Larsen update of a gate dx/dt = alpha * (1 - x) - beta * x.
+    Stays inside [0, 1] for any dt, so no clipping is needed.
+    Array-safe; alpha + beta must be positive.
+    """
+    rate = alpha + beta
+    return exp_relax(x, alpha / rate, rate, dt)
+
+
+# Padé (6, 6) coefficients of exp(x)
+_PADE6 = (1.0, 1 / 2, 5 / 44, 1 / 66, 1 / 792, 1 / 15840, 1 / 665280)
+
+
+def expm(A):
+    """
+    Matrix exponential of A, shape (n, n) or stacked (..., n, n), by
+    scaling and squaring of the (6, 6) Padé approximant. Exact solution
+    operator of the linear system dx/dt = M x over dt for A = M * dt.
+    """
+    A = np.asarray(A, dtype=np.float64)
+    norm = np.max(np.sum(np.abs(A), axis=-2))
+    s = max(0, int(np.ceil(np.log2(norm / 0.5)))) if norm > 0 else 0
+    A = A / 2.0 ** s
+    eye = np.broadcast_to(np.eye(A.shape[-1]), A.shape)
+    power = eye
+    U = np.zeros_like(A)   # odd terms
+    V = np.zeros_like(A)   # even terms
+    for k, c in enumerate(_PADE6):
+        if k:
+            power = power @ A
+        if k % 2:
+            U += c * power
+        else:
+            V += c * power
+    E = np.linalg.solve(V - U, V + U)
+    for _ in range(s):
+        E = E @ E
+    return E
@@ -2,12 +2,18 @@
 
 import numpy as np
 
+from models.gating import exp_gate
+
 class GliatransmitterDynamics:
     """
     Tewari & Majumdar (2012) – Astrocyte Gliotransmitter Release
     Implements Equations (13), (14), (15) EXACTLY as written.
+    Units: SI (Molar, Seconds) – c_a, G_a and the parameters alike.
     """
 
+    # Packed state order (see get_state / derivatives)
+    STATE_VARS = ("O1", "O2", "O3", "R_a", "E_a", "G_a")
+
     def __init__(self, params):
         self.p = params
 
@@ -23,6 +29,9 @@ class GliatransmitterDynamics:
         # --- Extracellular glutamate (not in paper; analogue of Eq. 9) ---
         self.G_a = 0.0
 
+        # True: Rush–Larsen updates for O1..O3 (models.gating)
+        self.exp_gates = False
+
     def step(self, dt, c_a):
         p = self.p
 
@@ -34,10 +43,15 @@ class GliatransmitterDynamics:
         dO2 = p['k2_plus'] * c_a - (p['k2_plus'] * c_a + p['k2_minus']) * self.O2
         dO3 = p['k3_plus'] * c_a - (p['k3_plus'] * c_a + p['k3_minus']) * self.O3
 
-        # Euler update
-        self.O1 = np.clip(self.O1 + dt * dO1, 0, 1)
-        self.O2 = np.clip(self.O2 + dt * dO2, 0, 1)
-        self.O3 = np.clip(self.O3 + dt * dO3, 0, 1)
+        if self.exp_gates:
+            self.O1 = exp_gate(self.O1, p['k1_plus'] * c_a, p['k1_minus'], dt)
+            self.O2 = exp_gate(self.O2, p['k2_plus'] * c_a, p['k2_minus'], dt)
+            self.O3 = exp_gate(self.O3, p['k3_plus'] * c_a, p['k3_minus'], dt)
+        else:
+            # Euler update
+            self.O1 = np.clip(self.O1 + dt * dO1, 0, 1)
+            self.O2 = np.clip(self.O2 + dt * dO2, 0, 1)
+            self.O3 = np.clip(self.O3 + dt * dO3, 0, 1)
 
         # =============================================================
         # 2. RELEASE PROBABILITY (Eq. 14)
@@ -50,7 +64,8 @@ class GliatransmitterDynamics:
         # =============================================================
         I_a = 1.0 - self.R_a - self.E_a
 
-        Theta = 1.0 if c_a > p['C_a_thresh'] else 0.0
+        # Above threshold release runs at k_rel_a * f_r_a (Eq. 15 in 1/ms)
+        Theta = p['k_rel_a'] if c_a > p['C_a_thresh'] else 0.0
 
         dRa = (I_a / p['tau_rec_a']) - Theta * f_r_a * self.R_a
         dEa = -(self.E_a / p['tau_inac_a']) + Theta * f_r_a * self.R_a
@@ -66,3 +81,67 @@ class GliatransmitterDynamics:
         self.G_a = max(self.G_a + dt * dGa, 0.0)
 
         return self.G_a
+
+    # =============================================================
+    # Packed State API
+    # =============================================================
+    def get_state(self):
+        return np.array([self.O1, self.O2, self.O3,
+                         self.R_a, self.E_a, self.G_a], dtype=np.float64)
+
+    def set_state(self, y):
+        (self.O1, self.O2, self.O3,
+         self.R_a, self.E_a, self.G_a) = (float(v) for v in y)
+
+    def derivatives(self, y, c_a, out=None):
+        """
+        Pure right-hand side dy/dt (per s) for
+        y = [O1, O2, O3, R_a, E_a, G_a], shape (6,) or (6, k). c_a in M.
+        """
+        p = self.p
+        O1, O2, O3, R_a, E_a, G_a = y[0], y[1], y[2], y[3], y[4], y[5]
+
+        if out is None:
+            out = np.empty_like(y, dtype=np.float64)
+        # Eq. 13
+        out[0] = p['k1_plus'] * c_a - (p['k1_plus'] * c_a + p['k1_minus']) * O1
+        out[1] = p['k2_plus'] * c_a - (p['k2_plus'] * c_a + p['k2_minus']) * O2
+        out[2] = p['k3_plus'] * c_a - (p['k3_plus'] * c_a + p['k3_minus']) * O3
+
+        # Eq. 14, 15
+        release = np.where(c_a > p['C_a_thresh'], p['k_rel_a'] * O1 * O2 * O3 * R_a, 0.0)
+        I_a = 1.0 - R_a - E_a
+        out[3] = (I_a / p['tau_rec_a']) - release
+        out[4] = -(E_a / p['tau_inac_a']) + release
+        out[5] = (p['n_a_v'] * p['g_a_v'] * E_a) - (p['g_a_c'] * G_a)
+        return out
+
+    def jacobian(self, y, c_a):
+        """
+        Analytic Jacobian of derivatives() (per s) at a single state y of
+        shape (6,). Returns (J, dc): J of shape (6, 6) and the (6,) partial
+        w.r.t. c_a (M). The release threshold is a step; its slope is 0.
+        """
+        p = self.p
+        O, R_a = y[:3], y[3]
+        gate = p['k_rel_a'] if c_a > p['C_a_thresh'] else 0.0
+
+        J = np.zeros((6, 6))
+        dc = np.zeros(6)
+        # Eq. 13
+        for j in range(3):
+            k_plus, k_minus = p[f'k{j + 1}_plus'], p[f'k{j + 1}_minus']
+            J[j, j] = -(k_plus * c_a + k_minus)
+            dc[j] = k_plus * (1.0 - O[j])
+
+        # Eq. 14, 15 – release = k_rel_a*O1*O2*O3*R_a above threshold
+        d_release = gate * np.array([O[1] * O[2] * R_a, O[0] * O[2] * R_a,
+                                     O[0] * O[1] * R_a, O[0] * O[1] * O[2]])
+        J[3, :4] = -d_release
+        J[4, :4] = d_release
+        J[3, 3] -= 1.0 / p['tau_rec_a']
+        J[3, 4] = -1.0 / p['tau_rec_a']
+        J[4, 4] = -1.0 / p['tau_inac_a']
+        J[5, 4] = p['n_a_v'] * p['g_a_v']
+        J[5, 5] = -p['g_a_c']
+        return J, dc
@@ -1,5 +1,7 @@
 import numpy as np
 
+from models.gating import exp_gate, exp_relax
+
 class PresynapticHH:
     """
     Tewari & Majumdar (2012) - Hodgkin-Huxley Modeli.
@@ -9,6 +11,12 @@ class PresynapticHH:
     Makale ile birebir uyum (Spike genliğinin +40 mV olması) için 
     alpha/beta fonksiyonlarındaki voltaj shift değeri +65'ten +70'e çekilmiştir.
     """
+    # Packed state order (see get_state / derivatives)
+    STATE_VARS = ("V", "m", "h", "n")
+
+    # Lookup tables (models.rate_tables): name -> (exact, lo, hi, step, scale)
+    RATE_TABLES = {"gates": ("exact_gate_rates", -100.0, 60.0, 0.05, "linear")}  # mV
+
     def __init__(self, params):
         self.p = params
         
@@ -18,6 +26,13 @@ class PresynapticHH:
         self.h = self.p.get("h_init", 0.6)
         self.n = self.p.get("n_init", 0.32)
 
+        # True: Rush–Larsen gate updates (models.gating) instead of Euler;
+        # V then relaxes exactly for the conductances frozen over the step
+        self.exp_gates = False
+
+        # RateTable of the six gate rates over V, or None (exact)
+        self.gates_table = None
+
     # --- Yardımcı Gating Fonksiyonları (Alpha/Beta) ---
     # Not: Tewari (2012) -70 mV bazlı çalıştığı için V + 70 kullanıldı.
     
@@ -69,22 +84,35 @@ class PresynapticHH:
         return 0.0
 
     # --- Ana Adım Fonksiyonu (Step) ---
-    def step(self, dt, t, I_inj=0.0):
+    def step(self, dt, t, I_inj=0.0, drive=None):
         """
         dt: Zaman adımı (ms)
         t: Şu anki zaman (ms)
         I_inj: Dışarıdan enjekte edilen ek akım (uA/cm2) [HFS için]
+        drive: toplam uygulanan akım (uA/cm2), derlenmiş uyarı programından
+               (simulation.stimulus); verilirse iç darbe dizisi ve I_inj yerine geçer.
         """
         V = self.V
+        if self.gates_table is not None:
+            a_m, b_m, a_h, b_h, a_n, b_n = self.gates_table(V)
+        else:
+            a_m, b_m = self.alpha_m(V), self.beta_m(V)
+            a_h, b_h = self.alpha_h(V), self.beta_h(V)
+            a_n, b_n = self.alpha_n(V), self.beta_n(V)
         
         # 1. Gating Değişkenlerini Güncelle
-        dm = (self.alpha_m(V) * (1 - self.m)) - (self.beta_m(V) * self.m)
-        dh = (self.alpha_h(V) * (1 - self.h)) - (self.beta_h(V) * self.h)
-        dn = (self.alpha_n(V) * (1 - self.n)) - (self.beta_n(V) * self.n)
-        
-        self.m += dt * dm
-        self.h += dt * dh
-        self.n += dt * dn
+        if self.exp_gates:
+            self.m = exp_gate(self.m, a_m, b_m, dt)
+            self.h = exp_gate(self.h, a_h, b_h, dt)
+            self.n = exp_gate(self.n, a_n, b_n, dt)
+        else:
+            dm = (a_m * (1 - self.m)) - (b_m * self.m)
+            dh = (a_h * (1 - self.h)) - (b_h * self.h)
+            dn = (a_n * (1 - self.n)) - (b_n * self.n)
+
+            self.m += dt * dm
+            self.h += dt * dh
+            self.n += dt * dn
 
         # 2. Akımları Hesapla
         I_Na = self.p["g_Na"] * (self.m**3) * self.h * (V - self.p["V_Na"])
@@ -92,10 +120,118 @@ class PresynapticHH:
         I_L  = self.p["g_L"]  * (V - self.p["V_L"])
         
         # Kendi iç akımı + Dışarıdan gelen HFS akımı
-        I_app_total = self.get_applied_current(t) + I_inj
+        if drive is None:
+            I_app_total = self.get_applied_current(t) + I_inj
+        else:
+            I_app_total = drive
 
         # 3. Voltajı Güncelle
-        dV = (I_app_total - I_Na - I_K - I_L) / self.p["C_m"]
-        self.V += dt * dV
+        if self.exp_gates:
+            g_Na = self.p["g_Na"] * (self.m**3) * self.h
+            g_K = self.p["g_K"] * (self.n**4)
+            g_total = g_Na + g_K + self.p["g_L"]
+            V_inf = (I_app_total + g_Na * self.p["V_Na"] + g_K * self.p["V_K"]
+                     + self.p["g_L"] * self.p["V_L"]) / g_total
+            self.V = exp_relax(V, V_inf, g_total / self.p["C_m"], dt)
+        else:
+            dV = (I_app_total - I_Na - I_K - I_L) / self.p["C_m"]
+            self.V += dt * dV
         
-        return self.V
\ No newline at end of file
+        return self.V
+
+    # --- Packed State API ---
+    def get_state(self):
+        return np.array([self.V, self.m, self.h, self.n], dtype=np.float64)
+
+    def set_state(self, y):
+        self.V, self.m, self.h, self.n = (float(v) for v in y)
+
+    def gate_rates(self, V):
+        """
+        Array-safe (alpha, beta) pairs for m, h, n.
+        V may be a float or an ndarray (mV). Uses gates_table when set.
+        """
+        if self.gates_table is not None:
+            a_m, b_m, a_h, b_h, a_n, b_n = self.gates_table(V)
+            return (a_m, b_m), (a_h, b_h), (a_n, b_n)
+        return self._gate_rate_pairs(V)
+
+    def exact_gate_rates(self, V):
+        """(a_m, b_m, a_h, b_h, a_n, b_n), always evaluated exactly."""
+        (a_m, b_m), (a_h, b_h), (a_n, b_n) = self._gate_rate_pairs(V)
+        return a_m, b_m, a_h, b_h, a_n, b_n
+
+    def _gate_rate_pairs(self, V):
+        u = V + 70.0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            denom_n = np.exp((10 - u) / 10) - 1
+            denom_m = np.exp((25 - u) / 10) - 1
+            a_n = np.where(np.abs(denom_n) < 1e-9, 0.1, 0.01 * (10 - u) / denom_n)
+            a_m = np.where(np.abs(denom_m) < 1e-9, 1.0, 0.1 * (25 - u) / denom_m)
+        b_n = 0.125 * np.exp(-u / 80)
+        b_m = 4.0 * np.exp(-u / 18)
+        a_h = 0.07 * np.exp(-u / 20)
+        b_h = 1.0 / (np.exp((30 - u) / 10) + 1)
+        return (a_m, b_m), (a_h, b_h), (a_n, b_n)
+
+    def gate_rate_slopes(self, V):
+        """d(alpha)/dV and d(beta)/dV for m, h, n (per ms per mV)."""
+        u = V + 70.0
+
+        def _slope(x):
+            # d/dx [x / (e^x - 1)], -1/2 at the removable singularity
+            ex = np.exp(x)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                s = ((ex - 1) - x * ex) / (ex - 1) ** 2
+            return np.where(np.abs(x) < 1e-6, -0.5, s)
+
+        da_m = -0.1 * _slope((25 - u) / 10)
+        da_n = -0.01 * _slope((10 - u) / 10)
+        db_m = -4.0 / 18 * np.exp(-u / 18)
+        da_h = -0.07 / 20 * np.exp(-u / 20)
+        z = np.exp((30 - u) / 10)
+        db_h = 0.1 * z / (z + 1) ** 2
+        db_n = -0.125 / 80 * np.exp(-u / 80)
+        return (da_m, db_m), (da_h, db_h), (da_n, db_n)
+
+    def derivatives(self, t, y, I_inj=0.0, out=None, drive=None):
+        """
+        Pure right-hand side dy/dt (per ms) for y = [V, m, h, n].
+        y may have shape (4,) or (4, k); the model's own state is untouched.
+        drive: total applied current, replacing the pulse train and I_inj.
+        """
+        p = self.p
+        V, m, h, n = y[0], y[1], y[2], y[3]
+        (a_m, b_m), (a_h, b_h), (a_n, b_n) = self.gate_rates(V)
+
+        I_Na = p["g_Na"] * (m**3) * h * (V - p["V_Na"])
+        I_K  = p["g_K"]  * (n**4) * (V - p["V_K"])
+        I_L  = p["g_L"]  * (V - p["V_L"])
+        I_app_total = self.get_applied_current(t) + I_inj if drive is None else drive
+
+        if out is None:
+            out = np.empty_like(y, dtype=np.float64)
+        out[0] = (I_app_total - I_Na - I_K - I_L) / p["C_m"]
+        out[1] = a_m * (1 - m) - b_m * m
+        out[2] = a_h * (1 - h) - b_h * h
+        out[3] = a_n * (1 - n) - b_n * n
+        return out
+
+    def jacobian(self, t, y):
+        """Analytic d(dy/dt)/dy (per ms), shape (4, 4), for y = [V, m, h, n]."""
+        p = self.p
+        V, m, h, n = y
+        (a_m, b_m), (a_h, b_h), (a_n, b_n) = self.gate_rates(V)
+        (da_m, db_m), (da_h, db_h), (da_n, db_n) = self.gate_rate_slopes(V)
+
+        J = np.zeros((4, 4))
+        J[0, 0] = -(p["g_Na"] * m**3 * h + p["g_K"] * n**4 + p["g_L"]) / p["C_m"]
+        J[0, 1] = -3 * p["g_Na"] * m**2 * h * (V - p["V_Na"]) / p["C_m"]
+        J[0, 2] = -p["g_Na"] * m**3 * (V - p["V_Na"]) / p["C_m"]
+        J[0, 3] = -4 * p["g_K"] * n**3 * (V - p["V_K"]) / p["C_m"]
+        for i, (x, a, b, da, db) in enumerate(((m, a_m, b_m, da_m, db_m),
+                                                (h, a_h, b_h, da_h, db_h),
+                                                (n, a_n, b_n, da_n, db_n)), start=1):
+            J[i, 0] = da * (1 - x) - db * x
+            J[i, i] = -(a + b)
+        return J
@@ -1,5 +1,7 @@
 import numpy as np
 
+from models.gating import exp_gate
+
 class PostSynapticDynamics:
     """
     Tewari & Majumdar (2012) – Post-Synaptic Membrane Potential
@@ -13,6 +15,9 @@ class PostSynapticDynamics:
     - Conductance: Siemens (S)
     """
 
+    # Packed state order (see get_state / derivatives)
+    STATE_VARS = ("V_post", "m_AMPA")
+
     def __init__(self, params):
         self.p = params
         
@@ -21,10 +26,13 @@ class PostSynapticDynamics:
         self.m_AMPA = 0.0       # AMPA gating variable (0-1)
         self.I_AMPA = 0.0       # Recorded current for Calcium model
 
-    def step(self, dt, g_syn_uM, I_soma_injected=0.0):
+        # True: Rush–Larsen update for m_AMPA (models.gating)
+        self.exp_gates = False
+
+    def step(self, dt, g_syn, I_soma_injected=0.0):
         """
         dt: Time step in SECONDS (s)
-        g_syn_uM: Synaptic Glutamate in MicroMolar (µM)
+        g_syn: Synaptic Glutamate in Molar (M)
         I_soma_injected: External current in Amperes (A)
         """
         p = self.p
@@ -37,25 +45,16 @@ class PostSynapticDynamics:
         # dm/dt = alpha * g * (1-m) - beta * m
         # ---------------------------------------------------------
         
-        # Glutamate Concentration:
-        # Destexhe modeli genelde mM (MiliMolar) glutamat ile çalışır.
-        # Gelen g_syn_uM (µM) -> mM'a çevirelim.
-        g_conc_mM = g_syn_uM * 1e-3
-        
-        # Alpha/Beta birimleri (mM^-1 ms^-1 veya M^-1 s^-1) çok kritiktir.
-        # Parametre dosyasındaki değerlere göre (Destexhe):
-        # alpha ~ 1.1e6 M^-1 s^-1 = 1100 mM^-1 s^-1
-        # beta ~ 190 s^-1
-        # Biz burada parametrelerin SI (Molar, Saniye) olduğunu varsayıyoruz.
-        
-        # Eğer parametreler SI ise g_conc Molar olmalı:
-        g_conc_M = g_syn_uM * 1e-6 
-        
-        dm_dt = p['alpha_AMPA'] * g_conc_M * (1.0 - m) - p['beta_AMPA'] * m
-        
+        # Alpha/Beta birimleri (Destexhe) SI: alpha ~ 1.1e6 M^-1 s^-1,
+        # beta ~ 190 s^-1; glutamat da Molar geliyor, dönüşüm yok.
+
         # Update gating variable
-        m += dt * dm_dt
-        m = np.clip(m, 0.0, 1.0)
+        if self.exp_gates:
+            m = exp_gate(m, p['alpha_AMPA'] * g_syn, p['beta_AMPA'], dt)
+        else:
+            dm_dt = p['alpha_AMPA'] * g_syn * (1.0 - m) - p['beta_AMPA'] * m
+            m += dt * dm_dt
+            m = np.clip(m, 0.0, 1.0)
         self.m_AMPA = m
         I_AMPA = p['g_AMPA'] * m * (V - p['V_AMPA'])
         self.I_AMPA = I_AMPA # Save for calcium model
@@ -67,4 +66,48 @@ class PostSynapticDynamics:
         # Update Voltage
         self.V_post += dt * dV_dt
         
-        return self.V_post
\ No newline at end of file
+        return self.V_post
+
+    # ---------------------------------------------------------
+    # Packed State API
+    # ---------------------------------------------------------
+    def get_state(self):
+        return np.array([self.V_post, self.m_AMPA], dtype=np.float64)
+
+    def set_state(self, y):
+        self.V_post, self.m_AMPA = (float(v) for v in y)
+
+    def ampa_current(self, y):
+        """I_AMPA (A) for y = [V_post, m_AMPA]."""
+        p = self.p
+        return p['g_AMPA'] * y[1] * (y[0] - p['V_AMPA'])
+
+    def derivatives(self, y, g_syn, I_soma_injected=0.0, out=None):
+        """
+        Pure right-hand side dy/dt (SI, per second) for
+        y = [V_post, m_AMPA], shape (2,) or (2, k). g_syn in M.
+        """
+        p = self.p
+        V, m = y[0], y[1]
+        I_AMPA = self.ampa_current(y)
+
+        if out is None:
+            out = np.empty_like(y, dtype=np.float64)
+        out[0] = (-(V - p['V_rest']) - p['R_m'] * (I_soma_injected + I_AMPA)) / p['tau_post']
+        out[1] = p['alpha_AMPA'] * g_syn * (1.0 - m) - p['beta_AMPA'] * m
+        return out
+
+    def jacobian(self, y, g_syn):
+        """
+        Analytic Jacobian of derivatives() (SI, per second) at a single state
+        y of shape (2,). Returns (J, dg): J of shape (2, 2) and the (2,)
+        partial w.r.t. g_syn (M).
+        """
+        p = self.p
+        V, m = y
+        J = np.zeros((2, 2))
+        J[0, 0] = (-1.0 - p['R_m'] * p['g_AMPA'] * m) / p['tau_post']
+        J[0, 1] = -p['R_m'] * p['g_AMPA'] * (V - p['V_AMPA']) / p['tau_post']
+        J[1, 1] = -p['alpha_AMPA'] * g_syn - p['beta_AMPA']
+        dg = np.array([0.0, p['alpha_AMPA'] * (1.0 - m)])
+        return J, dg
@@ -5,6 +5,9 @@ class PostSynapticCalciumDynamics:
     Tewari & Majumdar (2012) - Post-Sinaptik Kalsiyum (Section 2.9)
     Denklemler: 20 - 27
     """
+    # Packed state order (see get_state / derivatives)
+    STATE_VARS = ("c_post",)
+
     def __init__(self, params):
         self.p = params
         
@@ -83,4 +86,56 @@ class PostSynapticCalciumDynamics:
         # Negatiflik kontrolü
         self.c_post = max(self.c_post, 1e-9) 
         
-        return self.c_post
\ No newline at end of file
+        return self.c_post
+
+    # =================================================================
+    # Packed State API
+    # =================================================================
+    def get_state(self):
+        return np.array([self.c_post], dtype=np.float64)
+
+    def set_state(self, y):
+        self.c_post = float(y[0])
+
+    def derivatives(self, y, V_post, I_AMPA, N_open=None, out=None):
+        """
+        Pure right-hand side dy/dt (SI, per second) for y = [c_post],
+        shape (1,) or (1, k).
+        N_open: open R-type channel count. None -> mean field
+        N_R * P_open above -30 mV (deterministic, unlike step()).
+        """
+        p = self.p
+        c_post = y[0]
+        if N_open is None:
+            N_open = np.where(V_post > -0.030, p['N_R'] * p['P_open'], 0.0)
+
+        i_R = p['g_R'] * N_open * (V_post - p['V_R'])
+        S_pump = p['k_s'] * (c_post - p['c_post_rest'])
+        f_c = -(p['eta'] * I_AMPA + i_R) * self.alpha_conv - S_pump
+        theta = p['b_t'] * p['K_endo'] / (p['K_endo'] + c_post)**2
+
+        if out is None:
+            out = np.empty_like(y, dtype=np.float64)
+        out[0] = f_c / (1.0 + theta)
+        return out
+
+    def jacobian(self, y, V_post, I_AMPA, N_open=None):
+        """
+        Analytic Jacobian of derivatives() (SI, per second) at a single state
+        y of shape (1,). Returns (J, dV, dI): J of shape (1, 1) and the (1,)
+        partials w.r.t. V_post and I_AMPA. The channel count is held fixed.
+        """
+        p = self.p
+        c_post = y[0]
+        if N_open is None:
+            N_open = p['N_R'] * p['P_open'] if V_post > -0.030 else 0.0
+
+        i_R = p['g_R'] * N_open * (V_post - p['V_R'])
+        f_c = -(p['eta'] * I_AMPA + i_R) * self.alpha_conv - p['k_s'] * (c_post - p['c_post_rest'])
+        theta = p['b_t'] * p['K_endo'] / (p['K_endo'] + c_post)**2
+        dtheta = -2.0 * p['b_t'] * p['K_endo'] / (p['K_endo'] + c_post)**3
+
+        J = np.array([[(-p['k_s'] * (1.0 + theta) - f_c * dtheta) / (1.0 + theta)**2]])
+        dV = np.array([-p['g_R'] * N_open * self.alpha_conv / (1.0 + theta)])
+        dI = np.array([-p['eta'] * self.alpha_conv / (1.0 + theta)])
+        return J, dV, dI
@@ -1,75 +1,183 @@
+import math
+
 import numpy as np
 
+from models.gating import expm
+
+
+def _sensor_field(i):
+    """Attribute view of entry i of the packed sensor array."""
+    def get(self):
+        return self.s[i]
+
+    def set(self, value):
+        self.s[i] = value
+    return property(get, set)
+
+
 class GlutamateDynamics:
     """
     Tewari & Majumdar (2012) – Glutamate Release (Equations 6, 7, 8)
     Fully paper-accurate implementation. NO MATLAB assumptions.
+    Units: SI (Molar, Seconds) – c_i, g and the parameters alike.
     """
 
+    # Packed state order (see get_state / derivatives)
+    STATE_VARS = ("s0", "s1", "s2", "s3", "s4", "s5", "s_star", "R", "E", "g")
+
+    # Lookup tables (models.rate_tables): name -> (exact, lo, hi, step, scale)
+    RATE_TABLES = {"spont": ("exact_spontaneous_rate", 0.0, 200e-6, 1e-8, "linear")}  # M
+
+    # Ca2+ sensor updates (Eq. 6 is linear in s for a frozen c_i):
+    #   "euler" : forward Euler + clipping (reference; needs 5*alpha*c*dt < 1)
+    #   "exact" : s <- expm(dt * S(alpha*c)) s with the 7x7 generator S,
+    #             cached per quantized on-rate alpha*c; mass-conserving and
+    #             non-negative at any dt, no clipping.
+    SENSOR_UPDATES = ("euler", "exact")
+
+    # Propagator cache: log-spaced on-rate bins (relative width) and size cap
+    SENSOR_RATE_QUANTUM = 1e-3
+    SENSOR_CACHE_SIZE = 65536
+
+    s0, s1, s2, s3, s4, s5, s_star = (_sensor_field(i) for i in range(7))
+
     def __init__(self, params):
         self.p = params
 
-        # State variables for Ca2+ sensor (Eq. 6)
-        self.s0 = 1.0
-        self.s1 = 0.0
-        self.s2 = 0.0
-        self.s3 = 0.0
-        self.s4 = 0.0
-        self.s5 = 0.0
-        self.s_star = 0.0    # X(ci)5* – isomer ready for release
+        # Ca2+ sensor (Eq. 6): s0..s5 and s_star (X(ci)5*, isomer ready for
+        # release), one array; the attributes above are views into it
+        self.s = np.zeros(7)
+        self.s[0] = 1.0
+        self.sensor_update = "euler"
+        self._sensor_cache = {}
+        self._sensor_dt = None
 
         # Vesicle fractions (Eq. 8)
         self.R = 1.0     # releasable
         self.E = 0.0     # effective (released into cleft)
-        self.g = 0.0     # glutamate in cleft (µM)
+        self.g = 0.0     # glutamate in cleft (M)
+
+        # RateTable of spontaneous_rate over c_i, or None (exact)
+        self.spont_table = None
+
+    def spontaneous_rate(self, c):
+        """λ(c) of Eq. 7 (per s); c in M, already clamped at 0."""
+        if self.spont_table is not None:
+            return self.spont_table(c)
+        return self.exact_spontaneous_rate(c)
+
+    def exact_spontaneous_rate(self, c):
+        p = self.p
+        return p['a3'] / (1.0 + np.exp((p['a1'] - c) / p['a2']))
+
+    # ----------------------------------------------------------------------
+    # Linear sensor propagator (Eq. 6)
+    # ----------------------------------------------------------------------
+    def sensor_matrix(self, k):
+        """
+        Generator S of ds/dt = S s for the on-rate k = alpha * c (per s);
+        shape (7, 7), or (..., 7, 7) for array k. Columns sum to zero.
+        """
+        p = self.p
+        k = np.asarray(k, dtype=np.float64)
+        S = np.zeros(k.shape + (7, 7))
+        for i in range(5):
+            kf = (5 - i) * k
+            kb = (i + 1) * p['beta']
+            S[..., i, i] -= kf;          S[..., i + 1, i] += kf
+            S[..., i + 1, i + 1] -= kb;  S[..., i, i + 1] += kb
+        S[..., 5, 5] -= p['gamma'];  S[..., 6, 5] += p['gamma']
+        S[..., 6, 6] -= p['delta'];  S[..., 5, 6] += p['delta']
+        return S
+
+    def _sensor_key(self, k):
+        """Log-spaced bin of the on-rate k (None for k = 0)."""
+        return round(math.log(k) / self.SENSOR_RATE_QUANTUM) if k > 0.0 else None
+
+    def sensor_propagator(self, key, dt):
+        """Cached expm(dt * S) for the bin centre of key (see _sensor_key)."""
+        if dt != self._sensor_dt or len(self._sensor_cache) >= self.SENSOR_CACHE_SIZE:
+            self._sensor_cache = {}
+            self._sensor_dt = dt
+        A = self._sensor_cache.get(key)
+        if A is None:
+            k = 0.0 if key is None else math.exp(key * self.SENSOR_RATE_QUANTUM)
+            # Roundoff only: exact propagator is column-stochastic
+            A = np.maximum(expm(dt * self.sensor_matrix(k)), 0.0)
+            A /= A.sum(axis=0)
+            self._sensor_cache[key] = A
+        return A
+
+    def sensor_propagate(self, s, k, dt):
+        """
+        Sensor after dt with the on-rate k = alpha * c frozen: s of shape (7,)
+        with float k, or (7, n) with (n,) k (batched over members).
+        """
+        if np.ndim(s) == 1:
+            return self.sensor_propagator(self._sensor_key(k), dt) @ s
+        k = np.broadcast_to(k, s.shape[1:])
+        if any(np.ndim(self.p[name]) for name in ("beta", "gamma", "delta")):
+            # Per-member sensor constants: no shared cache
+            q = self.SENSOR_RATE_QUANTUM
+            with np.errstate(divide="ignore"):
+                kq = np.where(k > 0.0, np.exp(np.round(np.log(k) / q) * q), 0.0)
+            A = np.maximum(expm(dt * self.sensor_matrix(kq)), 0.0)
+            A /= A.sum(axis=-2, keepdims=True)
+        else:
+            A = np.stack([self.sensor_propagator(self._sensor_key(v), dt) for v in k.tolist()])
+        return (A @ s.T[..., None])[..., 0].T
 
     # ----------------------------------------------------------------------
     # Main update step
     # ----------------------------------------------------------------------
-    def step(self, dt, c_i):
+    def step(self, dt, c_i, alpha=None):
         p = self.p
+        a = p['alpha'] if alpha is None else alpha
 
         # ------------- A) Ca2+ Sensor Kinetics (Eq. 6) ---------------------
-        # NO UNIT CLIPPING! c_i MUST BE µM.
+        # c_i in Molar, dt in seconds (SI, as the parameters).
         c = max(c_i, 0.0)
+        s = self.s
+        s0, s1, s2, s3, s4, s5, s_star = s.tolist()
+
+        if self.sensor_update == "euler":
 
-        # Forward and backward fluxes
-        j01 = 5 * p['alpha'] * c * self.s0
-        j10 = 1 * p['beta']  * self.s1
+            # Forward and backward fluxes
+            j01 = 5 * a * c * s0
+            j10 = 1 * p['beta']  * s1
 
-        j12 = 4 * p['alpha'] * c * self.s1
-        j21 = 2 * p['beta']  * self.s2
+            j12 = 4 * a * c * s1
+            j21 = 2 * p['beta']  * s2
 
-        j23 = 3 * p['alpha'] * c * self.s2
-        j32 = 3 * p['beta']  * self.s3
+            j23 = 3 * a * c * s2
+            j32 = 3 * p['beta']  * s3
 
-        j34 = 2 * p['alpha'] * c * self.s3
-        j43 = 4 * p['beta']  * self.s4
+            j34 = 2 * a * c * s3
+            j43 = 4 * p['beta']  * s4
 
-        j45 = 1 * p['alpha'] * c * self.s4
-        j54 = 5 * p['beta']  * self.s5
+            j45 = 1 * a * c * s4
+            j54 = 5 * p['beta']  * s5
 
-        # Isomerization (γ forward, δ backward)
-        j_f_star = p['gamma'] * self.s5
-        j_b_star = p['delta'] * self.s_star
+            # Isomerization (γ forward, δ backward)
+            j_f_star = p['gamma'] * s5
+            j_b_star = p['delta'] * s_star
 
-        # Sensor state derivatives
-        ds0 = j10 - j01
-        ds1 = j01 + j21 - j10 - j12
-        ds2 = j12 + j32 - j21 - j23
-        ds3 = j23 + j43 - j32 - j34
-        ds4 = j34 + j54 - j43 - j45
-        ds5 = j45 + j_b_star - j54 - j_f_star
-        ds_star = j_f_star - j_b_star
+            # Sensor state derivatives
+            ds = (j10 - j01,
+                  j01 + j21 - j10 - j12,
+                  j12 + j32 - j21 - j23,
+                  j23 + j43 - j32 - j34,
+                  j34 + j54 - j43 - j45,
+                  j45 + j_b_star - j54 - j_f_star,
+                  j_f_star - j_b_star)
 
         # --------------------- B) Spontaneous Release Rate (Eq. 7) -------------------
         # λ(ci) = a3 * (1 + exp((a1 - c_i)/a2))^-1
-        exponent = (p['a1'] - c) / p['a2']
-        lambda_spont = p['a3'] / (1.0 + np.exp(exponent))
+        lambda_spont = self.spontaneous_rate(c)
 
         # --------------------- C) Evoked Release Rate (from Eq. 6) -------------------
         # Evoked release depends ONLY on γ * s_star — NO 2000 factor!!
-        rate_evoked = p['gamma'] * self.s_star
+        rate_evoked = p['gamma'] * s_star
 
         # Total release rate
         f_r = lambda_spont + rate_evoked
@@ -85,17 +193,12 @@ class GlutamateDynamics:
         dg = (p['n_v'] * p['g_v'] * self.E) - (p['g_c'] * self.g)
 
         # --------------------- F) Integrate and clip ----------------------------
-        self.s0 += dt * ds0
-        self.s1 += dt * ds1
-        self.s2 += dt * ds2
-        self.s3 += dt * ds3
-        self.s4 += dt * ds4
-        self.s5 += dt * ds5
-        self.s_star += dt * ds_star
-
-        # Probabilities must remain [0,1]
-        for attr in ['s0', 's1', 's2', 's3', 's4', 's5', 's_star']:
-            setattr(self, attr, np.clip(getattr(self, attr), 0.0, 1.0))
+        if self.sensor_update == "euler":
+            s += dt * np.array(ds)
+            # Probabilities must remain [0,1]
+            np.clip(s, 0.0, 1.0, out=s)
+        else:
+            self.s = self.sensor_propagate(s, a * c, dt)
 
         self.R += dt * dR
         self.E += dt * dE
@@ -107,3 +210,103 @@ class GlutamateDynamics:
         self.g = max(0.0, self.g)
 
         return self.g
+
+
+    # ----------------------------------------------------------------------
+    # Packed State API
+    # ----------------------------------------------------------------------
+    def get_state(self):
+        return np.concatenate([self.s, [self.R, self.E, self.g]])
+
+    def set_state(self, y):
+        self.s = np.array(y[:7], dtype=np.float64)
+        self.R, self.E, self.g = (float(v) for v in y[7:])
+
+    def derivatives(self, y, c_i, alpha=None, out=None):
+        """
+        Pure right-hand side dy/dt (per s) for
+        y = [s0..s5, s_star, R, E, g], shape (10,) or (10, k).
+        c_i: Ca2+ in M. alpha: sensor on-rate, defaults to p['alpha'].
+        """
+        p = self.p
+        a = p['alpha'] if alpha is None else alpha
+        b = p['beta']
+        s0, s1, s2, s3, s4, s5, s_star, R, E, g = (y[i] for i in range(10))
+        c = np.maximum(c_i, 0.0)
+
+        # Eq. 6 – sensor fluxes
+        j01 = 5 * a * c * s0;  j10 = 1 * b * s1
+        j12 = 4 * a * c * s1;  j21 = 2 * b * s2
+        j23 = 3 * a * c * s2;  j32 = 3 * b * s3
+        j34 = 2 * a * c * s3;  j43 = 4 * b * s4
+        j45 = 1 * a * c * s4;  j54 = 5 * b * s5
+        j_f_star = p['gamma'] * s5
+        j_b_star = p['delta'] * s_star
+
+        # Eq. 7 + evoked release
+        lambda_spont = self.spontaneous_rate(c)
+        f_r = lambda_spont + p['gamma'] * s_star
+
+        if out is None:
+            out = np.empty_like(y, dtype=np.float64)
+        out[0] = j10 - j01
+        out[1] = j01 + j21 - j10 - j12
+        out[2] = j12 + j32 - j21 - j23
+        out[3] = j23 + j43 - j32 - j34
+        out[4] = j34 + j54 - j43 - j45
+        out[5] = j45 + j_b_star - j54 - j_f_star
+        out[6] = j_f_star - j_b_star
+
+        # Eq. 8 – vesicle cycle, Eq. 9 – cleft
+        I = 1.0 - R - E
+        out[7] = (I / p['tau_rec']) - (f_r * R)
+        out[8] = -(E / p['tau_inac']) + (f_r * R)
+        out[9] = (p['n_v'] * p['g_v'] * E) - (p['g_c'] * g)
+        return out
+
+    def jacobian(self, y, c_i, alpha=None):
+        """
+        Analytic Jacobian of derivatives() (per s) at a single state y of
+        shape (10,). Returns (J, dc, dalpha): J of shape (10, 10) and the
+        (10,) partials w.r.t. the c_i (M) and alpha inputs.
+        """
+        p = self.p
+        a = p['alpha'] if alpha is None else alpha
+        b = p['beta']
+        s, R, s_star = y[:6], y[7], y[6]
+        c = max(c_i, 0.0)
+
+        J = np.zeros((10, 10))
+        dc = np.zeros(10)
+        dalpha = np.zeros(10)
+        # Eq. 6 – s_i -> s_i+1 at (5-i)*alpha*c, s_i+1 -> s_i at (i+1)*beta
+        for i in range(5):
+            kf = (5 - i) * a * c
+            kb = (i + 1) * b
+            J[i, i] -= kf;      J[i + 1, i] += kf
+            J[i + 1, i + 1] -= kb;  J[i, i + 1] += kb
+            flux_c = (5 - i) * a * s[i] if c_i >= 0 else 0.0
+            dc[i] -= flux_c;    dc[i + 1] += flux_c
+            dalpha[i] -= (5 - i) * c * s[i]
+            dalpha[i + 1] += (5 - i) * c * s[i]
+        J[5, 5] -= p['gamma'];  J[6, 5] += p['gamma']
+        J[6, 6] -= p['delta'];  J[5, 6] += p['delta']
+
+        # Eq. 7, 8 – vesicle cycle
+        ex = np.exp((p['a1'] - c) / p['a2'])
+        lambda_spont = p['a3'] / (1.0 + ex)
+        dlambda = p['a3'] * ex / (p['a2'] * (1.0 + ex)**2) if c_i >= 0 else 0.0
+        f_r = lambda_spont + p['gamma'] * s_star
+        J[7, 7] = -1.0 / p['tau_rec'] - f_r
+        J[7, 8] = -1.0 / p['tau_rec']
+        J[7, 6] = -p['gamma'] * R
+        J[8, 8] = -1.0 / p['tau_inac']
+        J[8, 7] = f_r
+        J[8, 6] = p['gamma'] * R
+        dc[7] = -dlambda * R
+        dc[8] = dlambda * R
+
+        # Eq. 9 – cleft
+        J[9, 8] = p['n_v'] * p['g_v']
+        J[9, 9] = -p['g_c']
+        return J, dc, dalpha
@@ -0,0 +1,132 @@
+import math
+
+import numpy as np
+
+
+# Interpolation kinds: polynomial degree inside each grid interval
+TABLE_KINDS = {"linear": 1, "cubic": 3}
+
+
+class RateTable:
+    """
+    Lookup table for a smooth rate function f(x) -> k outputs.
+
+    The grid is uniform in x (scale="linear") or in log10(x) (scale="log",
+    for Hill terms with fractional exponents whose slope blows up at 0).
+    Inside [lo, hi] values come from piecewise linear or cubic Hermite
+    interpolation; outside (and for x <= 0 on a log grid) f is evaluated
+    exactly. Accepts floats (fast pure-Python path) and ndarrays.
+
+    func: array-safe f; returns one array or a tuple of k arrays.
+    step: grid spacing (in log10 units for scale="log").
+    Calls return a float/array for k == 1, otherwise a sequence of k.
+    """
+
+    def __init__(self, func, lo, hi, step, kind="linear", scale="linear"):
+        if kind not in TABLE_KINDS:
+            raise ValueError(f"Bilinmeyen tablo türü: {kind!r} (seçenekler: {', '.join(TABLE_KINDS)})")
+        if scale not in ("linear", "log"):
+            raise ValueError(f"Bilinmeyen tablo ölçeği: {scale!r} ('linear' veya 'log')")
+        self.func = func
+        self.lo, self.hi = float(lo), float(hi)
+        self.kind = kind
+        self.scale = scale
+
+        # Grid in the interpolation variable u (x or log10 x)
+        u_lo, u_hi = (math.log10(lo), math.log10(hi)) if scale == "log" else (lo, hi)
+        n = max(int(math.ceil((u_hi - u_lo) / step)), 1)
+        self._u_lo = u_lo
+        self._h = (u_hi - u_lo) / n
+        self._inv_h = 1.0 / self._h
+        self._n = n
+        u = u_lo + self._h * np.arange(n + 1)
+        x = 10.0 ** u if scale == "log" else u
+        x[0], x[-1] = self.lo, self.hi
+        values = self._exact(x)                    # (k, n + 1)
+        self.k = values.shape[0]
+
+        # Per-interval polynomial in w = (u - u_i) / h, highest power last
+        y0, y1 = values[:, :-1], values[:, 1:]
+        if kind == "linear":
+            coef = np.stack([y0, y1 - y0], axis=-1)
+        else:
+            # Hermite with second-order slopes (per interval, in units of w)
+            d = np.gradient(values, axis=1, edge_order=2)
+            d0, d1 = d[:, :-1], d[:, 1:]
+            coef = np.stack([y0, d0, 3 * (y1 - y0) - 2 * d0 - d1,
+                             2 * (y0 - y1) + d0 + d1], axis=-1)
+        self._coef = np.ascontiguousarray(coef.transpose(1, 0, 2))   # (n, k, deg + 1)
+        # Float path: nested tuples, one extra row so that x == hi needs no clamp
+        deg = TABLE_KINDS[kind]
+        self._rows = ([tuple(map(tuple, r)) for r in self._coef.tolist()]
+                      + [tuple((v,) + (0.0,) * deg for v in values[:, -1].tolist())])
+
+    def _exact(self, x):
+        out = self.func(x)
+        if isinstance(out, tuple):
+            out = np.stack([np.broadcast_to(v, np.shape(x)) for v in out])
+        return np.atleast_2d(np.asarray(out, dtype=np.float64))
+
+    def __call__(self, x):
+        if isinstance(x, np.ndarray):
+            return self._lookup_array(x)
+        if self.lo <= x <= self.hi:
+            u = ((math.log10(x) if self.scale == "log" else x) - self._u_lo) * self._inv_h
+            i = int(u)
+            w = u - i
+            if self.kind == "linear":
+                out = [a + w * b for a, b in self._rows[i]]
+            else:
+                out = [a + w * (b + w * (c + w * d)) for a, b, c, d in self._rows[i]]
+        else:
+            out = tuple(float(v) for v in self._exact(np.array([x], dtype=np.float64))[:, 0])
+        return out[0] if self.k == 1 else out
+
+    def _lookup_array(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        inside = (x >= self.lo) & (x <= self.hi)
+        xs = np.where(inside, x, self.lo)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            u = ((np.log10(xs) if self.scale == "log" else xs) - self._u_lo) * self._inv_h
+        i = np.minimum(u.astype(np.intp), self._n - 1)
+        w = u - i
+        c = self._coef[i]                           # (..., k, deg + 1)
+        out = c[..., -1]
+        for p in range(c.shape[-1] - 2, -1, -1):
+            out = c[..., p] + w[..., None] * out
+        out = np.moveaxis(out, -1, 0)               # (k, ...)
+        if not np.all(inside):
+            out = np.where(inside, out, self._exact(x).reshape(out.shape))
+        return out[0] if self.k == 1 else tuple(out)
+
+    def max_error(self, samples_per_interval=8):
+        """
+        Largest interpolation error per output, sampled inside every grid
+        interval: (abs_err, rel_err) arrays of shape (k,), rel_err relative
+        to the output's largest magnitude on the table range.
+        """
+        w = (np.arange(samples_per_interval) + 0.5) / samples_per_interval
+        u = (self._u_lo + self._h * (np.arange(self._n)[:, None] + w)).ravel()
+        x = np.clip(10.0 ** u if self.scale == "log" else u, self.lo, self.hi)
+        exact = self._exact(x)
+        approx = np.atleast_2d(np.array(self._lookup_array(x)))
+        abs_err = np.max(np.abs(approx - exact), axis=1)
+        return abs_err, abs_err / np.maximum(np.max(np.abs(exact), axis=1), 1e-300)
+
+
+def attach_rate_tables(model, kind, steps=None):
+    """
+    Build the lookup tables declared in model.RATE_TABLES, i.e.
+    {name: (exact method, lo, hi, step, scale)}, and store each one as
+    model.<name>_table; kind=None puts the exact functions back.
+    steps: optional {name: grid step} overrides.
+    Returns {name: RateTable}.
+    """
+    tables = {}
+    for name, (exact, lo, hi, step, scale) in model.RATE_TABLES.items():
+        table = None
+        if kind is not None:
+            step = (steps or {}).get(name, step)
+            table = tables[name] = RateTable(getattr(model, exact), lo, hi, step, kind, scale)
+        setattr(model, f"{name}_table", table)
+    return tables
@@ -1,9 +1,11 @@
+from parameters.frozen import FrozenParams
+
 # ==============================================================================
 # ASTROCYTE PARAMETERS - TEWARI & MAJUMDAR (2012) / DE PITTA (2009)
 # ALL UNITS CONVERTED TO SI (Molar, Seconds, Amperes)
 # ==============================================================================
 
-ASTROCYTE_PARAMS = {
+ASTROCYTE_PARAMS = FrozenParams({
     # --------------------------------------------------------------------------
     # 1. Flux Rates (Table 5 - Parametre1.jpg)
     # --------------------------------------------------------------------------
@@ -55,4 +57,4 @@ ASTROCYTE_PARAMS = {
     "v_3k": 2.0e-6,      # Molar/s (Degradation by IP3-3K)
     "K_D": 0.7e-6,       # Molar (Ca affinity)
     "K_3": 1.0e-6        # Molar (IP3 affinity)
-}
\ No newline at end of file
+})
\ No newline at end of file
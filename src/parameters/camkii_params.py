@@ -1,4 +1,6 @@
-CAMKII_PARAMS = {
+from parameters.frozen import FrozenParams
+
+CAMKII_PARAMS = FrozenParams({
     # ============================================================
     # 1) CaMKII TOTAL CONCENTRATION
     # ============================================================
@@ -59,4 +61,4 @@ CAMKII_PARAMS = {
    "P_half" : 25e-6,
     "k_half": 0.4e-6,      # Slope factor (M)
     "k_syt": 0.005         # 0.5% synaptotagmin increase
-}
+})
@@ -0,0 +1,100 @@
+import hashlib
+import json
+from collections.abc import Mapping
+
+import numpy as np
+
+
+# ==============================================================================
+# Read-only parameter sets
+#
+# The parameter modules export FrozenParams instead of plain dicts, and
+# TripartiteSynapse keeps its parameters as a FrozenParams of FrozenParams
+# (group -> parameters). Nothing can write into a shared set, so runs can
+# be parallelized, cached and reused safely; changes are derived copies:
+#
+#   params.replace({"P_half": 55e-6})              one set
+#   groups.derive({"camkii": {"P_half": 55e-6}})   per group, one level down
+#
+# FrozenParams is a dict subclass, so lookups in the model step() methods
+# cost as much as before and json / pickle / ** work unchanged. key is a
+# stable content hash (numbers compared as floats, so {"a": 1} and
+# {"a": 1.0} agree, as they do under ==); compiled(names) is the float64
+# array of the named entries the numba kernel takes.
+# ==============================================================================
+
+
+def _canonical(value):
+    if isinstance(value, Mapping):
+        return sorted((str(k), _canonical(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (bool, str)) or value is None:
+        return value
+    return float(value)
+
+
+def _freeze(value):
+    return FrozenParams(value) if isinstance(value, Mapping) and not isinstance(value, FrozenParams) else value
+
+
+class FrozenParams(dict):
+    """Read-only parameter dict (nested dicts frozen too); see above."""
+
+    __slots__ = ("_key", "_compiled")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__((k, _freeze(v)) for k, v in dict(*args, **kwargs).items())
+        self._key = None
+        self._compiled = {}
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Parametre kümesi değiştirilemez; değişiklik için replace() / derive() "
+                        "ile türetilmiş kopya kullanın.")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __hash__(self):
+        return int(self.key[:16], 16)
+
+    def __repr__(self):
+        return f"FrozenParams({dict.__repr__(self)})"
+
+    @property
+    def key(self):
+        """Stable content hash (hex)."""
+        if self._key is None:
+            payload = json.dumps(_canonical(self))
+            self._key = hashlib.sha1(payload.encode()).hexdigest()
+        return self._key
+
+    def replace(self, changes=(), **kwargs):
+        """Copy with some entries changed or added."""
+        return FrozenParams({**self, **dict(changes), **kwargs})
+
+    def derive(self, overrides):
+        """Copy of a set of groups with overrides = {group: {name: value}} applied per group."""
+        unknown = [name for name in overrides if name not in self]
+        if unknown:
+            raise ValueError(f"Bilinmeyen parametre grubu: {unknown}")
+        return FrozenParams({name: group.replace(overrides[name]) if overrides.get(name) else group
+                             for name, group in self.items()})
+
+    def compiled(self, names):
+        """The named entries as a read-only float64 array (built once per names)."""
+        names = tuple(names)
+        if names not in self._compiled:
+            values = np.array([self[name] for name in names], dtype=np.float64)
+            values.setflags(write=False)
+            self._compiled[names] = values
+        return self._compiled[names]
@@ -1,38 +1,45 @@
+from parameters.frozen import FrozenParams
+
 # Dosya Yolu: src/parameters/gliatransmitter_params.py
 
-GLIATRANSMITTER_PARAMS = {
+GLIATRANSMITTER_PARAMS = FrozenParams({
     # ------------------------------------------------------------
     # Astrosit Kalsiyum Sensörü Kinetiği (Table 6)
-    # UNITS: MicroMolar (uM) and Milliseconds (ms)
+    # UNITS: SI (Molar, Seconds); tablo değerleri uM ve ms cinsinden
     # ------------------------------------------------------------
-    
-    # Association Rates (Table 6: / (uM * ms))
-    "k1_plus": 3.75e-3,  # 3.75 x 10^-3
-    "k2_plus": 2.5e-3,   # 2.5 x 10^-3
-    "k3_plus": 1.25e-2,  # 1.25 x 10^-2
-    
-    # Dissociation Rates (Table 6: / ms)
-    "k1_minus": 4e-4,    # 4 x 10^-4
-    "k2_minus": 1e-3,    # 1 x 10^-3
-    "k3_minus": 1e-3,    # 1 x 10^-3
+
+    # Association Rates (Table 6: / (uM * ms) -> / (M * s), x 1e9)
+    "k1_plus": 3.75e6,   # 3.75 x 10^-3 / (uM ms)
+    "k2_plus": 2.5e6,    # 2.5 x 10^-3 / (uM ms)
+    "k3_plus": 1.25e7,   # 1.25 x 10^-2 / (uM ms)
+
+    # Dissociation Rates (Table 6: / ms -> / s)
+    "k1_minus": 0.4,     # 4 x 10^-4 / ms
+    "k2_minus": 1.0,     # 1 x 10^-3 / ms
+    "k3_minus": 1.0,     # 1 x 10^-3 / ms
 
     # ------------------------------------------------------------
     # Vesicle Cycle (Table 6)
     # ------------------------------------------------------------
-    "tau_rec_a": 800.0,   # ms
-    "tau_inac_a": 3.0,    # ms
-    
-    # Threshold: 196.69 nM = 0.19669 uM
-    "C_a_thresh": 0.19669, # uM
+    "tau_rec_a": 0.8,     # s (800 ms)
+    "tau_inac_a": 3.0e-3, # s (3 ms)
+
+    # Release rate of a fully open sensor: Eq. 15 uses f_r_a = O1*O2*O3
+    # directly as a rate in the table's 1/ms
+    "k_rel_a": 1.0e3,     # 1/s (1 / ms)
+
+    # Threshold: 196.69 nM -> Molar
+    "C_a_thresh": 196.69e-9, # Molar
 
     # ------------------------------------------------------------
     # Extra-Synaptic Cleft Dynamics (Table 6)
     # ------------------------------------------------------------
     "n_a_v": 12.0,        # Number of SLMVs
-    
-    # Glutamate Concentration: 20 mM = 20000 uM
-    "g_a_v": 20000.0,     # uM
-    
-    # Clearance Rate: 10 / ms
-    "g_a_c": 10.0         # 1/ms
-}
\ No newline at end of file
+
+    # Glutamate Concentration: 20 mM, released at the implicit rate E_a per
+    # ms; that 1/ms is folded in, so n_a_v * g_a_v * E_a is in Molar/s
+    "g_a_v": 20.0,        # Molar/s (20 mM/ms)
+
+    # Clearance Rate: 10 / ms -> / s
+    "g_a_c": 10.0e3       # 1/s
+})
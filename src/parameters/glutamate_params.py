@@ -1,3 +1,5 @@
+from parameters.frozen import FrozenParams
+
 # ==============================================================================
 # FINAL VERIFIED PARAMETERS - TEWARI & MAJUMDAR (2012)
 # ==============================================================================
@@ -5,7 +7,7 @@
 # --------------------------
 # 1. Calcium Parameters (SI Units for Physics Stability)
 # --------------------------
-CA_PARAMS = {
+CA_PARAMS = FrozenParams({
     # Constants
     "F": 96487.0,        "R": 8.314,          "T": 293.15,         "z_Ca": 2,
 
@@ -44,29 +46,31 @@ CA_PARAMS = {
     "k_g": 0.78e-6,      # Molar
     "tau_p": 0.14,       # 1/s
     "p0": 0.16e-6        # Molar
-}
+})
 
 # --------------------------
-# 2. Glutamate Parameters (Table 4)
+# 2. Glutamate Parameters (Table 4, converted to SI: Molar, Seconds)
 # --------------------------
-GLUTAMATE_PARAMS = {
+GLUTAMATE_PARAMS = FrozenParams({
     # Sensor Kinetics
-    "alpha": 0.3,      # µM^-1 ms^-1
-    "beta": 3.0,       # ms^-1
-    "gamma": 30.0,     # ms^-1
-    "delta": 8.0,      # ms^-1
+    "alpha": 0.3e9,    # 1/(Molar*s)  (0.3 µM^-1 ms^-1)
+    "beta": 3.0e3,     # 1/s          (3 ms^-1)
+    "gamma": 30.0e3,   # 1/s          (30 ms^-1)
+    "delta": 8.0e3,    # 1/s          (8 ms^-1)
 
     # Spontaneous Release
-    "a1": 50.0,        # µM
-    "a2": 5.0,         # µM
-    "a3": 0.85,        # ms^-1
+    "a1": 50.0e-6,     # Molar (50 µM)
+    "a2": 5.0e-6,      # Molar (5 µM)
+    "a3": 0.85e3,      # 1/s   (0.85 ms^-1)
 
     # Vesicle Cycle
-    "tau_rec": 800.0,  # ms
-    "tau_inac": 3.0,   # ms
-    
+    "tau_rec": 0.8,    # s (800 ms)
+    "tau_inac": 3.0e-3,  # s (3 ms)
+
     # Cleft Dynamics
     "n_v": 2.0,        # Number of vesicles
-    "g_v": 60000.0,    # µM (60 mM)
-    "g_c": 10.0        # ms^-1
-}
\ No newline at end of file
+    # Table 4: 60 mM per vesicle, released at the implicit rate E per ms;
+    # that 1/ms is folded in, so n_v * g_v * E is a rate in Molar/s
+    "g_v": 60.0,       # Molar/s (60 mM/ms)
+    "g_c": 10.0e3      # 1/s (10 ms^-1)
+})
\ No newline at end of file
@@ -1,6 +1,8 @@
+from parameters.frozen import FrozenParams
+
 # Dosya Yolu: src/parameters/post_synaptic_ca_params.py
 
-POST_SYNAPTIC_CA_PARAMS = {
+POST_SYNAPTIC_CA_PARAMS = FrozenParams({
     # ------------------------------------------------------------
     # Tablo 8: Post-Sinaptik Kalsiyum Parametreleri
     # ------------------------------------------------------------
@@ -31,4 +33,4 @@ POST_SYNAPTIC_CA_PARAMS = {
     # Fiziksel Sabitler
     "F": 96487.0,        # C/mol
     "z_Ca": 2            # Değerlik
-}
\ No newline at end of file
+})
\ No newline at end of file
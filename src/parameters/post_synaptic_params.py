@@ -1,4 +1,6 @@
-POST_SYNAPTIC_PARAMS = {
+from parameters.frozen import FrozenParams
+
+POST_SYNAPTIC_PARAMS = FrozenParams({
     "R_m": 0.7985e11,       # Ohm
     "V_rest": -0.070,  # Volt
     "V_target": -0.030,     # Volt (hedef potansiyel)
@@ -10,4 +12,4 @@ POST_SYNAPTIC_PARAMS = {
     
     # MUTLAKA EKLENMELİ
     "I_soma": None          # sonra hesaplayacağız
-}
+})
@@ -1,6 +1,8 @@
+from parameters.frozen import FrozenParams
+
 # Dosya Yolu: src/parameters/pre_synaptic_params.py
 
-PRE_SYNAPTIC_PARAMS = {
+PRE_SYNAPTIC_PARAMS = FrozenParams({
     # ------------------------------------------------------------
     # İletkenlikler (Conductances) - [mS/cm^2]
     # ------------------------------------------------------------
@@ -35,4 +37,4 @@ PRE_SYNAPTIC_PARAMS = {
     "m_init": 0.05,   # Na aktivasyon kapısı
     "h_init": 0.6,    # Na inaktivasyon kapısı
     "n_init": 0.32,   # K aktivasyon kapısı
-}
\ No newline at end of file
+})
\ No newline at end of file
@@ -2,7 +2,6 @@ import numpy as np
 import matplotlib.pyplot as plt
 import sys
 import os
-import time
 
 # =================================================================================
 # KULLANICI AYARLARI
@@ -18,23 +17,8 @@ src_path = os.path.join(current_dir, 'src')
 sys.path.append(src_path)
 
 try:
-    from parameters.pre_synaptic_params import PRE_SYNAPTIC_PARAMS
-    from parameters.ca_params import CA_PARAMS
-    from parameters.glutamate_params import GLUTAMATE_PARAMS
-    from parameters.astrocyte_params import ASTROCYTE_PARAMS
-    from parameters.gliatransmitter_params import GLIATRANSMITTER_PARAMS
-    from parameters.post_synaptic_params import POST_SYNAPTIC_PARAMS
-    from parameters.post_synaptic_ca_params import POST_SYNAPTIC_CA_PARAMS
-    from parameters.camkii_params import CAMKII_PARAMS
-
-    from models.hh import PresynapticHH
-    from models.calcium_model import PresynapticCalciumDynamics
-    from models.presynaptic_glutamate import GlutamateDynamics
-    from models.astrocyte import AstrocyteDynamics
-    from models.gliatransmitter import GliatransmitterDynamics
-    from models.post_synaptic import PostSynapticDynamics
-    from models.post_synaptic_ca import PostSynapticCalciumDynamics
-    from models.camkii import CaMKIIDynamics
+    from simulation.synapse import TripartiteSynapse
+    from simulation.cache import cached_run
 
     print("✅ Tüm modüller başarıyla yüklendi.")
 
@@ -47,99 +31,36 @@ def run_simulation_separate():
     print(f"   TEWARI & MAJUMDAR (2012) - GRAFİK ÜRETİMİ (AKADEMİK)")
     print("======================================================================")
 
-    T_total = 60000.0  
-    dt = 0.05          
-    steps = int(T_total / dt)
-    time_array = np.linspace(0, T_total, steps)
-
     if not os.path.exists(SAVE_FOLDER):
         os.makedirs(SAVE_FOLDER)
 
-    # Modelleri Başlat
-    hh_model = PresynapticHH(PRE_SYNAPTIC_PARAMS)
-    ca_pre_model = PresynapticCalciumDynamics(CA_PARAMS)
-    glu_pre_model = GlutamateDynamics(GLUTAMATE_PARAMS)
-    astro_model = AstrocyteDynamics(ASTROCYTE_PARAMS)
-    glia_trans_model = GliatransmitterDynamics(GLIATRANSMITTER_PARAMS)
-    post_neuron_model = PostSynapticDynamics(POST_SYNAPTIC_PARAMS)
-    post_ca_model = PostSynapticCalciumDynamics(POST_SYNAPTIC_CA_PARAMS)
-    camkii_model = CaMKIIDynamics(CAMKII_PARAMS)
-
-    # Kayıt Dizileri
-    rec_step = 20  
-    rec_size = steps // rec_step
-    rec_time = time_array[::rec_step]
+    # Uyarım yok (I_stim = 0.0): Sadece bazal 5 Hz aktivite, 60 saniye
+    synapse = TripartiteSynapse(
+        T_total=60000.0,
+        dt=0.05,
+        current=0.0,
+        record=("Ca_slow", "Ca_ER", "Glu_syn",
+                "V_post", "Ca_post", "I_AMPA", "i_R"),
+        rec_step=20,
+    )
+
+    print("Simülasyon başlıyor...")
+    # Aynı koşuyu isteyen betikler (generate_all_plots_separate.py) önbellekten okur
+    result = cached_run(synapse, verbose=True)
 
     # Presinaptik (Kütle dengesi için gerekli)
-    rec_Ca_Slow = np.zeros(rec_size, dtype=np.float32) 
-    rec_Ca_ER = np.zeros(rec_size, dtype=np.float32)   
-    rec_Glu_Syn = np.zeros(rec_size, dtype=np.float32)
-    
-    # Postsinaptik
-    rec_V_post = np.zeros(rec_size, dtype=np.float32)
-    rec_Ca_Post = np.zeros(rec_size, dtype=np.float32)
-    rec_I_AMPA = np.zeros(rec_size, dtype=np.float32)
-    rec_i_R = np.zeros(rec_size, dtype=np.float32) # R-type current
+    rec_time = result.time
+    rec_Ca_Slow = result["Ca_slow"]
+    rec_Ca_ER = result["Ca_ER"]
+    rec_Glu_Syn = result["Glu_syn"]
 
-    # Simülasyon Değişkenleri
-    current_glu_syn = 0.0
-    current_glu_extra = 0.0
-    base_alpha = GLUTAMATE_PARAMS['alpha']
-    current_alpha = base_alpha
+    # Postsinaptik
+    rec_V_post = result["V_post"]
+    rec_Ca_Post = result["Ca_post"]
+    rec_I_AMPA = result["I_AMPA"]
+    rec_i_R = result["i_R"] # R-type current (pA)
 
-    print("Simülasyon başlıyor...")
-    start_time = time.time()
-
-    for i in range(steps):
-        t_ms = time_array[i]
-        dt_sec = dt * 1e-3
-        I_stim = 0.0 
-
-        # 1. Pre-Sinaptik
-        V_pre_mV = hh_model.step(dt, t_ms, I_stim)
-        V_pre_volts = V_pre_mV * 1e-3
-        Ca_pre = ca_pre_model.step(dt_sec, V_pre_volts, glu=current_glu_extra * 1e-6)
-        Ca_pre_uM = ca_pre_model.c_fast * 1e6
-        
-        glu_pre_model.p['alpha'] = current_alpha
-        current_glu_syn = glu_pre_model.step(dt, Ca_pre_uM)
-
-        # 2. Astrocyte
-        Ca_astro = astro_model.compute_derivatives(dt_sec, current_glu_syn * 1e-6)
-        current_glu_extra = glia_trans_model.step(dt, Ca_astro * 1e6)
-
-        # 3. Post-Synaptic
-        V_post_volts = post_neuron_model.step(dt_sec, current_glu_syn, I_soma_injected=0.0)
-        I_AMPA = post_neuron_model.I_AMPA
-        Ca_post = post_ca_model.step(dt_sec, V_post_volts, I_AMPA)
-
-        # 4. LTP
-        camkii_model.step(dt_sec, Ca_post)
-        alpha_mod_factor = camkii_model.get_alpha_modulation()
-        current_alpha = base_alpha * (1.0 + alpha_mod_factor)
-
-        # Kayıt
-        if i % rec_step == 0:
-            idx = i // rec_step
-            # Kütle dengesi (Equation 5 türevi için) - Presinaptik modelden gelir
-            rec_Ca_Slow[idx] = ca_pre_model.c_slow * 1e6
-            rec_Ca_ER[idx] = ca_pre_model.c_ER * 1e6
-            rec_Glu_Syn[idx] = current_glu_syn
-            
-            # Postsinaptik Kayıtlar
-            rec_V_post[idx] = V_post_volts * 1e3
-            rec_Ca_Post[idx] = Ca_post * 1e6
-            rec_I_AMPA[idx] = I_AMPA * 1e9
-            
-            try:
-                rec_i_R[idx] = post_ca_model.i_R * 1e12 
-            except AttributeError:
-                rec_i_R[idx] = 0.0
-
-        if i % (steps // 10) == 0:
-            print(f"%{(i / steps) * 100:.0f} tamamlandı.")
-
-    print(f"Simülasyon Bitti: {time.time() - start_time:.2f} sn")
+    print(f"Simülasyon Bitti: {result.wall_time:.2f} sn")
 
     # ---------------------------------------------------------------------
     # GRAFİK ÇİZİM VE KAYIT
@@ -182,7 +103,7 @@ def run_simulation_separate():
     save_plot(rec_Ca_ER, "Ca_ER (uM)", "ER İçi Kalsiyum Deposu (c_ER)", "ER_Ca.png", 'purple')
 
     # 7. KutleDengesi.png (c_tot)
-    c1 = CA_PARAMS.get('c1', 0.185)
+    c1 = synapse.params["ca"].get('c1', 0.185)
     rec_c_tot = rec_Ca_Slow + c1 * rec_Ca_ER
     save_plot(rec_c_tot, "c_tot (uM)", "Toplam Kalsiyum Kütle Dengesi (c_tot)", "KutleDengesi.png", 'black')
 
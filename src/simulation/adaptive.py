@@ -0,0 +1,369 @@
+import numpy as np
+
+from simulation import state as state_layout
+from simulation.stimulus import protocol_edges
+
+
+# ==============================================================================
+# Adaptive-step integration of TripartiteSynapse.rhs
+#
+# The time axis is split at every discontinuity of the drive (stimulus
+# window, the internal PresynapticHH pulse edges, end of the glutamate mute);
+# inside a segment the drive is constant, so the right-hand side is evaluated
+# at the segment midpoint and the edges are hit exactly instead of being
+# stepped over. Two integrators share this segmentation:
+#
+#   "dopri5"     Dormand–Prince 5(4), explicit. Step size is bounded by
+#                stability rather than accuracy: the glutamate sensor
+#                (s5: 5*beta + gamma ~ 50/ms) keeps steps below ~0.07 ms.
+#   "rosenbrock" Modified Rosenbrock 2(3) of Shampine & Reichelt (the
+#                ode23s scheme), L-stable, with the analytic Jacobian of
+#                TripartiteSynapse.jacobian. One 45x45 linear system per
+#                step; steps grow to whatever the accuracy allows between
+#                spikes.
+#
+# The coupled rhs is deterministic (mean-field R-type channels) and does not
+# clip, so results follow the ODE, not the stochastic Euler reference.
+# ==============================================================================
+
+# Dormand–Prince 5(4) tableau
+_C = np.array([0.0, 1/5, 3/10, 4/5, 8/9, 1.0, 1.0])
+_A = [
+    [],
+    [1/5],
+    [3/40, 9/40],
+    [44/45, -56/15, 32/9],
+    [19372/6561, -25360/2187, 64448/6561, -212/729],
+    [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656],
+    [35/384, 0.0, 500/1113, 125/192, -2187/6784, 11/84],
+]
+_B = np.array([35/384, 0.0, 500/1113, 125/192, -2187/6784, 11/84, 0.0])
+# 5th minus embedded 4th order weights
+_E = _B - np.array([5179/57600, 0.0, 7571/16695, 393/640, -92097/339200, 187/2100, 1/40])
+
+
+# Absolute tolerance per state variable (units of the packed state).
+# Keys are qualified names or model prefixes; the first match wins.
+DEFAULT_ATOL = {
+    "hh.V": 1e-3,              # mV
+    "hh": 1e-6,                # gates
+    "ca_pre.m_Ca": 1e-6,
+    "ca_pre.q": 1e-6,
+    "ca_pre": 1e-12,           # M
+    "glu.g": 1e-12,            # M
+    "glu": 1e-8,               # sensor / vesicle fractions
+    "astro.h_a": 1e-6,
+    "astro": 1e-12,            # M
+    "glia.G_a": 1e-12,         # M
+    "glia": 1e-8,
+    "post.V_post": 1e-6,       # V
+    "post": 1e-8,
+    "post_ca": 1e-13,          # M
+    "camkii.ep": 1e-14,        # M
+    "camkii.I": 1e-14,         # M
+    "camkii": 1e-10,           # fractions
+}
+
+
+def _per_state(table):
+    """(N_STATE,) array from a {name or model prefix: value} table."""
+    # Exact names before model prefixes
+    keys = sorted(table, key=lambda k: "." not in k)
+    out = np.empty(state_layout.N_STATE)
+    for i, name in enumerate(state_layout.STATE_NAMES):
+        model = name.split(".")[0]
+        out[i] = next(table[k] for k in keys if k == name or k == model)
+    return out
+
+
+def atol_vector(atol=None):
+    """
+    Per-variable absolute tolerances as an (N_STATE,) array.
+    atol: None (DEFAULT_ATOL), a scalar, or a dict of overrides in the
+    DEFAULT_ATOL key format, e.g. {"hh.V": 1e-2, "camkii": 1e-9}.
+    """
+    if atol is not None and np.isscalar(atol):
+        return np.full(state_layout.N_STATE, float(atol))
+    return _per_state({**DEFAULT_ATOL, **(atol or {})})
+
+
+def drive_breakpoints(synapse, t_end):
+    """Sorted times (ms) in (0, t_end) where the driving inputs jump."""
+    points = protocol_edges(synapse.stimulus, t_end)
+    if 0 < synapse.glu_mute_ms < t_end:
+        points = np.union1d(points, [synapse.glu_mute_ms])
+    return points
+
+
+def _rms(x):
+    return np.sqrt(np.mean(x * x))
+
+
+def _hermite(t, h, y0, f0, y1, f1, t_eval):
+    """Cubic Hermite interpolant on the step [t, t + h] at t_eval."""
+    theta = (t_eval - t) / h
+    h00 = (1 + 2 * theta) * (1 - theta) ** 2
+    h10 = theta * (1 - theta) ** 2
+    h01 = theta ** 2 * (3 - 2 * theta)
+    h11 = theta ** 2 * (theta - 1)
+    return h00 * y0 + h10 * h * f0 + h01 * y1 + h11 * h * f1
+
+
+def _dopri_segment(f, jac, t0, t1, y, f0, h, rtol, atol, max_step, t_rec, on_record, stats):
+    """
+    Integrate y' = f(y) from t0 to t1 (drive constant inside).
+    Calls on_record(t, y) for every t in t_rec (sorted, within (t0, t1]).
+    Returns (y(t1), f(y(t1)), last accepted step).
+    """
+    k = np.empty((7, y.size))
+    rec_i = 0
+    t = t0
+    k[0] = f0
+    while t < t1:
+        h = min(h, max_step, t1 - t)
+        last = (t + h >= t1 - 1e-12 * max(1.0, abs(t1)))
+        if last:
+            h = t1 - t
+
+        for s in range(1, 7):
+            k[s] = f(y + h * np.dot(_A[s], k[:s]))
+        y_new = y + h * np.dot(_B[:6], k[:6])
+        # FSAL: k[6] was evaluated at y_new
+        err = h * np.dot(_E, k)
+        scale = atol + rtol * np.maximum(np.abs(y), np.abs(y_new))
+        err_norm = _rms(err / scale)
+        stats["nfev"] += 6
+
+        if err_norm <= 1.0:
+            t_new = t1 if last else t + h
+            # Recording points inside the accepted step: cubic Hermite
+            while rec_i < len(t_rec) and t_rec[rec_i] <= t_new:
+                on_record(t_rec[rec_i], _hermite(t, h, y, k[0], y_new, k[6], t_rec[rec_i]))
+                rec_i += 1
+            t, y = t_new, y_new
+            k[0] = k[6]
+            stats["steps"] += 1
+            stats["max_h"] = max(stats["max_h"], h)
+            factor = 5.0 if err_norm == 0 else min(5.0, 0.9 * err_norm ** -0.2)
+        else:
+            stats["rejected"] += 1
+            factor = max(0.2, 0.9 * err_norm ** -0.2)
+        h = h * factor
+    return y, k[0], h
+
+
+# Modified Rosenbrock 2(3) constants
+_D = 1.0 / (2.0 + np.sqrt(2.0))
+_E32 = 6.0 + np.sqrt(2.0)
+
+
+def _rosenbrock_segment(f, jac, t0, t1, y, f0, h, rtol, atol, max_step, t_rec, on_record, stats):
+    """
+    Integrate y' = f(y) from t0 to t1 with the linearly implicit
+    Rosenbrock 2(3) pair; jac(y) is the analytic Jacobian. Same contract
+    as _dopri_segment.
+    """
+    eye = np.eye(y.size)
+    rec_i = 0
+    t = t0
+    J = jac(y)
+    stats["njev"] += 1
+    while t < t1:
+        h = min(h, max_step, t1 - t)
+        last = (t + h >= t1 - 1e-12 * max(1.0, abs(t1)))
+        if last:
+            h = t1 - t
+
+        W_inv = np.linalg.inv(eye - (h * _D) * J)
+        k1 = W_inv @ f0
+        f1 = f(y + (0.5 * h) * k1)
+        k2 = W_inv @ (f1 - k1) + k1
+        y_new = y + h * k2
+        f2 = f(y_new)
+        k3 = W_inv @ (f2 - _E32 * (k2 - f1) - 2.0 * (k1 - f0))
+        err = (h / 6.0) * (k1 - 2.0 * k2 + k3)
+        scale = atol + rtol * np.maximum(np.abs(y), np.abs(y_new))
+        err_norm = _rms(err / scale)
+        stats["nfev"] += 2
+
+        if err_norm <= 1.0:
+            t_new = t1 if last else t + h
+            while rec_i < len(t_rec) and t_rec[rec_i] <= t_new:
+                on_record(t_rec[rec_i], _hermite(t, h, y, f0, y_new, f2, t_rec[rec_i]))
+                rec_i += 1
+            t, y, f0 = t_new, y_new, f2
+            stats["steps"] += 1
+            stats["max_h"] = max(stats["max_h"], h)
+            factor = 5.0 if err_norm == 0 else min(5.0, 0.9 * err_norm ** (-1 / 3))
+            if t < t1:
+                J = jac(y)
+                stats["njev"] += 1
+        else:
+            stats["rejected"] += 1
+            factor = max(0.2, 0.9 * err_norm ** (-1 / 3))
+        h = h * factor
+    return y, f0, h
+
+
+METHODS = {
+    "dopri5": _dopri_segment,
+    "rosenbrock": _rosenbrock_segment,
+}
+
+
+def integrate(synapse, method="dopri5", rtol=1e-5, atol=None, first_step=1e-3,
+              max_step=np.inf, verbose=False):
+    """
+    Integrate synapse from its current state over [0, T_total] ms with an
+    adaptive method from METHODS. Returns (time_ms, Y_rec, stats) where
+    Y_rec has shape (N_STATE, n_records) on the fixed-step recording grid.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Bilinmeyen yöntem: {method!r} (seçenekler: {', '.join(METHODS)})")
+    segment = METHODS[method]
+    T = synapse.T_total
+    rec_dt = synapse.rec_step * synapse.dt
+    rec_size = (synapse.steps + synapse.rec_step - 1) // synapse.rec_step
+    time_ms = np.arange(rec_size) * rec_dt
+    atol = atol_vector(atol)
+
+    edges = np.concatenate([[0.0], drive_breakpoints(synapse, T), [T]])
+    Y_rec = np.empty((state_layout.N_STATE, rec_size))
+    stats = {"steps": 0, "rejected": 0, "nfev": 0, "njev": 0,
+             "segments": len(edges) - 1, "max_h": 0.0}
+
+    y = synapse.get_state()
+    Y_rec[:, 0] = y
+    rec_pos = 1
+
+    def on_record(t, y_t):
+        nonlocal rec_pos
+        Y_rec[:, rec_pos] = y_t
+        rec_pos += 1
+
+    h = first_step
+    for seg, (a, b) in enumerate(zip(edges[:-1], edges[1:])):
+        t_mid = 0.5 * (a + b)
+        f = lambda y_, t_mid=t_mid: synapse.rhs(t_mid, y_)
+        jac = lambda y_, t_mid=t_mid: synapse.jacobian(t_mid, y_)
+        stop = np.searchsorted(time_ms, b, side="right")
+        t_rec = time_ms[rec_pos:stop]
+        y, _, h = segment(f, jac, a, b, y, f(y), h, rtol, atol, max_step,
+                          t_rec, on_record, stats)
+        stats["nfev"] += 1
+        if verbose and seg % max(len(edges) // 10, 1) == 0:
+            print(f"%{(b / T) * 100:.0f} tamamlandı. (Simülasyon Zamanı: {b/1000:.1f} s, "
+                  f"adım: {stats['steps']})")
+
+    synapse.set_state(y)
+    return time_ms, Y_rec, stats
+
+
+def recorded_states(synapse, time_ms, Y):
+    """Recorder holding states integrated with the (mean-field) rhs."""
+    from simulation.recorder import Recorder
+
+    S = state_layout.SLICES
+    p_ca = synapse.params["post_synaptic_ca"]
+    if synapse.alpha_feedback:
+        alpha = synapse.base_alpha * (1.0 + synapse.camkii.get_alpha_modulation(Y[S["camkii"]][:11]))
+    else:
+        alpha = np.full(Y.shape[1], synapse.base_alpha)
+    glu_syn = np.where(time_ms < synapse.glu_mute_ms, 0.0, Y[S["glu"]][9])
+    I_AMPA = synapse.post.ampa_current(Y[S["post"]])
+    V_post = Y[S["post"]][0]
+    i_R = np.where(V_post > -0.030, p_ca['g_R'] * p_ca['N_R'] * p_ca['P_open'] * (V_post - p_ca['V_R']), 0.0)
+    recorder = Recorder(synapse.probes, synapse.rec_step, Y.shape[1], all_channels=True)
+    n = state_layout.N_STATE
+    recorder.buffer[:, :n] = Y.T
+    recorder.buffer[:, n:] = np.column_stack(np.broadcast_arrays(alpha, glu_syn, I_AMPA, i_R))
+    return recorder
+
+
+# ==============================================================================
+# Quiescent fast-forward for TripartiteSynapse.run(fast_forward=True)
+#
+# Between drive edges, once the fast states (HH, glutamate release, cleft,
+# post-synaptic membrane) have settled, the Euler loop hands over to the
+# Rosenbrock integrator up to the next edge. Slow states (ER, astrocyte,
+# CaMKII, post-synaptic Ca tail) keep evolving, with steps of many ms.
+#
+# The Euler reference clips several states at a floor (c_fast >= 0, ...);
+# a state held at its floor while its rhs points outward is frozen here,
+# which is what the clipped Euler step does in the limit.
+# ==============================================================================
+
+# Euler floors (same key format as DEFAULT_ATOL); -inf: never clipped
+EULER_FLOORS = {
+    "hh": -np.inf,
+    "ca_pre.c_slow": 1e-10,
+    "ca_pre.c_ER": 1e-10,
+    "ca_pre.p_ip3": -np.inf,
+    "ca_pre.m_Ca": -np.inf,
+    "ca_pre.q": -np.inf,
+    "ca_pre": 0.0,
+    "glu": 0.0,
+    "astro.c_a": 1e-12,
+    "astro": 0.0,
+    "glia": 0.0,
+    "post.V_post": -np.inf,
+    "post": 0.0,
+    "post_ca": 1e-9,
+    "camkii": 0.0,
+}
+
+# States that must have settled before fast-forwarding
+REST_STATES = ("hh", "ca_pre.c_fast", "ca_pre.m_Ca", "glu", "glia.G_a", "post")
+
+# Accuracy of the fast-forward integration
+FAST_FORWARD_RTOL = 1e-4
+
+
+def _rest_mask():
+    names = state_layout.STATE_NAMES
+    return np.array([n in REST_STATES or n.split(".")[0] in REST_STATES for n in names])
+
+
+def _pinned(y, dy, floors, atol):
+    """States held at their Euler floor with the rhs pointing outward."""
+    # Slack: stage values may sit a roundoff above the floor
+    return (y <= floors + 1e-6 * atol) & (dy < 0)
+
+
+def is_quiescent(synapse, t, y, rest_tol):
+    """
+    True when every fast state drifts by less than rest_tol (relative,
+    per ms) and the R-type channels are closed (deterministic regime).
+    """
+    if y[state_layout.index("post.V_post")] > -0.030:
+        return False
+    atol = atol_vector()
+    f = synapse.rhs(t, y)
+    f[_pinned(y, f, _per_state(EULER_FLOORS), atol)] = 0.0
+    drift = np.abs(f) / (np.abs(y) + atol)
+    return bool(np.all(drift[_rest_mask()] <= rest_tol))
+
+
+def fast_forward(synapse, t0, t1, y, t_rec, on_record, stats):
+    """
+    Advance y from t0 to t1 (no drive edge inside) with Rosenbrock steps on
+    the floor-projected rhs. on_record(t, y_t) for each t in t_rec.
+    Returns y(t1).
+    """
+    floors = _per_state(EULER_FLOORS)
+    atol = atol_vector()
+    t_mid = 0.5 * (t0 + t1)
+
+    def f(y_):
+        dy = synapse.rhs(t_mid, y_)
+        dy[_pinned(y_, dy, floors, atol)] = 0.0
+        return dy
+
+    def jac(y_):
+        J = synapse.jacobian(t_mid, y_)
+        J[_pinned(y_, synapse.rhs(t_mid, y_), floors, atol)] = 0.0
+        return J
+
+    y, _, _ = _rosenbrock_segment(f, jac, t0, t1, y, f(y), 0.1, FAST_FORWARD_RTOL,
+                                  atol, np.inf, t_rec, on_record, stats)
+    return np.maximum(y, floors)
@@ -0,0 +1,81 @@
+import numpy as np
+
+
+# ==============================================================================
+# Action-potential templates for the presynaptic HH terminal
+#
+# Under a constant applied current the HH spike is stereotyped: once V_pre
+# crosses SPIKE_THRESHOLD upwards, the next TEMPLATE_MS are fixed by the
+# state at the crossing. TripartiteSynapse.run(ap_templates=True) records
+# V_pre over that window the first time a spike fires at a given drive
+# and replays it for later spikes whose crossing state (V, m, h, n) lies
+# within template_tol of the recorded one. The HH ODEs are then skipped for the
+# window and the recorded end state is restored after it.
+#
+# A template is only recorded or replayed when the drive stays constant
+# over the whole window; sub-threshold responses never cross, so they are
+# integrated, until the terminal settles: once no HH state variable (V in
+# mV, m, h, n) moves more than SETTLED_TOL in a step, the terminal is held
+# at that state (a flat template) for HOLD_MS, or up to the next drive
+# change, and the test is repeated on the step after the hold.
+# ==============================================================================
+
+# Upward V_pre crossing that triggers a template (mV); below the upstroke,
+# where V still moves less than a millivolt per step
+SPIKE_THRESHOLD = -50.0
+
+# Template length after the crossing (ms): upstroke, peak and repolarisation
+TEMPLATE_MS = 5.0
+
+# Trigger state scale: V differences in mV are divided by this before the
+# tolerance test; gate differences enter as they are
+V_SCALE = 10.0
+
+# Largest change per step of V (mV), m, h and n below which the terminal
+# counts as settled; V alone is flat at every turning point
+SETTLED_TOL = 1e-9
+
+# Longest hold of a settled terminal (ms) before it is integrated again
+HOLD_MS = 50.0
+
+# Templates kept per drive value (different refractory histories)
+MAX_PER_DRIVE = 8
+
+
+class APTemplates:
+    """
+    Recorded spike windows per drive value (uA/cm2) for one dt.
+
+    dt:  step (ms); templates are only valid on the grid they were taken on.
+    tol: largest scaled difference of the trigger state, max(|dV| / V_SCALE,
+         |dm|, |dh|, |dn|), for a replay.
+    """
+
+    def __init__(self, dt, tol=1e-3, length_ms=TEMPLATE_MS, threshold=SPIKE_THRESHOLD):
+        self.dt = dt
+        self.tol = tol
+        self.threshold = threshold
+        self.steps = max(int(round(length_ms / dt)), 1)
+        self.templates = {}   # drive -> [(trigger state, V trace, states)]
+
+    def match(self, drive, state):
+        """Closest template for drive within tol of the trigger state, or None."""
+        best, best_err = None, self.tol
+        for template in self.templates.get(drive, ()):
+            diff = np.abs(template[0] - state)
+            diff[0] /= V_SCALE
+            err = diff.max()
+            if err <= best_err:
+                best, best_err = template, err
+        return best
+
+    def store(self, drive, trigger_state, states):
+        """
+        Keep a recorded window: states[j] is the HH state [V, m, h, n] j + 1
+        steps after the crossing (oldest dropped beyond MAX_PER_DRIVE).
+        """
+        states = np.array(states, dtype=np.float64)
+        stored = self.templates.setdefault(drive, [])
+        if len(stored) >= MAX_PER_DRIVE:
+            stored.pop(0)
+        stored.append((np.array(trigger_state), states[:, 0].tolist(), states))
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import shutil
+
+from simulation.checkpoint import config_key, drive_key, state_key
+from simulation.paths import cache_subdir
+from simulation.recorder import QUANTITIES, ChunkStore, Traces, make_probes
+from simulation.synapse import SimulationResult
+
+
+# ==============================================================================
+# Content-addressed cache of TripartiteSynapse runs
+#
+# cached_run(synapse) returns the run's result from CACHE_DIR/<key>/ when
+# an earlier call (from any script) made the same run, and otherwise runs
+# it, streamed into that directory. The key hashes everything the
+# recorded channels depend on: parameters, dt, update schemes, init, the
+# state the run starts from (so a set_state() before the run counts), the
+# full compiled stimulus, the run length, rec_step, backend, seed and the
+# source code of models/, parameters/ and simulation/ (code_version()).
+# The requested probes are not part of it: a cached run holds the channels
+# of every recordable quantity, so scripts drawing different panels of
+# the same run share one entry.
+#
+# Entries are evicted least recently used first once the cache grows
+# beyond max_bytes; a hit marks the entry as used.
+# ==============================================================================
+
+# Entries live under the shared cache root (simulation.paths)
+CACHE_DIR = cache_subdir("runs")
+
+# Default size cap of the cache directory
+CACHE_MAX_BYTES = 4 << 30
+
+_SOURCE_DIRS = ("models", "parameters", "simulation")
+_code_version = None
+
+
+def code_version():
+    """Hash of the model, parameter and simulation sources (computed once)."""
+    global _code_version
+    if _code_version is None:
+        src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        digest = hashlib.sha1()
+        for name in _SOURCE_DIRS:
+            folder = os.path.join(src, name)
+            for file in sorted(f for f in os.listdir(folder) if f.endswith(".py")):
+                digest.update(f"{name}/{file}".encode())
+                with open(os.path.join(folder, file), "rb") as fh:
+                    digest.update(fh.read())
+        _code_version = digest.hexdigest()
+    return _code_version
+
+
+def cache_key(synapse, backend="python", seed=0):
+    """Key of the run synapse.run(backend=backend, seed=seed) in the cache."""
+    payload = json.dumps({
+        "config": config_key(synapse),
+        "start": state_key(synapse),
+        "drive": drive_key(synapse.stimulus_schedule(), synapse.steps),
+        "steps": synapse.steps,
+        "rec_step": synapse.rec_step,
+        "backend": backend,
+        "seed": seed,
+        "code": code_version(),
+    }, sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _entry_bytes(path):
+    return sum(os.path.getsize(os.path.join(folder, f))
+               for folder, _, files in os.walk(path) for f in files)
+
+
+def evict(cache_dir=None, max_bytes=CACHE_MAX_BYTES, keep=()):
+    """Remove least recently used entries until the cache fits max_bytes (keys in keep stay)."""
+    cache_dir = CACHE_DIR if cache_dir is None else cache_dir
+    if not os.path.isdir(cache_dir):
+        return
+    entries = [(os.path.getmtime(os.path.join(cache_dir, key)), key,
+                _entry_bytes(os.path.join(cache_dir, key)))
+               for key in os.listdir(cache_dir)
+               if os.path.isdir(os.path.join(cache_dir, key)) and not key.endswith(".tmp")]
+    total = sum(size for _, _, size in entries)
+    for _, key, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if key not in keep:
+            shutil.rmtree(os.path.join(cache_dir, key), ignore_errors=True)
+            total -= size
+
+
+def _result(store_path, synapse, stats, wall_time=0.0):
+    store = ChunkStore.open(store_path)
+    # The store holds every quantity's channels: evaluate the synapse's own probes
+    store.probes = {probe.label: probe for probe in synapse.probes}
+    return SimulationResult(None, Traces(store, synapse.params), wall_time=wall_time, stats=stats)
+
+
+def cached_run(synapse, backend="python", seed=0, verbose=False, cache_dir=None,
+               max_bytes=CACHE_MAX_BYTES):
+    """
+    synapse.run(verbose=verbose, backend=backend, seed=seed) through the
+    cache (see above). result.stats["cached"] tells whether it was loaded.
+    Cached runs must be reproducible, so there is no unseeded mode.
+    """
+    cache_dir = CACHE_DIR if cache_dir is None else cache_dir
+    key = cache_key(synapse, backend, seed)
+    entry = os.path.join(cache_dir, key)
+    store_path = os.path.join(entry, "store")
+    rows = (synapse.steps + synapse.rec_step - 1) // synapse.rec_step
+    if os.path.exists(os.path.join(store_path, "meta.json")):
+        store = ChunkStore.open(store_path)
+        if store.complete and store.rows == rows:
+            os.utime(entry)
+            if verbose:
+                print(f"Önbellekten yüklendi: {entry}")
+            return _result(store_path, synapse, {"cached": True})
+
+    # Streamed under a temporary name with all quantities, renamed when complete
+    tmp = f"{entry}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    probes = synapse.probes
+    synapse.probes = make_probes(tuple(QUANTITIES), synapse.rec_step)
+    try:
+        result = synapse.run(verbose=verbose, backend=backend, seed=seed,
+                             stream=os.path.join(tmp, "store"))
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    finally:
+        synapse.probes = probes
+    shutil.rmtree(entry, ignore_errors=True)
+    os.replace(tmp, entry)
+    evict(cache_dir, max_bytes, keep=(key,))
+    return _result(store_path, synapse, {**result.stats, "cached": False}, result.wall_time)
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from simulation import state as state_layout
+
+
+# ==============================================================================
+# Checkpoints of TripartiteSynapse runs
+#
+# A checkpoint holds everything run() needs to go on at step `step` as if
+# it had never stopped:
+#   y     packed state of the eight models (simulation.state)
+#   aux   alpha, glu_syn, glu_extra, post I_AMPA, post_ca i_R
+#   sums  running multi-rate input sums (c_i, glu_extra, glu_syn, Ca_post)
+#   rng   NumPy's global MT19937 state (R-type channel draws of
+#         PostSynapticCalciumDynamics) and, with numba installed, the
+#         compiled loop's own generator state
+# plus config_key(), the hash of the configuration it belongs to, and
+# drive_key(), the hash of the compiled drive before the checkpoint step: a
+# resume with other parameters, dt or update schemes, or with a drive that
+# differs before that step, is refused. T_total, the recording settings and
+# the drive after the step are not part of them, so a finished run can be
+# extended and scenarios that share a stimulus prefix can all go on from
+# one checkpoint of it (simulation.sweep). Stored as one uncompressed .npz (about 6 kB),
+# written under a temporary name and renamed.
+# ==============================================================================
+
+# Layout version: bump when the stored arrays (or their units) change
+_CHECKPOINT_VERSION = 3
+
+AUX_FIELDS = ("alpha", "glu_syn", "glu_extra", "I_AMPA", "i_R")
+
+
+def _jsonable(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return float(value)
+
+
+def config_key(synapse):
+    """Hash of everything a resumed run must share with the checkpointed one."""
+    payload = json.dumps({
+        "params": synapse.params,
+        "dt": synapse.dt,
+        "slow_every": synapse.slow_every,
+        "gates": synapse.gates,
+        "rates": synapse.rates,
+        "rate_steps": synapse.rate_steps,
+        "camkii_update": synapse.camkii_update,
+        "sensor_update": synapse.sensor_update,
+        "glu_mute_ms": synapse.glu_mute_ms,
+        "alpha_feedback": synapse.alpha_feedback,
+        "init": synapse.init,
+        "states": state_layout.STATE_NAMES,
+        "version": _CHECKPOINT_VERSION,
+    }, sort_keys=True, default=_jsonable)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def state_key(synapse):
+    """Hash of the synapse's current state and model outputs (where a run of it starts)."""
+    digest = hashlib.sha1(np.ascontiguousarray(synapse.get_state()).tobytes())
+    digest.update(np.array([synapse.alpha, synapse.glu_syn, synapse.glu_extra,
+                            synapse.post.I_AMPA, synapse.post_ca.i_R], dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def drive_key(drive, step):
+    """Hash of a compiled drive (stimulus.Schedule) over the steps before step."""
+    keep = drive.starts[:-1] < step
+    digest = hashlib.sha1(np.ascontiguousarray(drive.starts[:-1][keep]).tobytes())
+    digest.update(np.ascontiguousarray(drive.values[keep]).tobytes())
+    return digest.hexdigest()
+
+
+def _numba_rng():
+    """numba's helper module and the state pointer of its NumPy generator, or None."""
+    from simulation.kernel import NUMBA_AVAILABLE
+    if not NUMBA_AVAILABLE:
+        return None
+    from numba import _helperlib
+    return _helperlib, _helperlib.rnd_get_np_state_ptr()
+
+
+def save_checkpoint(path, synapse, step, sums, drive=None):
+    """
+    Write the synapse's current state as the checkpoint of step `step`
+    (the next step to run); sums: the loop's four multi-rate input sums.
+    drive: the run's compiled stimulus (default: compiled here).
+    """
+    drive = synapse.stimulus_schedule() if drive is None else drive
+    _, keys, pos, has_gauss, gauss = np.random.get_state()
+    arrays = {
+        "version": np.int64(_CHECKPOINT_VERSION),
+        "key": np.array(config_key(synapse)),
+        "drive": np.array(drive_key(drive, step)),
+        "step": np.int64(step),
+        "y": synapse.get_state(),
+        "aux": np.array([synapse.alpha, synapse.glu_syn, synapse.glu_extra,
+                         synapse.post.I_AMPA, synapse.post_ca.i_R], dtype=np.float64),
+        "sums": np.array(sums, dtype=np.float64),
+        "rng_keys": keys,
+        "rng_pos": np.int64(pos),
+        "rng_gauss": np.array([has_gauss, gauss], dtype=np.float64),
+    }
+    numba_rng = _numba_rng()
+    if numba_rng is not None:
+        helper, ptr = numba_rng
+        index, state = helper.rnd_get_state(ptr)
+        arrays["numba_rng_pos"] = np.int64(index)
+        arrays["numba_rng_keys"] = np.array(state, dtype=np.uint32)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        np.savez(fh, **arrays)
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path):
+    """Arrays of a checkpoint file (dict)."""
+    with np.load(path) as data:
+        ckpt = {name: data[name] for name in data.files}
+    if int(ckpt["version"]) != _CHECKPOINT_VERSION:
+        raise ValueError(f"Desteklenmeyen checkpoint sürümü: {int(ckpt['version'])}")
+    return ckpt
+
+
+def restore_checkpoint(synapse, path, drive=None):
+    """
+    Load the checkpoint into synapse (states, outputs, random generators).
+    drive: the run's compiled stimulus (default: compiled here).
+    Returns (step, sums) for the run loop.
+    """
+    ckpt = load_checkpoint(path)
+    if str(ckpt["key"]) != config_key(synapse):
+        raise ValueError(f"Checkpoint bu yapılandırmaya ait değil: {path}")
+    step = int(ckpt["step"])
+    if step > synapse.steps:
+        raise ValueError(f"Checkpoint adımı ({step}) koşu uzunluğunu ({synapse.steps}) aşıyor.")
+    drive = synapse.stimulus_schedule() if drive is None else drive
+    if str(ckpt["drive"]) != drive_key(drive, step):
+        raise ValueError(f"Uyarım checkpoint adımından önce farklı: {path}")
+
+    synapse.set_state(ckpt["y"])
+    (synapse.alpha, synapse.glu_syn, synapse.glu_extra,
+     synapse.post.I_AMPA, synapse.post_ca.i_R) = ckpt["aux"].tolist()
+    has_gauss, gauss = ckpt["rng_gauss"].tolist()
+    np.random.set_state(("MT19937", ckpt["rng_keys"], int(ckpt["rng_pos"]), int(has_gauss), gauss))
+    numba_rng = _numba_rng()
+    if numba_rng is not None and "numba_rng_keys" in ckpt:
+        helper, ptr = numba_rng
+        helper.rnd_set_state(ptr, (int(ckpt["numba_rng_pos"]), ckpt["numba_rng_keys"].tolist()))
+    return step, tuple(ckpt["sums"].tolist())
@@ -0,0 +1,470 @@
+import time
+
+import numpy as np
+
+from models.hh import PresynapticHH
+from models.calcium_model import PresynapticCalciumDynamics
+from models.presynaptic_glutamate import GlutamateDynamics
+from models.astrocyte import AstrocyteDynamics
+from models.camkii import CaMKIIDynamics
+from models.gating import exp_gate, exp_relax
+from simulation import state as state_layout
+from simulation.stimulus import Schedule
+from simulation.synapse import DEFAULT_PARAMS, DEFAULT_RECORD, SimulationResult, TripartiteSynapse
+
+
+S = state_layout.SLICES
+_i = state_layout.index
+
+# Parameter group behind each tabulated model (TripartiteSynapse.rate_tables)
+_TABLE_PARAM_GROUP = {"hh": "pre_synaptic", "ca_pre": "ca", "glu": "glutamate", "astro": "astrocyte"}
+
+# ==============================================================================
+# Recordable quantities for the ensemble: name -> getter(ensemble) -> (N,)
+# Same names and plotting units as simulation.recorder.QUANTITIES.
+# ==============================================================================
+ENSEMBLE_PROBES = {
+    # Pre-synaptic
+    "V_pre":     lambda e: e.Y[_i("hh.V")],
+    "Ca_fast":   lambda e: e.Y[_i("ca_pre.c_fast")] * 1e6,
+    "Ca_slow":   lambda e: e.Y[_i("ca_pre.c_slow")] * 1e6,
+    "Ca_total":  lambda e: (e.Y[_i("ca_pre.c_fast")] + e.Y[_i("ca_pre.c_slow")]) * 1e6,
+    "Ca_ER":     lambda e: e.Y[_i("ca_pre.c_ER")] * 1e6,
+    "IP3_pre":   lambda e: e.Y[_i("ca_pre.p_ip3")] * 1e6,
+    "q_pre":     lambda e: e.Y[_i("ca_pre.q")],
+    "Glu_syn":   lambda e: e.glu_syn * 1e6,
+
+    # Astrocyte
+    "Ca_astro":  lambda e: e.Y[_i("astro.c_a")] * 1e6,
+    "IP3_astro": lambda e: e.Y[_i("astro.p_a")] * 1e6,
+    "h_gate":    lambda e: e.Y[_i("astro.h_a")],
+    "Glu_extra": lambda e: e.Y[_i("glia.G_a")] * 1e6,
+    "O1":        lambda e: e.Y[_i("glia.O1")],
+    "O2":        lambda e: e.Y[_i("glia.O2")],
+    "O3":        lambda e: e.Y[_i("glia.O3")],
+    "R_a":       lambda e: e.Y[_i("glia.R_a")],
+    "E_a":       lambda e: e.Y[_i("glia.E_a")],
+    "I_a":       lambda e: 1.0 - e.Y[_i("glia.R_a")] - e.Y[_i("glia.E_a")],
+    "G_a":       lambda e: e.Y[_i("glia.G_a")] * 1e6,
+
+    # Post-synaptic
+    "V_post":    lambda e: e.Y[_i("post.V_post")] * 1e3,
+    "m_AMPA":    lambda e: e.Y[_i("post.m_AMPA")],
+    "I_AMPA":    lambda e: e.I_AMPA * 1e9,
+    "Ca_post":   lambda e: e.Y[_i("post_ca.c_post")] * 1e6,
+    "i_R":       lambda e: e.i_R * 1e12,
+
+    # LTP
+    "CaMKII_P":  lambda e: np.sum(e.Y[S["camkii"]][1:11], axis=0) * e.params["camkii"]["e_k"] * 1e6,
+    "alpha":     lambda e: e.alpha * 1e-9,
+}
+
+
+def _member_overrides(shared, members):
+    """Full parameter overrides of each member (shared + own), per group."""
+    overrides = []
+    for m in members:
+        own = m.get("params", {})
+        unknown = [g for g in own if g not in DEFAULT_PARAMS]
+        if unknown:
+            raise ValueError(f"Bilinmeyen parametre grubu: {unknown}")
+        merged = {g: {**shared.get(g, {}), **own.get(g, {})} for g in DEFAULT_PARAMS}
+        overrides.append({g: o for g, o in merged.items() if o})
+    return overrides
+
+
+def _vectorize_params(member_params):
+    """
+    Per-member parameter dicts -> one dict per group whose values are
+    scalars when all members agree and (N,) float arrays otherwise.
+    """
+    merged = {}
+    for group in DEFAULT_PARAMS:
+        groups = [mp[group] for mp in member_params]
+        merged[group] = {}
+        for key, first in groups[0].items():
+            values = [g[key] for g in groups]
+            if all(v == first for v in values[1:]):
+                merged[group][key] = first
+            else:
+                merged[group][key] = np.array(values, dtype=np.float64)
+    return merged
+
+
+class SynapseEnsemble:
+    """
+    N tripartite synapses advanced in lockstep.
+
+    Every state variable of every model is a row of the packed (N_STATE, N)
+    array Y (layout: simulation.state), and one call to step() advances all
+    members with vectorized NumPy, in the same operator-split order as the
+    scalar model step() methods.
+
+    members: list of dicts, e.g.
+        [{"label": "50Hz", "current": 10.0},
+         {"label": "100Hz", "current": 22.0, "params": {"camkii": {"P_half": 55e-6}}}]
+        A member's "stimulus" (protocols) replaces the shared one.
+    params:  overrides shared by all members (same format as TripartiteSynapse).
+    Other arguments as in TripartiteSynapse.
+    """
+
+    def __init__(self, members, T_total=30000.0, dt=0.05,
+                 stim_window=(10000.0, 20000.0), params=None,
+                 record=DEFAULT_RECORD,
+                 rec_step=20, glu_mute_ms=0.0, alpha_feedback=True, gates="euler",
+                 init="default", rates="exact", rate_steps=None, camkii_update="euler",
+                 sensor_update="euler", stimulus=None):
+        if not members:
+            raise ValueError("Topluluk en az bir üye içermeli.")
+        unknown = [name for name in record if name not in ENSEMBLE_PROBES]
+        if unknown:
+            raise ValueError(f"Bilinmeyen kayıt değişkeni: {unknown}")
+
+        self.members = list(members)
+        self.n = len(self.members)
+        self.labels = [m.get("label", str(k)) for k, m in enumerate(self.members)]
+        self.T_total = T_total
+        self.dt = dt
+        self.stim_window = stim_window
+        self.record = tuple(record)
+        self.rec_step = rec_step
+        self.glu_mute_ms = glu_mute_ms
+        self.alpha_feedback = alpha_feedback
+        self.gates = gates
+        self.init = init
+        self.rates = rates
+        self.rate_steps = rate_steps
+        self.camkii_update = camkii_update
+        self.sensor_update = sensor_update
+        self.stimulus = stimulus
+        self.currents = np.array([float(m.get("current", 0.0)) for m in self.members])
+
+        self.member_overrides = _member_overrides(params or {}, self.members)
+        self.reset()
+
+    def member_synapse(self, k, **kwargs):
+        """Scalar TripartiteSynapse equivalent to member k (for checks)."""
+        return TripartiteSynapse(T_total=self.T_total, dt=self.dt,
+                                 current=self.currents[k], stim_window=self.stim_window,
+                                 params=self.member_overrides[k], rec_step=self.rec_step,
+                                 glu_mute_ms=self.glu_mute_ms,
+                                 alpha_feedback=self.alpha_feedback, gates=self.gates,
+                                 init=self.init, rates=self.rates,
+                                 rate_steps=self.rate_steps,
+                                 camkii_update=self.camkii_update,
+                                 sensor_update=self.sensor_update,
+                                 stimulus=self.members[k].get("stimulus", self.stimulus), **kwargs)
+
+    def reset(self):
+        """Initial conditions and derived constants from the scalar models."""
+        refs = [self.member_synapse(k, record=()) for k in range(self.n)]
+        self.params = _vectorize_params([r.params for r in refs])
+        self.Y = np.stack([r.get_state() for r in refs], axis=1)
+        self.stimuli = [r.stimulus for r in refs]
+
+        def stacked(get):
+            values = np.array([get(r) for r in refs], dtype=np.float64)
+            return values[0] if np.all(values == values[0]) else values
+
+        self.V_Ca = stacked(lambda r: r.ca_pre.V_Ca)
+        self.inv_zFV = stacked(lambda r: r.ca_pre.inv_zFV)
+        self.alpha_conv = stacked(lambda r: r.post_ca.alpha_conv)
+        self.w = refs[0].camkii.w
+
+        # Rate tables of member 0, shared where the members' parameters agree
+        self.rate_tables = {
+            key: table for key, table in refs[0].rate_tables.items()
+            if not any(isinstance(v, np.ndarray)
+                       for v in self.params[_TABLE_PARAM_GROUP[key.split(".")[0]]].values())}
+
+        self.base_alpha = self.params["glutamate"]["alpha"]
+        self.alpha = np.array([r.alpha for r in refs], dtype=np.float64)
+        self.glu_syn = np.array([r.glu_syn for r in refs], dtype=np.float64)
+        self.I_AMPA = np.array([r.post.I_AMPA for r in refs], dtype=np.float64)
+        self.i_R = np.array([r.post_ca.i_R for r in refs], dtype=np.float64)
+
+    @property
+    def steps(self):
+        return int(self.T_total / self.dt)
+
+    # ==========================================================================
+    # Vectorized model steps (mirror the scalar step() methods line by line)
+    # ==========================================================================
+    def _step_hh(self, dt, I_app):
+        p = self.params["pre_synaptic"]
+        y = self.Y[S["hh"]]
+        V, m, h, n = y[0], y[1], y[2], y[3]
+
+        (a_m, b_m), (a_h, b_h), (a_n, b_n) = self._hh_model.gate_rates(V)
+        if self.gates == "exponential":
+            m[:] = exp_gate(m, a_m, b_m, dt)
+            h[:] = exp_gate(h, a_h, b_h, dt)
+            n[:] = exp_gate(n, a_n, b_n, dt)
+        else:
+            dm = (a_m * (1 - m)) - (b_m * m)
+            dh = (a_h * (1 - h)) - (b_h * h)
+            dn = (a_n * (1 - n)) - (b_n * n)
+            m += dt * dm
+            h += dt * dh
+            n += dt * dn
+
+        I_Na = p["g_Na"] * (m**3) * h * (V - p["V_Na"])
+        I_K  = p["g_K"]  * (n**4) * (V - p["V_K"])
+        I_L  = p["g_L"]  * (V - p["V_L"])
+
+        if self.gates == "exponential":
+            g_Na = p["g_Na"] * (m**3) * h
+            g_K = p["g_K"] * (n**4)
+            g_total = g_Na + g_K + p["g_L"]
+            V_inf = (I_app + g_Na * p["V_Na"] + g_K * p["V_K"]
+                     + p["g_L"] * p["V_L"]) / g_total
+            V[:] = exp_relax(V, V_inf, g_total / p["C_m"], dt)
+        else:
+            dV = (I_app - I_Na - I_K - I_L) / p["C_m"]
+            V += dt * dV
+        return V
+
+    def _step_ca_pre(self, dt, V_pre, glu):
+        p = self.params["ca"]
+        y = self.Y[S["ca_pre"]]
+        c_fast, c_slow, c_ER, p_ip3, m_Ca, q = y[0], y[1], y[2], y[3], y[4], y[5]
+
+        c_i = np.maximum(c_fast + c_slow, 1e-9)
+
+        m_inf = self._ca_model.vgcc_m_inf(V_pre)
+        if self.gates == "exponential":
+            m_Ca[:] = exp_gate(m_Ca, m_inf / p["tau_mCa"], (1.0 - m_inf) / p["tau_mCa"], dt)
+        else:
+            m_Ca += ((m_inf - m_Ca) / p["tau_mCa"]) * dt
+        g_total = p["rho_Ca"] * (m_Ca**2) * p["g_Ca"]
+        I_Ca_amp = g_total * (V_pre - self.V_Ca) * p["A_btn"]
+        I_PMCA_amp = p["v_PMCA_max"] * (c_i**2) / (c_i**2 + p["K_PMCA"]**2) * p["A_btn"]
+        J_leak = p["v_leak"] * (p["c_ext"] - c_i)
+        dc_fast_dt = -(I_Ca_amp + I_PMCA_amp) * self.inv_zFV + J_leak
+
+        m_inf_ip3 = p_ip3 / (p_ip3 + p["d1"])
+        n_inf_ip3 = c_i / (c_i + p["d5"])
+        alpha_q = p["a2"] * p["d2"] * (p_ip3 + p["d1"]) / (p_ip3 + p["d3"])
+        beta_q = p["a2"] * c_i
+        if self.gates == "exponential":
+            q[:] = exp_gate(q, alpha_q, beta_q, dt)
+        else:
+            q += (alpha_q * (1.0 - q) - beta_q * q) * dt
+
+        prob = (m_inf_ip3**3) * (n_inf_ip3**3) * (q**3)
+        J_IP3R = p["c1"] * p["v1"] * prob * (c_ER - c_i)
+        J_SERCA = p["v3"] * (c_i**2) / (c_i**2 + p["k3"]**2)
+        J_ER_Leak = p["c1"] * p["v2"] * (c_ER - c_i)
+        dc_slow_dt = J_IP3R + J_ER_Leak - J_SERCA
+        dc_ER_dt = -(1.0 / p["c1"]) * dc_slow_dt
+
+        term_prod = self._ca_model.ip3_production(glu)
+        dp_dt = term_prod - p["tau_p"] * (p_ip3 - p["p0"])
+
+        c_fast += dc_fast_dt * dt
+        c_slow += dc_slow_dt * dt
+        c_ER += dc_ER_dt * dt
+        p_ip3 += dp_dt * dt
+        np.maximum(c_fast, 0.0, out=c_fast)
+        np.maximum(c_slow, 1e-10, out=c_slow)
+        np.maximum(c_ER, 1e-10, out=c_ER)
+
+    def _step_glu(self, dt, c_i, alpha):
+        y = self.Y[S["glu"]]
+        dy = self._glu_model.derivatives(y, c_i, alpha=alpha, out=self._glu_buf)
+        if self.sensor_update == "euler":
+            y += dt * dy
+            np.clip(y[:9], 0.0, 1.0, out=y[:9])
+        else:
+            # Sensor propagated for the frozen alpha * c_i, vesicles by Euler
+            y[:7] = self._glu_model.sensor_propagate(y[:7], alpha * np.maximum(c_i, 0.0), dt)
+            y[7:] += dt * dy[7:]
+            np.clip(y[7:9], 0.0, 1.0, out=y[7:9])
+        np.maximum(y[9], 0.0, out=y[9])
+        return y[9]
+
+    def _step_astro(self, dt, g_syn_molar):
+        y = self.Y[S["astro"]]
+        dy = self._astro_model.derivatives(y, g_syn_molar, out=self._astro_buf)
+        if self.gates == "exponential":
+            p = self.params["astrocyte"]
+            alpha_h = p['a2'] * p['d2'] * (y[1] + p['d1']) / (y[1] + p['d3'])
+            h_a = exp_gate(y[2], alpha_h, p['a2'] * y[0], dt)
+            y += dt * dy
+            y[2] = h_a
+        else:
+            y += dt * dy
+            np.clip(y[2], 0.0, 1.0, out=y[2])
+        np.maximum(y[0], 1e-12, out=y[0])
+        np.maximum(y[1], 0.0, out=y[1])
+        return y[0]
+
+    def _step_glia(self, dt, c_a):
+        p = self.params["gliatransmitter"]
+        y = self.Y[S["glia"]]
+        O1, O2, O3, R_a, E_a, G_a = y[0], y[1], y[2], y[3], y[4], y[5]
+
+        if self.gates == "exponential":
+            O1[:] = exp_gate(O1, p['k1_plus'] * c_a, p['k1_minus'], dt)
+            O2[:] = exp_gate(O2, p['k2_plus'] * c_a, p['k2_minus'], dt)
+            O3[:] = exp_gate(O3, p['k3_plus'] * c_a, p['k3_minus'], dt)
+        else:
+            dO1 = p['k1_plus'] * c_a - (p['k1_plus'] * c_a + p['k1_minus']) * O1
+            dO2 = p['k2_plus'] * c_a - (p['k2_plus'] * c_a + p['k2_minus']) * O2
+            dO3 = p['k3_plus'] * c_a - (p['k3_plus'] * c_a + p['k3_minus']) * O3
+            np.clip(O1 + dt * dO1, 0, 1, out=O1)
+            np.clip(O2 + dt * dO2, 0, 1, out=O2)
+            np.clip(O3 + dt * dO3, 0, 1, out=O3)
+
+        f_r_a = O1 * O2 * O3
+        I_a = 1.0 - R_a - E_a
+        Theta = np.where(c_a > p['C_a_thresh'], p['k_rel_a'], 0.0)
+        dRa = (I_a / p['tau_rec_a']) - Theta * f_r_a * R_a
+        dEa = -(E_a / p['tau_inac_a']) + Theta * f_r_a * R_a
+        np.clip(R_a + dt * dRa, 0, 1, out=R_a)
+        np.clip(E_a + dt * dEa, 0, 1, out=E_a)
+
+        dGa = (p['n_a_v'] * p['g_a_v'] * E_a) - (p['g_a_c'] * G_a)
+        np.maximum(G_a + dt * dGa, 0.0, out=G_a)
+        return G_a
+
+    def _step_post(self, dt, g_syn):
+        p = self.params["post_synaptic"]
+        y = self.Y[S["post"]]
+        V, m = y[0], y[1]
+
+        if self.gates == "exponential":
+            m[:] = exp_gate(m, p['alpha_AMPA'] * g_syn, p['beta_AMPA'], dt)
+        else:
+            dm_dt = p['alpha_AMPA'] * g_syn * (1.0 - m) - p['beta_AMPA'] * m
+            np.clip(m + dt * dm_dt, 0.0, 1.0, out=m)
+        self.I_AMPA = p['g_AMPA'] * m * (V - p['V_AMPA'])
+        term_leak = -(V - p['V_rest'])
+        term_current = -p['R_m'] * (0.0 + self.I_AMPA)
+        V += dt * ((term_leak + term_current) / p['tau_post'])
+        return V
+
+    def _step_post_ca(self, dt, V_post, I_AMPA):
+        p = self.params["post_synaptic_ca"]
+        c_post = self.Y[S["post_ca"]][0]
+
+        active = V_post > -0.030
+        N_open = np.zeros(self.n)
+        if np.any(active):
+            N_R = np.broadcast_to(p['N_R'], (self.n,))[active]
+            P_open = np.broadcast_to(p['P_open'], (self.n,))[active]
+            N_open[active] = np.random.binomial(N_R.astype(np.int64), P_open)
+
+        self.i_R = p['g_R'] * N_open * (V_post - p['V_R'])
+        S_pump = p['k_s'] * (c_post - p['c_post_rest'])
+        f_c = -(p['eta'] * I_AMPA + self.i_R) * self.alpha_conv - S_pump
+        theta = (p['b_t'] * p['K_endo']) / (p['K_endo'] + c_post)**2
+        c_post += dt * (f_c / (1.0 + theta))
+        np.maximum(c_post, 1e-9, out=c_post)
+        return c_post
+
+    def _step_camkii(self, dt, c_post):
+        p = self.params["camkii"]
+        y = self.Y[S["camkii"]]
+        model = self._camkii_model
+        if self.camkii_update == "euler":
+            dy = model.derivatives(y, c_post, out=self._camkii_buf)
+            y += dt * dy
+        else:
+            # Chain propagated for the frozen Ca level, ep / I by Euler
+            k0, v_a, v_d = model.chain_rates(c_post, y[:11], y[11])
+            P_new = model.chain_propagate(y[:11], k0, v_a, v_d, dt, self.camkii_update)
+            dy = model.derivatives(y, c_post, out=self._camkii_buf)
+            y[11:] += dt * dy[11:]
+            y[:11] = P_new
+        np.maximum(y[:11], 0, out=y[:11])
+        np.clip(y[11], 0, p["ep_0"], out=y[11])
+        np.maximum(y[12], 0, out=y[12])
+        return y[:11]
+
+    # ==========================================================================
+    # Time loop
+    # ==========================================================================
+    def run(self, verbose=False):
+        """Advance all members; traces have shape (N, n_records)."""
+        dt = self.dt
+        dt_sec = dt * 1e-3
+        steps = self.steps
+        rec_step = self.rec_step
+        rec_size = (steps + rec_step - 1) // rec_step
+        zero_current = np.zeros(self.n)
+
+        # Applied HH current of every member: cursor over the merged segments
+        drive = Schedule.merge([Schedule.compile(stim, dt, steps) for stim in self.stimuli])
+        seg = 0
+
+        # Array-capable rate/derivative functions of the scalar models
+        p = self.params
+        self._hh_model = PresynapticHH(p["pre_synaptic"])
+        self._ca_model = PresynapticCalciumDynamics(p["ca"])
+        self._glu_model = GlutamateDynamics(p["glutamate"])
+        self._astro_model = AstrocyteDynamics(p["astrocyte"])
+        self._camkii_model = CaMKIIDynamics(p["camkii"])
+        models = {"hh": self._hh_model, "ca_pre": self._ca_model,
+                  "glu": self._glu_model, "astro": self._astro_model}
+        for key, table in self.rate_tables.items():
+            name, table_name = key.split(".")
+            setattr(models[name], f"{table_name}_table", table)
+        self._glu_buf = np.empty((10, self.n))
+        self._astro_buf = np.empty((3, self.n))
+        self._camkii_buf = np.empty((13, self.n))
+
+        probes = [(name, ENSEMBLE_PROBES[name]) for name in self.record]
+        traces = {name: np.zeros((self.n, rec_size), dtype=np.float32) for name in self.record}
+        time_ms = np.arange(rec_size) * (rec_step * dt)
+        Y = self.Y
+        i_c_fast = _i("ca_pre.c_fast")
+        i_G_a = _i("glia.G_a")
+        progress = max(steps // 10, 1)
+
+        start_time = time.time()
+        for i in range(steps):
+            t_ms = i * dt
+            while i >= drive.starts[seg + 1]:
+                seg += 1
+
+            V_pre = self._step_hh(dt, drive.values[seg])
+            self._step_ca_pre(dt_sec, V_pre * 1e-3, Y[i_G_a])
+            glu_syn = self._step_glu(dt_sec, Y[i_c_fast], self.alpha)
+            if t_ms < self.glu_mute_ms:
+                glu_syn = zero_current
+            self.glu_syn = glu_syn
+
+            c_a = self._step_astro(dt_sec, glu_syn)
+            self._step_glia(dt_sec, c_a)
+
+            V_post = self._step_post(dt_sec, glu_syn)
+            c_post = self._step_post_ca(dt_sec, V_post, self.I_AMPA)
+
+            P = self._step_camkii(dt_sec, c_post)
+            if self.alpha_feedback:
+                self.alpha = self.base_alpha * (1.0 + self._camkii_model.get_alpha_modulation(P))
+
+            if i % rec_step == 0:
+                idx = i // rec_step
+                for name, probe in probes:
+                    traces[name][:, idx] = probe(self)
+
+            if verbose and i % progress == 0:
+                print(f"%{(i / steps) * 100:.0f} tamamlandı. (Simülasyon Zamanı: {t_ms/1000:.1f} s)")
+
+        return EnsembleResult(time_ms, traces, self.labels, wall_time=time.time() - start_time)
+
+
+class EnsembleResult(SimulationResult):
+    """SimulationResult whose traces have shape (N, n_records)."""
+
+    def __init__(self, time_ms, traces, labels, wall_time=0.0):
+        super().__init__(time_ms, traces, wall_time=wall_time)
+        self.labels = labels
+
+    def member(self, key):
+        """Single-member SimulationResult by index or label."""
+        k = self.labels.index(key) if isinstance(key, str) else key
+        return SimulationResult(self.time, {name: tr[k] for name, tr in self.traces.items()},
+                                wall_time=self.wall_time)
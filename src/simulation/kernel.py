@@ -0,0 +1,592 @@
+import math
+
+import numpy as np
+
+from simulation import state as state_layout
+from simulation.recorder import AUX_CHANNELS, Recorder
+from simulation.synapse import SLOW_SUBSYSTEMS
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba opsiyonel: yalnızca backend="numba" için gerekli
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+
+# ==============================================================================
+# Compiled backend for TripartiteSynapse.run(backend="numba").
+#
+# The whole coupled loop runs in nopython mode on the packed state vector
+# (simulation.state). Each _step_* function below mirrors the scalar step()
+# of its model line by line (same operation order, same clipping), so the
+# arithmetic is the reference arithmetic. Parameters are passed as one
+# float64 array per model, in the key order of PARAM_KEYS.
+# ==============================================================================
+
+PARAM_KEYS = {
+    "pre_synaptic": ("g_Na", "V_Na", "g_K", "V_K", "g_L", "V_L", "C_m"),
+    "ca": ("V_mCa", "k_mCa", "tau_mCa", "rho_Ca", "g_Ca", "A_btn", "v_PMCA_max",
+           "K_PMCA", "v_leak", "c_ext", "d1", "d5", "a2", "d2", "d3", "c1", "v1",
+           "v3", "k3", "v2", "v_g", "k_g", "tau_p", "p0"),
+    "glutamate": ("beta", "gamma", "delta", "a1", "a2", "a3", "tau_rec", "tau_inac",
+                  "n_v", "g_v", "g_c"),
+    "astrocyte": ("d1", "d5", "c_0", "r_c", "v_ER", "K_ER", "r_L", "v_beta", "K_R",
+                  "K_p", "K_pi", "v_delta", "k_delta", "K_PLC_delta", "v_3k", "K_D",
+                  "K_3", "r_5p", "a2", "d2", "d3"),
+    "gliatransmitter": ("k1_plus", "k1_minus", "k2_plus", "k2_minus", "k3_plus",
+                        "k3_minus", "C_a_thresh", "tau_rec_a", "tau_inac_a",
+                        "n_a_v", "g_a_v", "g_a_c", "k_rel_a"),
+    "post_synaptic": ("alpha_AMPA", "beta_AMPA", "g_AMPA", "V_AMPA", "V_rest",
+                      "R_m", "tau_post"),
+    "post_synaptic_ca": ("N_R", "P_open", "g_R", "V_R", "k_s", "c_post_rest",
+                         "eta", "b_t", "K_endo"),
+    "camkii": ("n_h", "k_h", "K1", "K2", "K_M", "k_F", "k_B", "ep_0", "k_I", "I_0",
+               "k_h2", "v_PKA", "K_PKA", "v_CaN", "e_k", "P_half", "k_half", "k_syt"),
+}
+
+_HH = state_layout.SLICES["hh"].start
+_CA = state_layout.SLICES["ca_pre"].start
+_GLU = state_layout.SLICES["glu"].start
+_AST = state_layout.SLICES["astro"].start
+_GLIA = state_layout.SLICES["glia"].start
+_POST = state_layout.SLICES["post"].start
+_PCA = state_layout.SLICES["post_ca"].start
+_CAMK = state_layout.SLICES["camkii"].start
+
+# Auxiliary (non-state) quantities recorded next to the state vector
+AUX_NAMES = AUX_CHANNELS
+N_AUX = len(AUX_NAMES)
+
+
+def pack_params(synapse):
+    """Model parameters (+ derived constants) as float64 arrays for the kernel."""
+    packed = []
+    for group, keys in PARAM_KEYS.items():
+        p = synapse.params[group]
+        derived = []
+        if group == "ca":
+            derived = [synapse.ca_pre.V_Ca, synapse.ca_pre.inv_zFV]
+        elif group == "astrocyte":
+            derived = [p.get('c1_a', p.get('c1', 0.185))]
+        elif group == "post_synaptic_ca":
+            derived = [synapse.post_ca.alpha_conv]
+        # The parameter set's own float64 form, with the derived constants appended
+        packed.append(np.concatenate([p.compiled(keys), derived]))
+    return tuple(packed)
+
+
+# ------------------------------------------------------------------------------
+# Scalar helpers
+# ------------------------------------------------------------------------------
+@njit(cache=True)
+def _clip(x, lo, hi):
+    if x < lo:
+        return lo
+    if x > hi:
+        return hi
+    return x
+
+
+@njit(cache=True)
+def _hill(x, K, n):
+    # AstrocyteDynamics.hill
+    x = max(x, 0.0)
+    xn = x ** n
+    Kn = K ** n
+    if xn + Kn == 0:
+        return 0.0
+    return xn / (xn + Kn)
+
+
+@njit(cache=True)
+def _exp_relax(x, x_inf, rate, dt):
+    # models.gating.exp_relax
+    return x_inf + (x - x_inf) * math.exp(-rate * dt)
+
+
+@njit(cache=True)
+def _exp_gate(x, alpha, beta, dt):
+    # models.gating.exp_gate
+    rate = alpha + beta
+    return _exp_relax(x, alpha / rate, rate, dt)
+
+
+@njit(cache=True)
+def _sum10(a0, a1, a2, a3, a4, a5, a6, a7, a8, a9):
+    # np.sum over 10 elements (pairwise: 8 partial sums, then the remainder)
+    return (((a0 + a1) + (a2 + a3)) + ((a4 + a5) + (a6 + a7))) + a8 + a9
+
+
+# ------------------------------------------------------------------------------
+# Model steps (mirror models/*.py step())
+# ------------------------------------------------------------------------------
+@njit(cache=True)
+def _step_hh(y, p, dt, I_app, exp_gates):
+    V = y[_HH]
+    m = y[_HH + 1]
+    h = y[_HH + 2]
+    n = y[_HH + 3]
+    u = V + 70.0
+
+    denom = math.exp((25 - u) / 10) - 1
+    a_m = 1.0 if abs(denom) < 1e-9 else 0.1 * (25 - u) / denom
+    b_m = 4.0 * math.exp(-u / 18)
+    a_h = 0.07 * math.exp(-u / 20)
+    b_h = 1.0 / (math.exp((30 - u) / 10) + 1)
+    denom = math.exp((10 - u) / 10) - 1
+    a_n = 0.1 if abs(denom) < 1e-9 else 0.01 * (10 - u) / denom
+    b_n = 0.125 * math.exp(-u / 80)
+
+    if exp_gates:
+        m = _exp_gate(m, a_m, b_m, dt)
+        h = _exp_gate(h, a_h, b_h, dt)
+        n = _exp_gate(n, a_n, b_n, dt)
+    else:
+        m += dt * ((a_m * (1 - m)) - (b_m * m))
+        h += dt * ((a_h * (1 - h)) - (b_h * h))
+        n += dt * ((a_n * (1 - n)) - (b_n * n))
+
+    I_Na = p[0] * (m ** 3.0) * h * (V - p[1])
+    I_K = p[2] * (n ** 4.0) * (V - p[3])
+    I_L = p[4] * (V - p[5])
+
+    # I_app: total applied current from the compiled stimulus schedule
+    y[_HH + 1] = m
+    y[_HH + 2] = h
+    y[_HH + 3] = n
+    if exp_gates:
+        g_Na = p[0] * (m ** 3.0) * h
+        g_K = p[2] * (n ** 4.0)
+        g_total = g_Na + g_K + p[4]
+        V_inf = (I_app + g_Na * p[1] + g_K * p[3] + p[4] * p[5]) / g_total
+        y[_HH] = _exp_relax(V, V_inf, g_total / p[6], dt)
+    else:
+        y[_HH] = V + dt * ((I_app - I_Na - I_K - I_L) / p[6])
+    return y[_HH]
+
+
+@njit(cache=True)
+def _cytosolic_ca(y):
+    return max(y[_CA] + y[_CA + 1], 1e-9)
+
+
+@njit(cache=True)
+def _step_ca_fast(y, p, dt, V_pre, c_i, exp_gates):
+    c_fast = y[_CA]
+    m_Ca = y[_CA + 4]
+
+    m_inf = 1.0 / (1.0 + math.exp((p[0] - V_pre) / p[1]))
+    if exp_gates:
+        m_Ca = _exp_gate(m_Ca, m_inf / p[2], (1.0 - m_inf) / p[2], dt)
+    else:
+        m_Ca += ((m_inf - m_Ca) / p[2]) * dt
+
+    g_total = p[3] * (m_Ca ** 2.0) * p[4]
+    I_Ca_amp = g_total * (V_pre - p[24]) * p[5]
+    I_PMCA_amp = p[6] * (c_i ** 2.0) / (c_i ** 2.0 + p[7] ** 2.0) * p[5]
+    J_leak = p[8] * (p[9] - c_i)
+    dc_fast_dt = -(I_Ca_amp + I_PMCA_amp) * p[25] + J_leak
+
+    y[_CA] = max(c_fast + dc_fast_dt * dt, 0.0)
+    y[_CA + 4] = m_Ca
+
+
+@njit(cache=True)
+def _step_ca_slow(y, p, dt, glu, c_i, exp_gates):
+    c_slow = y[_CA + 1]
+    c_ER = y[_CA + 2]
+    p_ip3 = y[_CA + 3]
+    q = y[_CA + 5]
+
+    m_inf_ip3 = p_ip3 / (p_ip3 + p[10])
+    n_inf_ip3 = c_i / (c_i + p[11])
+    alpha_q = p[12] * p[13] * (p_ip3 + p[10]) / (p_ip3 + p[14])
+    beta_q = p[12] * c_i
+    if exp_gates:
+        q = _exp_gate(q, alpha_q, beta_q, dt)
+    else:
+        q += (alpha_q * (1.0 - q) - beta_q * q) * dt
+
+    prob = (m_inf_ip3 ** 3.0) * (n_inf_ip3 ** 3.0) * (q ** 3.0)
+    J_IP3R = p[15] * p[16] * prob * (c_ER - c_i)
+    J_SERCA = p[17] * (c_i ** 2.0) / (c_i ** 2.0 + p[18] ** 2.0)
+    J_ER_Leak = p[15] * p[19] * (c_ER - c_i)
+    dc_slow_dt = J_IP3R + J_ER_Leak - J_SERCA
+    dc_ER_dt = -(1.0 / p[15]) * dc_slow_dt
+
+    term_prod = p[20] * (glu ** 0.7) / (p[21] ** 0.7 + glu ** 0.7)
+    dp_dt = term_prod - p[22] * (p_ip3 - p[23])
+
+    y[_CA + 1] = max(c_slow + dc_slow_dt * dt, 1e-10)
+    y[_CA + 2] = max(c_ER + dc_ER_dt * dt, 1e-10)
+    y[_CA + 3] = p_ip3 + dp_dt * dt
+    y[_CA + 5] = q
+
+
+@njit(cache=True)
+def _step_glu(y, p, dt, c_i, alpha):
+    s0 = y[_GLU]
+    s1 = y[_GLU + 1]
+    s2 = y[_GLU + 2]
+    s3 = y[_GLU + 3]
+    s4 = y[_GLU + 4]
+    s5 = y[_GLU + 5]
+    s_star = y[_GLU + 6]
+    R = y[_GLU + 7]
+    E = y[_GLU + 8]
+    g = y[_GLU + 9]
+    beta, gamma, delta = p[0], p[1], p[2]
+
+    c = max(c_i, 0.0)
+    j01 = 5 * alpha * c * s0
+    j10 = 1 * beta * s1
+    j12 = 4 * alpha * c * s1
+    j21 = 2 * beta * s2
+    j23 = 3 * alpha * c * s2
+    j32 = 3 * beta * s3
+    j34 = 2 * alpha * c * s3
+    j43 = 4 * beta * s4
+    j45 = 1 * alpha * c * s4
+    j54 = 5 * beta * s5
+    j_f_star = gamma * s5
+    j_b_star = delta * s_star
+
+    ds0 = j10 - j01
+    ds1 = j01 + j21 - j10 - j12
+    ds2 = j12 + j32 - j21 - j23
+    ds3 = j23 + j43 - j32 - j34
+    ds4 = j34 + j54 - j43 - j45
+    ds5 = j45 + j_b_star - j54 - j_f_star
+    ds_star = j_f_star - j_b_star
+
+    lambda_spont = p[5] / (1.0 + math.exp((p[3] - c) / p[4]))
+    f_r = lambda_spont + gamma * s_star
+
+    I = 1.0 - R - E
+    dR = (I / p[6]) - (f_r * R)
+    dE = -(E / p[7]) + (f_r * R)
+    dg = (p[8] * p[9] * E) - (p[10] * g)
+
+    y[_GLU] = _clip(s0 + dt * ds0, 0.0, 1.0)
+    y[_GLU + 1] = _clip(s1 + dt * ds1, 0.0, 1.0)
+    y[_GLU + 2] = _clip(s2 + dt * ds2, 0.0, 1.0)
+    y[_GLU + 3] = _clip(s3 + dt * ds3, 0.0, 1.0)
+    y[_GLU + 4] = _clip(s4 + dt * ds4, 0.0, 1.0)
+    y[_GLU + 5] = _clip(s5 + dt * ds5, 0.0, 1.0)
+    y[_GLU + 6] = _clip(s_star + dt * ds_star, 0.0, 1.0)
+    y[_GLU + 7] = _clip(R + dt * dR, 0.0, 1.0)
+    y[_GLU + 8] = _clip(E + dt * dE, 0.0, 1.0)
+    y[_GLU + 9] = max(0.0, g + dt * dg)
+    return y[_GLU + 9]
+
+
+@njit(cache=True)
+def _step_astro(y, p, dt, g_syn_molar, exp_gates):
+    c_a = y[_AST]
+    p_a = y[_AST + 1]
+    h_a = y[_AST + 2]
+    c1_val = p[21]
+
+    m_inf = _hill(p_a, p[0], 1.0)
+    n_inf = _hill(c_a, p[1], 1.0)
+    driving = p[2] - (1.0 + c1_val) * c_a
+    J_IP3R = p[3] * (m_inf ** 3.0) * (n_inf ** 3.0) * (h_a ** 3.0) * driving
+    J_SERCA = p[4] * (c_a ** 2.0) / (c_a ** 2.0 + p[5] ** 2.0)
+    J_Leak = p[6] * driving
+    dc_a_dt = J_IP3R - J_SERCA + J_Leak
+
+    prod_beta = p[7] * _hill(g_syn_molar, p[8], 0.7)
+    inhib = 1.0 + (p[9] / p[8]) * _hill(c_a, p[10], 1.0)
+    term_PLC_beta = prod_beta / inhib
+    term_PLC_delta = (p[11] / (1.0 + p_a / p[12])) * _hill(c_a, p[13], 2.0)
+    deg_3K = p[14] * _hill(c_a, p[15], 4.0) * _hill(p_a, p[16], 1.0)
+    deg_5P = p[17] * p_a
+    dp_a_dt = term_PLC_beta + term_PLC_delta - deg_3K - deg_5P
+
+    alpha_h = p[18] * p[19] * (p_a + p[0]) / (p_a + p[20])
+    beta_h = p[18] * c_a
+    dh_a_dt = alpha_h * (1.0 - h_a) - beta_h * h_a
+
+    y[_AST] = max(c_a + dt * dc_a_dt, 1e-12)
+    y[_AST + 1] = max(p_a + dt * dp_a_dt, 0.0)
+    if exp_gates:
+        y[_AST + 2] = _exp_gate(h_a, alpha_h, beta_h, dt)
+    else:
+        y[_AST + 2] = _clip(h_a + dt * dh_a_dt, 0.0, 1.0)
+    return y[_AST]
+
+
+@njit(cache=True)
+def _step_glia(y, p, dt, c_a, exp_gates):
+    O1 = y[_GLIA]
+    O2 = y[_GLIA + 1]
+    O3 = y[_GLIA + 2]
+    R_a = y[_GLIA + 3]
+    E_a = y[_GLIA + 4]
+    G_a = y[_GLIA + 5]
+
+    if exp_gates:
+        O1 = _exp_gate(O1, p[0] * c_a, p[1], dt)
+        O2 = _exp_gate(O2, p[2] * c_a, p[3], dt)
+        O3 = _exp_gate(O3, p[4] * c_a, p[5], dt)
+    else:
+        dO1 = p[0] * c_a - (p[0] * c_a + p[1]) * O1
+        dO2 = p[2] * c_a - (p[2] * c_a + p[3]) * O2
+        dO3 = p[4] * c_a - (p[4] * c_a + p[5]) * O3
+        O1 = _clip(O1 + dt * dO1, 0.0, 1.0)
+        O2 = _clip(O2 + dt * dO2, 0.0, 1.0)
+        O3 = _clip(O3 + dt * dO3, 0.0, 1.0)
+
+    f_r_a = O1 * O2 * O3
+    I_a = 1.0 - R_a - E_a
+    Theta = p[12] if c_a > p[6] else 0.0
+    dRa = (I_a / p[7]) - Theta * f_r_a * R_a
+    dEa = -(E_a / p[8]) + Theta * f_r_a * R_a
+    R_a = _clip(R_a + dt * dRa, 0.0, 1.0)
+    E_a = _clip(E_a + dt * dEa, 0.0, 1.0)
+    dGa = (p[9] * p[10] * E_a) - (p[11] * G_a)
+
+    y[_GLIA] = O1
+    y[_GLIA + 1] = O2
+    y[_GLIA + 2] = O3
+    y[_GLIA + 3] = R_a
+    y[_GLIA + 4] = E_a
+    y[_GLIA + 5] = max(G_a + dt * dGa, 0.0)
+    return y[_GLIA + 5]
+
+
+@njit(cache=True)
+def _step_post(y, p, dt, g_syn, exp_gates):
+    V = y[_POST]
+    m = y[_POST + 1]
+
+    if exp_gates:
+        m = _exp_gate(m, p[0] * g_syn, p[1], dt)
+    else:
+        dm_dt = p[0] * g_syn * (1.0 - m) - p[1] * m
+        m = _clip(m + dt * dm_dt, 0.0, 1.0)
+    I_AMPA = p[2] * m * (V - p[3])
+    term_leak = -(V - p[4])
+    term_current = -p[5] * (0.0 + I_AMPA)
+
+    y[_POST + 1] = m
+    y[_POST] = V + dt * ((term_leak + term_current) / p[6])
+    return I_AMPA
+
+
+@njit(cache=True)
+def _step_post_ca(y, p, dt, V_post, I_AMPA):
+    c_post = y[_PCA]
+    N_open = 0
+    if V_post > -0.030:
+        N_open = np.random.binomial(int(p[0]), p[1])
+
+    i_R = p[2] * N_open * (V_post - p[3])
+    S_pump = p[4] * (c_post - p[5])
+    f_c = -(p[6] * I_AMPA + i_R) * p[9] - S_pump
+    theta = (p[7] * p[8]) / (p[8] + c_post) ** 2.0
+    y[_PCA] = max(c_post + dt * (f_c / (1.0 + theta)), 1e-9)
+    return i_R
+
+
+@njit(cache=True)
+def _step_camkii(y, p, w, dP, dt, c_post):
+    P = y[_CAMK:_CAMK + 11]
+    ep = y[_CAMK + 11]
+    I = y[_CAMK + 12]
+    n_h = p[0]
+
+    cn = c_post ** n_h
+    kn = p[1] ** n_h
+    hill = cn / (kn + cn)
+    v_phos = 10.0 * p[2] * (hill ** 2.0) * P[0]
+    v_a = p[2] * hill
+    total_phos = _sum10(1 * P[1], 2 * P[2], 3 * P[3], 4 * P[4], 5 * P[5],
+                        6 * P[6], 7 * P[7], 8 * P[8], 9 * P[9], 10 * P[10])
+    v_d = (p[3] * ep) / (p[4] + total_phos)
+
+    dP[0] = -v_phos + v_d * P[1]
+    dP[1] = v_phos - v_d * P[1] - v_a * w[1] * P[1] + 2.0 * v_d * P[2]
+    for i in range(2, 10):
+        dP[i] = (v_a * w[i - 1] * P[i - 1] - v_a * w[i] * P[i]
+                 - v_d * i * P[i] + v_d * (i + 1) * P[i + 1])
+    dP[10] = v_a * w[9] * P[9] - v_d * 10.0 * P[10]
+
+    assoc = p[5] * I * ep
+    dissoc = p[6] * (p[7] - ep)
+    dep_dt = -assoc + dissoc + p[8] * p[9]
+    hill_can = (c_post ** 3.0) / (p[10] ** 3.0 + c_post ** 3.0)
+    term_PKA = p[11] * (p[9] / (p[9] + p[12]))
+    dI_dt = -assoc + dissoc + term_PKA - p[13] * I * hill_can
+
+    for i in range(11):
+        P[i] = max(P[i] + dt * dP[i], 0.0)
+    y[_CAMK + 11] = _clip(ep + dt * dep_dt, 0.0, p[7])
+    y[_CAMK + 12] = max(I + dt * dI_dt, 0.0)
+
+
+@njit(cache=True)
+def _alpha_modulation(y, p):
+    # CaMKIIDynamics.get_alpha_modulation
+    P = y[_CAMK:_CAMK + 11]
+    fraction_P = _sum10(P[1], P[2], P[3], P[4], P[5], P[6], P[7], P[8], P[9], P[10])
+    exponent = -((fraction_P * p[14] - p[15]) / p[16])
+    exponent = _clip(exponent, -50.0, 50.0)
+    return p[17] / (1.0 + math.exp(exponent))
+
+
+# ------------------------------------------------------------------------------
+# Coupled loop
+# ------------------------------------------------------------------------------
+@njit(cache=True)
+def _run_loop(y, aux, sums, hh_p, ca_p, glu_p, astro_p, glia_p, post_p, post_ca_p, camkii_p,
+              w, dt, i0, i1, seg, drive_starts, drive_values, mute, base_alpha, alpha_feedback,
+              exp_gates, k_er, k_astro, k_camkii, seed, rec_step, out, row0):
+    # Steps i0 <= i < i1; out[0] holds recording step row0. seed < 0
+    # continues the random stream, sums carries the multi-rate means
+    if seed >= 0:
+        np.random.seed(seed)
+    dt_sec = dt * 1e-3
+    dt_er, dt_astro, dt_camkii = k_er * dt_sec, k_astro * dt_sec, k_camkii * dt_sec
+    sum_ci, sum_glu_extra, sum_glu_syn, sum_ca_post = sums[0], sums[1], sums[2], sums[3]
+    dP = np.empty(11)
+    n_state = y.shape[0]
+    alpha, glu_syn, I_AMPA, i_R = aux[0], aux[1], aux[2], aux[3]
+
+    for i in range(i0, i1):
+        t_ms = i * dt
+        while i >= drive_starts[seg + 1]:
+            seg += 1
+
+        V_pre_mV = _step_hh(y, hh_p, dt, drive_values[seg], exp_gates)
+        c_i = _cytosolic_ca(y)
+        _step_ca_fast(y, ca_p, dt_sec, V_pre_mV * 1e-3, c_i, exp_gates)
+        sum_ci += c_i
+        sum_glu_extra += y[_GLIA + 5]
+        if (i + 1) % k_er == 0:
+            _step_ca_slow(y, ca_p, dt_er, sum_glu_extra / k_er, sum_ci / k_er, exp_gates)
+            sum_ci = sum_glu_extra = 0.0
+        glu_syn = _step_glu(y, glu_p, dt_sec, y[_CA], alpha)
+        if t_ms < mute:
+            glu_syn = 0.0
+
+        sum_glu_syn += glu_syn
+        if (i + 1) % k_astro == 0:
+            _step_astro(y, astro_p, dt_astro, sum_glu_syn / k_astro, exp_gates)
+            sum_glu_syn = 0.0
+        _step_glia(y, glia_p, dt_sec, y[_AST], exp_gates)
+
+        I_AMPA = _step_post(y, post_p, dt_sec, glu_syn, exp_gates)
+        i_R = _step_post_ca(y, post_ca_p, dt_sec, y[_POST], I_AMPA)
+
+        sum_ca_post += y[_PCA]
+        if (i + 1) % k_camkii == 0:
+            _step_camkii(y, camkii_p, w, dP, dt_camkii, sum_ca_post / k_camkii)
+            sum_ca_post = 0.0
+            if alpha_feedback:
+                alpha = base_alpha * (1.0 + _alpha_modulation(y, camkii_p))
+
+        if i % rec_step == 0:
+            row = out[i // rec_step - row0]
+            row[:n_state] = y
+            row[n_state] = alpha
+            row[n_state + 1] = glu_syn
+            row[n_state + 2] = I_AMPA
+            row[n_state + 3] = i_R
+
+    aux[0], aux[1], aux[2], aux[3] = alpha, glu_syn, I_AMPA, i_R
+    sums[0], sums[1], sums[2], sums[3] = sum_ci, sum_glu_extra, sum_glu_syn, sum_ca_post
+
+
+def run_numba(synapse, seed=None, stream=None, chunk_rows=None, checkpoint=None,
+              checkpoint_every=None, resume=None):
+    """
+    Run synapse (TripartiteSynapse) with the compiled loop.
+    Returns (time_ms, traces) (lazy simulation.recorder.Traces) and leaves
+    the models in the final state.
+
+    seed: seed of the kernel's own random stream (numba keeps a generator
+    separate from NumPy's). None draws one from NumPy's global generator,
+    so np.random.seed() still makes runs reproducible.
+    stream, chunk_rows, checkpoint, checkpoint_every, resume: as
+    TripartiteSynapse.run. The loop is called once per stream chunk and
+    checkpoint interval; stream rows and checkpoints are written between
+    calls.
+    """
+    if not NUMBA_AVAILABLE:
+        raise RuntimeError("backend='numba' için numba kurulu olmalı (pip install numba).")
+
+    dt = synapse.dt
+    steps = synapse.steps
+    rec_step = synapse.rec_step
+    rec_size = (steps + rec_step - 1) // rec_step
+    drive = synapse.stimulus_schedule()
+    i = 0
+    sums = np.zeros(4)
+    if resume is not None:
+        from simulation.checkpoint import restore_checkpoint
+        i, restored = restore_checkpoint(synapse, resume, drive)
+        sums[:] = restored
+        seed = -1
+    elif seed is None:
+        seed = int(np.random.randint(2**31 - 1))
+    first_row = (i + rec_step - 1) // rec_step
+
+    y = synapse.get_state()
+    aux = np.array([synapse.alpha, synapse.glu_syn,
+                    synapse.post.I_AMPA, synapse.post_ca.i_R], dtype=np.float64)
+    if stream is None:
+        recorder = Recorder(synapse.probes, rec_step, rec_size - first_row, all_channels=True)
+        recorder.offset = first_row
+        time_ms = np.arange(first_row, rec_size) * (rec_step * dt)
+    else:
+        recorder = Recorder.streaming(synapse.probes, rec_step, stream, synapse.params,
+                                      rec_step * dt, chunk_rows, all_channels=True,
+                                      first_row=first_row)
+        time_ms = None
+
+    def sync():
+        synapse.set_state(y)
+        synapse.alpha, synapse.glu_syn = float(aux[0]), float(aux[1])
+        synapse.post.I_AMPA, synapse.post_ca.i_R = float(aux[2]), float(aux[3])
+        synapse.glu_extra = synapse.glia.G_a
+
+    if checkpoint is not None:
+        from simulation.checkpoint import save_checkpoint
+        every_steps = steps if checkpoint_every is None else max(int(round(checkpoint_every / dt)), 1)
+        next_checkpoint = i + every_steps
+    params = pack_params(synapse)
+    while i < steps:
+        # Call ends: a full stream chunk, the next checkpoint or the run's end
+        i1 = steps
+        if stream is not None:
+            i1 = min(i1, (recorder.offset + len(recorder.buffer)) * rec_step)
+        if checkpoint is not None:
+            i1 = min(i1, next_checkpoint)
+        seg = int(np.searchsorted(drive.starts, i, side="right")) - 1
+        _run_loop(y, aux, sums, *params, synapse.camkii.w,
+                  float(dt), i, i1, seg, drive.starts, drive.values,
+                  float(synapse.glu_mute_ms), float(synapse.base_alpha),
+                  bool(synapse.alpha_feedback), synapse.gates == "exponential",
+                  *(synapse.slow_every[name] for name in SLOW_SUBSYSTEMS),
+                  seed, rec_step, recorder.buffer, recorder.offset)
+        seed = -1
+        if stream is not None:
+            recorder.flush((i1 + rec_step - 1) // rec_step - recorder.offset)
+        if checkpoint is not None and i1 < steps and (i1 >= next_checkpoint or synapse.checkpoint_requested):
+            sync()
+            save_checkpoint(checkpoint, synapse, i1, sums.tolist(), drive)
+            synapse.checkpoint_requested = False
+            next_checkpoint = i1 + every_steps
+        i = i1
+
+    sync()
+    if checkpoint is not None:
+        save_checkpoint(checkpoint, synapse, steps, sums.tolist(), drive)
+    recorder.finish(rec_size)
+    return time_ms, recorder.traces(synapse.params)
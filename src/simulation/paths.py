@@ -0,0 +1,21 @@
+import os
+
+
+# ==============================================================================
+# On-disk cache locations
+#
+# Everything cached on disk lives under one root, CACHE_ROOT (the
+# GLIA_EFFECT_CACHE environment variable, default ~/.cache/glia_effect),
+# one subdirectory per kind:
+#   runs/        results of cached_run (simulation.cache)
+#   rest_state/  rest points per parameter set (simulation.steady_state)
+# so redirecting or clearing the root covers all of them.
+# ==============================================================================
+
+CACHE_ROOT = os.environ.get("GLIA_EFFECT_CACHE",
+                            os.path.join(os.path.expanduser("~"), ".cache", "glia_effect"))
+
+
+def cache_subdir(kind):
+    """Directory of one kind of cache under CACHE_ROOT."""
+    return os.path.join(CACHE_ROOT, kind)
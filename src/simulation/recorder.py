@@ -0,0 +1,470 @@
+import json
+import os
+from collections.abc import Mapping
+from operator import attrgetter
+
+import numpy as np
+
+from simulation import state as state_layout
+
+
+# ==============================================================================
+# Declarative recorder of TripartiteSynapse runs
+#
+# A run records raw channels only: packed state entries (simulation.state
+# names such as "ca_pre.c_fast") and the non-state outputs AUX_CHANNELS, in
+# the models' own units. They go into one preallocated float64 buffer
+# (rows: recording steps, columns: the channels the requested quantities
+# need), also exposed as a structured array with one field per channel.
+#
+# QUANTITIES turn channels into traces after the run. Unit conversions,
+# sums such as CaMKII_P and the decimation of each Probe are evaluated
+# lazily, on the first access of the trace (Traces).
+# ==============================================================================
+
+# Non-state outputs recorded next to the state (same order as the numba kernel)
+AUX_CHANNELS = ("alpha", "glu_syn", "I_AMPA", "i_R")
+CHANNELS = state_layout.STATE_NAMES + AUX_CHANNELS
+
+# Readers of the non-state outputs on a TripartiteSynapse
+_AUX_GETTERS = {
+    "alpha":   lambda s: s.alpha,
+    "glu_syn": lambda s: s.glu_syn,                 # M
+    "I_AMPA":  lambda s: s.post.I_AMPA,             # A
+    "i_R":     lambda s: s.post_ca.i_R,             # A
+}
+
+# Unit scales relative to the SI unit of their dimension ("1": dimensionless)
+UNITS = {
+    "M": ("concentration", 1.0), "mM": ("concentration", 1e-3),
+    "uM": ("concentration", 1e-6), "nM": ("concentration", 1e-9),
+    "V": ("voltage", 1.0), "mV": ("voltage", 1e-3),
+    "A": ("current", 1.0), "nA": ("current", 1e-9), "pA": ("current", 1e-12),
+    "1/(M*s)": ("binding rate", 1.0), "1/(uM*ms)": ("binding rate", 1e9),
+    "1": ("dimensionless", 1.0),
+}
+
+
+def _column(X, p):
+    return X[:, 0]
+
+
+def _camkii_p(X, p):
+    return np.sum(X, axis=1) * p["camkii"]["e_k"] * 1e6
+
+
+# ==============================================================================
+# Recordable quantities: name -> (unit, channels, fn(X, params)), X holding
+# the channel columns (n_records, len(channels)); fn returns the trace in
+# unit (the plotting unit).
+# ==============================================================================
+QUANTITIES = {
+    # Pre-synaptic
+    "V_pre":     ("mV", ("hh.V",), _column),
+    "Ca_fast":   ("uM", ("ca_pre.c_fast",), lambda X, p: X[:, 0] * 1e6),
+    "Ca_slow":   ("uM", ("ca_pre.c_slow",), lambda X, p: X[:, 0] * 1e6),
+    "Ca_total":  ("uM", ("ca_pre.c_fast", "ca_pre.c_slow"), lambda X, p: (X[:, 0] + X[:, 1]) * 1e6),
+    "Ca_ER":     ("uM", ("ca_pre.c_ER",), lambda X, p: X[:, 0] * 1e6),
+    "IP3_pre":   ("uM", ("ca_pre.p_ip3",), lambda X, p: X[:, 0] * 1e6),
+    "q_pre":     ("1", ("ca_pre.q",), _column),
+    "Glu_syn":   ("uM", ("glu_syn",), lambda X, p: X[:, 0] * 1e6),
+
+    # Astrocyte
+    "Ca_astro":  ("uM", ("astro.c_a",), lambda X, p: X[:, 0] * 1e6),
+    "IP3_astro": ("uM", ("astro.p_a",), lambda X, p: X[:, 0] * 1e6),
+    "h_gate":    ("1", ("astro.h_a",), _column),
+    "Glu_extra": ("uM", ("glia.G_a",), lambda X, p: X[:, 0] * 1e6),
+    "O1":        ("1", ("glia.O1",), _column),
+    "O2":        ("1", ("glia.O2",), _column),
+    "O3":        ("1", ("glia.O3",), _column),
+    "R_a":       ("1", ("glia.R_a",), _column),
+    "E_a":       ("1", ("glia.E_a",), _column),
+    "I_a":       ("1", ("glia.R_a", "glia.E_a"), lambda X, p: 1.0 - X[:, 0] - X[:, 1]),
+    "G_a":       ("uM", ("glia.G_a",), lambda X, p: X[:, 0] * 1e6),
+
+    # Post-synaptic
+    "V_post":    ("mV", ("post.V_post",), lambda X, p: X[:, 0] * 1e3),
+    "m_AMPA":    ("1", ("post.m_AMPA",), _column),
+    "I_AMPA":    ("nA", ("I_AMPA",), lambda X, p: X[:, 0] * 1e9),
+    "Ca_post":   ("uM", ("post_ca.c_post",), lambda X, p: X[:, 0] * 1e6),
+    "i_R":       ("pA", ("i_R",), lambda X, p: X[:, 0] * 1e12),
+
+    # LTP
+    "CaMKII_P":  ("uM", tuple(f"camkii.P{k}" for k in range(1, 11)), _camkii_p),
+    "alpha":     ("1/(uM*ms)", ("alpha",), lambda X, p: X[:, 0] * 1e-9),
+}
+
+# Reduction of the recording steps inside one output sample of a Probe:
+#   "sample"             : value at the first step (plain decimation)
+#   "mean", "min", "max" : over all recording steps of the sample
+DECIMATION_POLICIES = ("sample", "mean", "min", "max")
+
+
+class Probe:
+    """
+    One recorded trace.
+
+    name:   quantity (QUANTITIES).
+    every:  simulation steps per output sample, a multiple of the run's
+            rec_step (None: rec_step).
+    policy: reduction over the recording steps of a sample (DECIMATION_POLICIES).
+    unit:   output unit of the same dimension (UNITS); None keeps the
+            quantity's unit.
+    label:  key of the trace in the result (default: name).
+    """
+
+    def __init__(self, name, every=None, policy="sample", unit=None, label=None):
+        if name not in QUANTITIES:
+            raise ValueError(f"Bilinmeyen kayıt değişkeni: {name!r}")
+        if policy not in DECIMATION_POLICIES:
+            raise ValueError(f"Bilinmeyen seyreltme politikası: {policy!r} "
+                             f"(seçenekler: {', '.join(DECIMATION_POLICIES)})")
+        base = QUANTITIES[name][0]
+        if unit is not None and (unit not in UNITS or UNITS[unit][0] != UNITS[base][0]):
+            raise ValueError(f"{name} için geçersiz birim: {unit!r} (temel birim: {base})")
+        self.name = name
+        self.every = every
+        self.policy = policy
+        self.unit = base if unit is None else unit
+        self.label = name if label is None else label
+
+    @property
+    def scale(self):
+        """Factor from the quantity's unit to the probe's unit."""
+        base = QUANTITIES[self.name][0]
+        return 1.0 if self.unit == base else UNITS[base][1] / UNITS[self.unit][1]
+
+    def __repr__(self):
+        return (f"Probe({self.name!r}, every={self.every}, policy={self.policy!r}, "
+                f"unit={self.unit!r}, label={self.label!r})")
+
+
+def make_probes(record, rec_step):
+    """
+    Probe tuple of a record declaration: quantity names and/or Probe
+    objects. Checks labels and the sample spacing against rec_step.
+    """
+    probes = []
+    for entry in record:
+        if isinstance(entry, str):
+            if entry not in QUANTITIES:
+                raise ValueError(f"Bilinmeyen kayıt değişkeni: {[entry]}")
+            entry = Probe(entry)
+        every = rec_step if entry.every is None else entry.every
+        if every < rec_step or every % rec_step:
+            raise ValueError(f"{entry.label}: every ({every}) rec_step'in ({rec_step}) tam katı olmalı.")
+        probes.append(Probe(entry.name, every, entry.policy, entry.unit, entry.label))
+    labels = [probe.label for probe in probes]
+    duplicate = sorted({label for label in labels if labels.count(label) > 1})
+    if duplicate:
+        raise ValueError(f"Aynı etiketle birden fazla kayıt: {duplicate}")
+    return tuple(probes)
+
+
+class Recorder:
+    """
+    Preallocated channel buffer of one run: n_rows recording steps (every
+    rec_step simulation steps) of the channels the probes need, or of all
+    CHANNELS (compiled and adaptive backends fill them in one block).
+
+    store: optional ChunkStore; the buffer then holds one chunk, rows are
+    written with their run-wide index and full chunks go to disk (flush).
+    """
+
+    def __init__(self, probes, rec_step, n_rows, all_channels=False, store=None):
+        self.probes = {probe.label: probe for probe in probes}
+        self.rec_step = rec_step
+        needed = {c for probe in probes for c in QUANTITIES[probe.name][1]}
+        self.channels = CHANNELS if all_channels else tuple(c for c in CHANNELS if c in needed)
+        self.column = {c: k for k, c in enumerate(self.channels)}
+        self.buffer = np.zeros((n_rows, len(self.channels)))
+        self.store = store
+        self.offset = 0     # run-wide index of buffer[0]
+
+    @classmethod
+    def streaming(cls, probes, rec_step, path, params, rec_dt, chunk_rows=None,
+                  all_channels=False, first_row=0):
+        """
+        Recorder with a one-chunk buffer that streams into a new ChunkStore
+        at path, or, for first_row > 0 (resumed runs), into the existing one
+        cut back to its first first_row rows.
+        """
+        chunk_rows = STREAM_CHUNK_ROWS if chunk_rows is None else chunk_rows
+        recorder = cls(probes, rec_step, chunk_rows, all_channels)
+        if first_row:
+            recorder.store = ChunkStore.reopen(path, first_row)
+            if recorder.store.channels != recorder.channels:
+                raise ValueError(f"Akış deposu farklı kanallar içeriyor: {path}")
+        else:
+            recorder.store = ChunkStore.create(path, recorder, params, rec_dt, chunk_rows)
+        recorder.offset = first_row
+        return recorder
+
+    @property
+    def data(self):
+        """The buffer as a structured array, one float64 field per channel."""
+        dtype = np.dtype([(c, np.float64) for c in self.channels])
+        if not self.channels:
+            return np.zeros(len(self.buffer), dtype=dtype)
+        return self.buffer.view(dtype)[:, 0]
+
+    def blocks(self, cols):
+        """The recorded columns cols, as a sequence of row blocks."""
+        return [self.buffer[:, cols]]
+
+    def flush(self, rows=None):
+        """Append buffer[:rows] (default: all) to the store and move on by rows."""
+        rows = len(self.buffer) if rows is None else rows
+        if rows:
+            self.store.append(self.buffer[:rows])
+            self.offset += rows
+
+    def finish(self, n_rows):
+        """Flush the rows below the run-wide n_rows still in the buffer and close the store."""
+        if self.store is not None:
+            if n_rows > self.offset:
+                self.flush(n_rows - self.offset)
+            self.store.close()
+
+    def sampler(self, synapse):
+        """write(row): copy the synapse's current channels into row (run-wide index)."""
+        buffer = self.buffer
+        n_rows = len(buffer)
+        # One reader per model, in channel order; plain attributes are read
+        # directly, other variables (properties, array entries) via get_state()
+        reads = []
+        for name, cls in state_layout.MODEL_ORDER:
+            model = getattr(synapse, name)
+            own = [var for var in cls.STATE_VARS if f"{name}.{var}" in self.column]
+            if not own:
+                continue
+            if all(var in vars(model) for var in own):
+                get = attrgetter(*own)
+                reads.append((lambda get=get, model=model: (get(model),)) if len(own) == 1
+                             else (lambda get=get, model=model: get(model)))
+            else:
+                idx = np.array([cls.STATE_VARS.index(var) for var in own])
+                reads.append(lambda get_state=model.get_state, idx=idx: get_state()[idx].tolist())
+        aux = [_AUX_GETTERS[c] for c in AUX_CHANNELS if c in self.column]
+        if aux:
+            reads.append(lambda: [get(synapse) for get in aux])
+
+        def write(row):
+            row -= self.offset
+            if row >= n_rows:
+                # Rows arrive in order: the buffer is full
+                self.flush()
+                row -= n_rows
+            buffer[row] = [value for read in reads for value in read()]
+
+        return write
+
+    def traces(self, params):
+        """Lazy traces of the probes (Traces); read back from disk when streamed."""
+        if self.store is not None:
+            return self.store.traces()
+        return Traces(self, params)
+
+
+class Traces(Mapping):
+    """
+    label -> float32 trace of a Recorder or ChunkStore, computed on first
+    access and kept. stride(label): recording steps per sample of that trace.
+    """
+
+    def __init__(self, source, params):
+        self.source = source
+        self.params = params
+        self._cache = {}
+
+    def __getitem__(self, label):
+        if label not in self._cache:
+            probe = self.source.probes[label]
+            self._cache[label] = self._evaluate(probe)
+        return self._cache[label]
+
+    def __iter__(self):
+        return iter(self.source.probes)
+
+    def __len__(self):
+        return len(self.source.probes)
+
+    def stride(self, label):
+        probe = self.source.probes[label]
+        return probe.every // self.source.rec_step
+
+    def _evaluate(self, probe):
+        _, channels, fn = QUANTITIES[probe.name]
+        source = self.source
+        cols = [source.column[c] for c in channels]
+        values = [fn(X, self.params) for X in source.blocks(cols)]
+        values = np.concatenate(values) if values else np.empty(0)
+        if probe.scale != 1.0:
+            values = values * probe.scale
+        stride = self.stride(probe.label)
+        if stride > 1:
+            if probe.policy == "sample":
+                values = values[::stride]
+            else:
+                starts = np.arange(0, len(values), stride)
+                reduce = {"mean": np.add, "min": np.minimum, "max": np.maximum}[probe.policy]
+                counts = np.diff(np.append(starts, len(values)))
+                values = reduce.reduceat(values, starts) if len(values) else values
+                if probe.policy == "mean":
+                    values = values / counts
+        # Diverged runs: values beyond float32 become inf, as the per-step stores did
+        with np.errstate(over="ignore"):
+            return np.asarray(values, dtype=np.float32)
+
+
+class JoinedSource:
+    """
+    Recordings of consecutive stretches of one run (Recorder or ChunkStore
+    sources of the same probes), read by Traces as one: a forked scenario's
+    shared prefix followed by its own part (simulation.sweep). The channel
+    rows are joined before the quantities are evaluated, so decimated
+    probes come out as in the uninterrupted run.
+    """
+
+    def __init__(self, parts):
+        self.parts = list(parts)
+        first = self.parts[0]
+        self.probes = first.probes
+        self.rec_step = first.rec_step
+        self.channels = first.channels
+        self.column = first.column
+
+    def blocks(self, cols):
+        names = [self.channels[c] for c in cols]
+        return [block for part in self.parts
+                for block in part.blocks([part.column[c] for c in names])]
+
+
+# ==============================================================================
+# Streaming to disk
+#
+# A run with stream=<directory> keeps one chunk of recording steps in
+# memory and appends full chunks to a ChunkStore, so memory does not grow
+# with the simulated time. Directory layout:
+#   meta.json         channels, probes, params, rec_dt, chunk_rows, rows
+#                     written so far, complete
+#   chunk_000000.npy  (rows, channels) float64, chunk_rows rows (shorter
+#                     at the end of the run and at checkpoints)
+# Each chunk is written under a temporary name and renamed before
+# meta.json is updated, so ChunkStore.open() sees whole chunks only and
+# can read the traces while the run is still going.
+# ==============================================================================
+
+# Recording steps per chunk (about 25 MB with all channels)
+STREAM_CHUNK_ROWS = 65536
+
+
+def _replace_json(path, payload):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(payload, f, default=float)
+    os.replace(tmp, path)
+
+
+class ChunkStore:
+    """Recorded channels of one run in a directory of .npy chunks (see above)."""
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.meta = meta
+        self.channels = tuple(meta["channels"])
+        self.column = {c: k for k, c in enumerate(self.channels)}
+        self.probes = {p["label"]: Probe(**p) for p in meta["probes"]}
+        self.rec_step = meta["rec_step"]
+        self.rec_dt = meta["rec_dt"]
+
+    @classmethod
+    def create(cls, path, recorder, params, rec_dt, chunk_rows):
+        """New store for recorder's channels and probes; clears old chunks in path."""
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            if name.startswith("chunk_") or name == "meta.json":
+                os.remove(os.path.join(path, name))
+        meta = {
+            "channels": list(recorder.channels),
+            "probes": [{"name": p.name, "every": p.every, "policy": p.policy,
+                        "unit": p.unit, "label": p.label} for p in recorder.probes.values()],
+            "params": params,
+            "rec_step": recorder.rec_step,
+            "rec_dt": rec_dt,
+            "chunk_rows": chunk_rows,
+            "chunks": 0,
+            "rows": 0,
+            "complete": False,
+        }
+        _replace_json(os.path.join(path, "meta.json"), meta)
+        return cls(path, meta)
+
+    @classmethod
+    def open(cls, path):
+        """Store as far as written (the run may still be going)."""
+        with open(os.path.join(path, "meta.json")) as f:
+            return cls(path, json.load(f))
+
+    @classmethod
+    def reopen(cls, path, rows):
+        """Existing store cut back to its first rows rows, open for appending."""
+        store = cls.open(path)
+        if store.rows < rows:
+            raise ValueError(f"Akış deposunda {store.rows} satır var, {rows} gerekli: {path}")
+        kept = chunks = 0
+        for k in range(store.meta["chunks"]):
+            chunk = np.load(store._chunk_path(k), mmap_mode="r")
+            if kept < rows:
+                if kept + len(chunk) > rows:
+                    block = np.array(chunk[:rows - kept])
+                    del chunk
+                    store._write_chunk(k, block)
+                    chunk = block
+                kept += len(chunk)
+                chunks += 1
+            else:
+                del chunk
+                os.remove(store._chunk_path(k))
+        store.meta.update({"chunks": chunks, "rows": kept, "complete": False})
+        _replace_json(os.path.join(path, "meta.json"), store.meta)
+        return store
+
+    @property
+    def rows(self):
+        return self.meta["rows"]
+
+    @property
+    def complete(self):
+        return self.meta["complete"]
+
+    def _chunk_path(self, k):
+        return os.path.join(self.path, f"chunk_{k:06d}.npy")
+
+    def _write_chunk(self, k, block):
+        path = self._chunk_path(k)
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, block)
+        os.replace(path + ".tmp", path)
+
+    def append(self, block):
+        self._write_chunk(self.meta["chunks"], block)
+        self.meta["chunks"] += 1
+        self.meta["rows"] += len(block)
+        _replace_json(os.path.join(self.path, "meta.json"), self.meta)
+
+    def close(self):
+        self.meta["complete"] = True
+        _replace_json(os.path.join(self.path, "meta.json"), self.meta)
+
+    def blocks(self, cols):
+        """The columns cols chunk by chunk (memory-mapped reads)."""
+        for k in range(self.meta["chunks"]):
+            yield np.load(self._chunk_path(k), mmap_mode="r")[:, cols]
+
+    def time(self):
+        """Recording time axis (ms) of the rows written so far."""
+        return np.arange(self.rows) * self.rec_dt
+
+    def traces(self):
+        return Traces(self, self.meta["params"])
@@ -0,0 +1,161 @@
+import multiprocessing
+import os
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from simulation.recorder import ChunkStore
+
+
+# ==============================================================================
+# Headless figure rendering from recorded runs
+#
+# A FigureSpec describes one PNG: the traces it draws (probe labels of the
+# run), axis labels, title and limits. render_store() draws a list of specs
+# from a ChunkStore directory (a run with stream=, a run_pool run or a
+# cached_run entry) on Agg canvases without pyplot, reusing one Figure per
+# figure size across specs. RenderPool fans render jobs out over worker
+# processes; passing its submit to run_pool(on_result=...) draws the
+# figures of a finished scenario while the next ones are still simulated.
+# ==============================================================================
+
+# Specs drawn per job: the figures of one run spread over the workers
+RENDER_BATCH = 4
+
+
+class FigureSpec:
+    """
+    One PNG of a run.
+
+    filename: path of the PNG inside the output folder.
+    lines:    probe labels, or (label, style) pairs with style the
+              Axes.plot keywords (color, linewidth, label, linestyle, ...).
+    ylim:     y limits; flat=(level, ylim) uses ylim instead when every
+              line stays below level (e.g. alpha without LTP).
+    hlines:   (y, style) pairs drawn with Axes.axhline.
+    legend:   legend location (None: a legend only when hlines have labels).
+    title_kw: Axes.set_title keywords.
+    """
+
+    def __init__(self, filename, lines, ylabel, title, xlabel="Zaman (s)", ylim=None, flat=None,
+                 hlines=(), legend=None, figsize=(10, 4), dpi=300, linewidth=0.8,
+                 title_kw=None):
+        self.filename = filename
+        self.lines = [(line, {}) if isinstance(line, str) else (line[0], dict(line[1]))
+                      for line in lines]
+        self.ylabel, self.title, self.xlabel = ylabel, title, xlabel
+        self.ylim, self.flat = ylim, flat
+        self.hlines = [(y, dict(style)) for y, style in hlines]
+        self.legend = legend
+        self.figsize, self.dpi, self.linewidth = tuple(figsize), dpi, linewidth
+        self.title_kw = dict(title_kw or {"loc": "left", "fontweight": "bold", "fontsize": 12})
+
+    def __repr__(self):
+        return f"FigureSpec({self.filename!r}, {[label for label, _ in self.lines]})"
+
+
+# Worker-local figures, one per figure size, reused across specs and jobs
+_FIGURES = {}
+
+
+def _axes(figsize):
+    if figsize not in _FIGURES:
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        _FIGURES[figsize] = (fig, fig.add_subplot())
+    fig, ax = _FIGURES[figsize]
+    ax.cla()
+    return fig, ax
+
+
+def draw(spec, t_sec, traces, folder):
+    """Draw spec from traces (label -> array on t_sec[::traces.stride(label)]) into folder."""
+    fig, ax = _axes(spec.figsize)
+    top = -np.inf
+    for label, style in spec.lines:
+        data = traces[label]
+        ax.plot(t_sec[::traces.stride(label)], data, **{"linewidth": spec.linewidth, **style})
+        top = max(top, float(np.max(data))) if len(data) else top
+    for y, style in spec.hlines:
+        ax.axhline(y=y, **style)
+    ax.set_ylabel(spec.ylabel, fontsize=12)
+    ax.set_xlabel(spec.xlabel, fontsize=12)
+    ax.set_title(spec.title, **spec.title_kw)
+    ax.grid(True, alpha=0.3)
+    if spec.flat is not None and top < spec.flat[0]:
+        ax.set_ylim(spec.flat[1])
+    elif spec.ylim is not None:
+        ax.set_ylim(spec.ylim)
+    if spec.legend is not None:
+        ax.legend(loc=spec.legend)
+    elif any("label" in style for _, style in spec.hlines):
+        ax.legend()
+    fig.tight_layout()
+    path = os.path.join(folder, spec.filename)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fig.savefig(path, dpi=spec.dpi)
+    return path
+
+
+def render_store(path, specs, folder):
+    """Draw specs from the ChunkStore at path into folder; returns the files written."""
+    store = ChunkStore.open(path)
+    traces, t_sec = store.traces(), store.time() / 1000.0
+    return [draw(spec, t_sec, traces, folder) for spec in specs]
+
+
+def _render_job(job):
+    path, specs, folder = job
+    try:
+        return path, render_store(path, specs, folder), None
+    except Exception as exc:
+        return path, [], f"{type(exc).__name__}: {exc}"
+
+
+class RenderPool:
+    """
+    Worker processes drawing render jobs in the background (processes:
+    None one per CPU, 1 draws in this process on submit).
+
+    submit(path, specs, folder) queues the specs of the run stored at path
+    in jobs of RENDER_BATCH; wait() blocks until every job is drawn and
+    returns the files written. Failed jobs are reported together in a
+    RuntimeError. As a context manager, leaving the block waits.
+    """
+
+    def __init__(self, processes=None, batch=RENDER_BATCH):
+        self.processes = processes or os.cpu_count()
+        self.batch = batch
+        self._pool = multiprocessing.Pool(self.processes) if self.processes > 1 else None
+        self._jobs = []
+
+    def submit(self, path, specs, folder):
+        for k in range(0, len(specs), self.batch):
+            job = (path, list(specs[k:k + self.batch]), folder)
+            self._jobs.append(_render_job(job) if self._pool is None
+                              else self._pool.apply_async(_render_job, (job,)))
+
+    def wait(self):
+        outcomes = [job if self._pool is None else job.get() for job in self._jobs]
+        self._jobs = []
+        failed = [f"{path}: {error}" for path, _, error in outcomes if error is not None]
+        if failed:
+            raise RuntimeError("Çizilemeyen grafikler:\n" + "\n".join(failed))
+        return [file for _, files, _ in outcomes for file in files]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.wait()
+        finally:
+            self.close()
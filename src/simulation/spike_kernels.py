@@ -0,0 +1,254 @@
+import hashlib
+import json
+import time
+
+import numpy as np
+
+from models.hh import PresynapticHH
+from models.calcium_model import PresynapticCalciumDynamics
+from parameters.pre_synaptic_params import PRE_SYNAPTIC_PARAMS
+from parameters.ca_params import CA_PARAMS
+
+
+# ==============================================================================
+# Single-spike response kernels for the fast presynaptic Ca2+ (c_fast)
+#
+# One stimulus pulse (I_app_amp for pulse_width ms) on the resting HH
+# terminal gives a fixed AP waveform V(t) and VGCC gate m_Ca(t): both are
+# independent of Ca. The c_fast response is not, because PMCA saturates, so
+# the kernel tabulates it per starting level c0:
+#
+#   window K[c0, j] : c_fast after step j of the spike window (Euler, same
+#                     arithmetic as PresynapticCalciumDynamics.step_fast),
+#                     for c0 on a grid; linear in between
+#   decay  D[k]     : c_fast after k steps at rest (V, m_Ca back at rest,
+#                     nonlinear PMCA + leak), from the table's top level
+#
+# A spike train is then evaluated event by event: each spike starts at the
+# level left by the previous one, c(t) comes from K inside the window and
+# from the decay map D(D^-1(c_end) + k) after it. Exact (to the c0
+# interpolation) for trains whose spikes do not overlap (ISI at least the
+# window, up to ~14 Hz with the default parameters) and a frozen c_slow;
+# in the full model SERCA drains c_slow during each spike, which costs
+# about 1% of the c_fast peak. validate() reports the error against the
+# full ODE together with the overlapping spikes.
+# ==============================================================================
+
+# Kernel layout version: bump when the tables change for the same parameters
+_KERNEL_VERSION = 1
+
+# The spike window ends once the VGCC influx is within this fraction of its
+# peak excursion from rest
+WINDOW_TOL = 1e-4
+
+_KERNELS = {}
+
+
+class CaSpikeKernel:
+    """
+    c_fast response (M) to one HH stimulus pulse, on the dt grid (ms).
+
+    hh_params / ca_params: parameter dicts (pulse amplitude and width from
+    hh_params). c_slow: frozen slow Ca (M), default ca_params["c_i_rest"].
+    c0_max, n_c0: grid of starting levels (M) of the window table.
+    """
+
+    def __init__(self, hh_params, ca_params, dt=0.05, c_slow=None, c0_max=20e-6, n_c0=81):
+        self.dt = dt
+        self.hh_params, self.ca_params = hh_params, ca_params
+        self.c_slow = ca_params["c_i_rest"] if c_slow is None else c_slow
+        self.amp = hh_params.get("I_app_amp", 10.0)
+        self.width = hh_params.get("pulse_width", 10.0)
+        ca = self._ca = PresynapticCalciumDynamics(ca_params)
+
+        # Resting HH terminal: settle undriven, then one pulse until V and the
+        # VGCC influx are back at rest
+        hh = PresynapticHH(hh_params)
+        for _ in range(int(round(500.0 / dt))):
+            hh.step(dt, 0.0, drive=0.0)
+        self.hh_rest = hh.get_state()
+        V_rest = hh.V * 1e-3
+        m_rest = ca.vgcc_m_inf(V_rest)
+        self.influx_rest = self._influx(V_rest, m_rest)
+
+        V, influx = [], []
+        m = m_rest
+        dt_sec = dt * 1e-3
+        j, j_max = 0, int(round(1000.0 / dt))
+        while j < j_max:
+            V_j = hh.step(dt, j * dt, drive=self.amp if j * dt <= self.width else 0.0) * 1e-3
+            m += (ca.vgcc_m_inf(V_j) - m) / ca_params["tau_mCa"] * dt_sec
+            V.append(V_j)
+            influx.append(self._influx(V_j, m))
+            j += 1
+            if j * dt > self.width and j % 100 == 0:
+                excursion = np.abs(np.array(influx) - self.influx_rest)
+                if excursion[-100:].max() <= WINDOW_TOL * excursion.max():
+                    break
+        self.V = np.array(V) * 1e3            # mV, spike window
+        self.influx = np.array(influx)        # VGCC current (A) per window step
+        self.n_window = len(V)
+        self.window_ms = self.n_window * dt
+
+        # Window table over starting levels c0 (all rows stepped together)
+        self.c0 = np.linspace(0.0, c0_max, n_c0)
+        c = self.c0.copy()
+        table = np.empty((n_c0, self.n_window))
+        for j in range(self.n_window):
+            c = self._step_c(c, self.influx[j])
+            table[:, j] = c
+        self.table = table
+
+        # Decay map from the table's top level down to the rest level / floor
+        c = float(max(table.max(), c0_max))
+        decay = [c]
+        while len(decay) < 10**6:
+            c_next = float(self._step_c(np.array([c]), self.influx_rest)[0])
+            decay.append(c_next)
+            if abs(c_next - c) <= 1e-12 * max(c, 1e-12):
+                break
+            c = c_next
+        self.decay = np.array(decay)
+        # Strictly decreasing part for the inverse map (the floor may repeat)
+        self._n_decay = len(decay) - 1 if decay[-1] == decay[-2] else len(decay)
+
+    def _influx(self, V_pre, m_Ca):
+        p = self.ca_params
+        g_total = p["rho_Ca"] * (m_Ca**2) * p["g_Ca"]
+        return g_total * (V_pre - self._ca.V_Ca) * p["A_btn"]
+
+    def _step_c(self, c_fast, I_Ca_amp):
+        """One Euler step of c_fast (as step_fast) for the VGCC current I_Ca_amp."""
+        p = self.ca_params
+        c_i = np.maximum(c_fast + self.c_slow, 1e-9)
+        I_PMCA_amp = p["v_PMCA_max"] * (c_i**2) / (c_i**2 + p["K_PMCA"]**2) * p["A_btn"]
+        J_leak = p["v_leak"] * (p["c_ext"] - c_i)
+        dc_fast_dt = -(I_Ca_amp + I_PMCA_amp) * self._ca.inv_zFV + J_leak
+        return np.maximum(c_fast + dc_fast_dt * self.dt * 1e-3, 0.0)
+
+    # ------------------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------------------
+    def window(self, c0, j):
+        """K(c0, j): c_fast after window step j (arrays), linear in c0."""
+        u = np.clip(np.asarray(c0) / self.c0[-1], 0.0, 1.0) * (len(self.c0) - 1)
+        i = np.minimum(u.astype(np.intp), len(self.c0) - 2)
+        w = u - i
+        return (1.0 - w) * self.table[i, j] + w * self.table[i + 1, j]
+
+    def decay_from(self, c, k):
+        """c_fast k rest steps after level c (arrays)."""
+        n = self._n_decay
+        # Position of c on the decay curve (the curve decreases)
+        pos = np.interp(-np.asarray(c, dtype=np.float64), -self.decay[:n], np.arange(n))
+        return np.interp(pos + k, np.arange(len(self.decay)), self.decay)
+
+    def train(self, onsets, steps, every=1, c_init=0.0):
+        """
+        c_fast (M) after steps i = 0, every, 2*every, ... < steps for pulses
+        starting at the given onset times (ms). Returns (c_fast, info) with
+        info counting overlapping spikes and starts beyond the c0 grid.
+        """
+        dt = self.dt
+        starts = np.unique(np.round(np.asarray(onsets, dtype=np.float64) / dt).astype(np.int64))
+        starts = starts[(starts >= 0) & (starts < steps)]
+        n_win = self.n_window
+
+        # Level at each spike onset, spike by spike
+        c0 = np.empty(len(starts))
+        info = {"spikes": len(starts), "overlapping_spikes": 0, "out_of_range": 0}
+        for k, s in enumerate(starts.tolist()):
+            if k > 0 and s - starts[k - 1] < n_win:
+                c = float(self.window(c0[k - 1], s - starts[k - 1] - 1))
+                info["overlapping_spikes"] += 1
+            elif k > 0:
+                c_end = float(self.window(c0[k - 1], n_win - 1))
+                c = float(self.decay_from(c_end, s - starts[k - 1] - n_win))
+            else:
+                c = float(self.decay_from(c_init, s))
+            if c > self.c0[-1]:
+                info["out_of_range"] += 1
+            c0[k] = c
+
+        # Vectorized evaluation on the output steps
+        i = np.arange(0, steps, every)
+        k = np.searchsorted(starts, i, side="right") - 1
+        out = np.asarray(self.decay_from(np.full(i.shape, c_init), i + 1), dtype=np.float64)
+        spiking = k >= 0
+        kk = k[spiking]
+        j = i[spiking] - starts[kk]
+        inside = j < n_win
+        values = np.empty(len(kk))
+        values[inside] = self.window(c0[kk[inside]], j[inside])
+        after = ~inside
+        c_end = self.window(c0[kk[after]], np.full(after.sum(), n_win - 1))
+        values[after] = self.decay_from(c_end, j[after] - n_win + 1)
+        out[spiking] = values
+        return out, info
+
+    def voltage(self, onsets, steps, every=1):
+        """V_pre (mV) after the same steps: AP windows on the resting potential."""
+        dt = self.dt
+        starts = np.unique(np.round(np.asarray(onsets, dtype=np.float64) / dt).astype(np.int64))
+        i = np.arange(0, steps, every)
+        k = np.searchsorted(starts, i, side="right") - 1
+        out = np.full(i.shape, self.hh_rest[0])
+        j = i - starts[np.maximum(k, 0)]
+        inside = (k >= 0) & (j < self.n_window)
+        out[inside] = self.V[j[inside]]
+        return out
+
+    # ------------------------------------------------------------------
+    # Validation against the full ODE
+    # ------------------------------------------------------------------
+    def validate(self, onsets, T_total, every=20):
+        """
+        Compare train() with HH + PresynapticCalciumDynamics stepped in full
+        (c_slow free) from the kernel's rest state. Returns a report dict:
+        max_abs_err_uM, rel_err (to the peak), kernel_ms, ode_ms, plus the
+        train() info counters.
+        """
+        dt = self.dt
+        steps = int(T_total / dt)
+        start = time.perf_counter()
+        c_kernel, info = self.train(onsets, steps, every)
+        kernel_ms = (time.perf_counter() - start) * 1e3
+
+        hh = PresynapticHH(self.hh_params)
+        hh.set_state(self.hh_rest)
+        ca = PresynapticCalciumDynamics(self.ca_params)
+        ca.c_fast, ca.c_slow = 0.0, self.c_slow
+        ca.m_Ca = ca.vgcc_m_inf(hh.V * 1e-3)
+        starts = np.unique(np.round(np.asarray(onsets, dtype=np.float64) / dt).astype(np.int64))
+        pulse = np.zeros(steps, dtype=bool)
+        for s in starts.tolist():
+            pulse[s:s + int(np.floor(self.width / dt + 1e-9)) + 1] = True
+        c_ode = np.empty(len(c_kernel))
+        start = time.perf_counter()
+        for i in range(steps):
+            V = hh.step(dt, i * dt, drive=self.amp if pulse[i] else 0.0)
+            ca.step(dt * 1e-3, V * 1e-3, glu=0.0)
+            if i % every == 0:
+                c_ode[i // every] = ca.c_fast
+        ode_ms = (time.perf_counter() - start) * 1e3
+
+        err = np.max(np.abs(c_kernel - c_ode))
+        return {"max_abs_err_uM": err * 1e6, "rel_err": err / max(np.max(np.abs(c_ode)), 1e-30),
+                "kernel_ms": kernel_ms, "ode_ms": ode_ms, **info}
+
+
+def _kernel_key(hh_params, ca_params, dt, c_slow, c0_max, n_c0):
+    payload = json.dumps({"hh": hh_params, "ca": ca_params, "dt": dt, "c_slow": c_slow,
+                          "c0_max": c0_max, "n_c0": n_c0, "version": _KERNEL_VERSION},
+                         sort_keys=True, default=float)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def ca_spike_kernel(hh_params=None, ca_params=None, dt=0.05, c_slow=None, c0_max=20e-6, n_c0=81):
+    """Cached CaSpikeKernel for the parameter set (defaults: module parameters)."""
+    hh_params = PRE_SYNAPTIC_PARAMS if hh_params is None else hh_params
+    ca_params = CA_PARAMS if ca_params is None else ca_params
+    key = _kernel_key(hh_params, ca_params, dt, c_slow, c0_max, n_c0)
+    if key not in _KERNELS:
+        _KERNELS[key] = CaSpikeKernel(hh_params, ca_params, dt, c_slow, c0_max, n_c0)
+    return _KERNELS[key]
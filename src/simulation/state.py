@@ -0,0 +1,56 @@
+import numpy as np
+
+from models.hh import PresynapticHH
+from models.calcium_model import PresynapticCalciumDynamics
+from models.presynaptic_glutamate import GlutamateDynamics
+from models.astrocyte import AstrocyteDynamics
+from models.gliatransmitter import GliatransmitterDynamics
+from models.post_synaptic import PostSynapticDynamics
+from models.post_synaptic_ca import PostSynapticCalciumDynamics
+from models.camkii import CaMKIIDynamics
+
+
+# ==============================================================================
+# Packed state vector layout of the coupled tripartite synapse.
+# Order follows the coupling chain; each model owns one contiguous slice.
+# ==============================================================================
+MODEL_ORDER = (
+    ("hh", PresynapticHH),
+    ("ca_pre", PresynapticCalciumDynamics),
+    ("glu", GlutamateDynamics),
+    ("astro", AstrocyteDynamics),
+    ("glia", GliatransmitterDynamics),
+    ("post", PostSynapticDynamics),
+    ("post_ca", PostSynapticCalciumDynamics),
+    ("camkii", CaMKIIDynamics),
+)
+
+SLICES = {}
+STATE_NAMES = []
+_offset = 0
+for _name, _cls in MODEL_ORDER:
+    SLICES[_name] = slice(_offset, _offset + len(_cls.STATE_VARS))
+    STATE_NAMES.extend(f"{_name}.{var}" for var in _cls.STATE_VARS)
+    _offset += len(_cls.STATE_VARS)
+N_STATE = _offset
+STATE_NAMES = tuple(STATE_NAMES)
+
+
+def index(name):
+    """Position of a qualified state name such as 'glu.g' in the packed vector."""
+    return STATE_NAMES.index(name)
+
+
+def pack(synapse, out=None):
+    """Copy the state of all eight models into one float64 vector."""
+    if out is None:
+        out = np.empty(N_STATE, dtype=np.float64)
+    for name, _ in MODEL_ORDER:
+        out[SLICES[name]] = getattr(synapse, name).get_state()
+    return out
+
+
+def unpack(synapse, y):
+    """Write a packed state vector back into the eight models."""
+    for name, _ in MODEL_ORDER:
+        getattr(synapse, name).set_state(y[SLICES[name]])
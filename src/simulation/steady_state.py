@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from simulation import state as state_layout
+from simulation.adaptive import EULER_FLOORS, _per_state, _pinned, atol_vector
+from simulation.paths import cache_subdir
+
+
+# ==============================================================================
+# Resting state of the undriven tripartite synapse
+#
+# The models start from hard-coded initial values (c_ER = 400 uM, q = 0.5,
+# h_a = 0.8, P0 = 1, ...) that are not an equilibrium of the coupled system,
+# so every run opens with a start-up transient (hence glu_mute_ms). Here the
+# rest point of the coupled rhs without any drive (PresynapticHH pulse train
+# and injected current switched off) is found directly:
+#
+#   pseudo-transient continuation: (I/h - J) dy = f(y), with h grown as the
+#   residual falls (switched evolution relaxation), so the iteration starts
+#   as damped implicit Euler from the default state and ends as Newton.
+#
+# States the Euler reference clips at a floor (c_fast, sensor fractions,
+# CaMKII P1..P10, ...) rest there with an outward rhs; they are frozen, as
+# in the fast-forward integrator. Forward Euler keeps the result fixed.
+#
+# Results are cached on disk per parameter set and model source code
+# (REST_CACHE_DIR; the code hash is simulation.cache.code_version()).
+# ==============================================================================
+
+# Cache directory under the shared cache root (simulation.paths)
+REST_CACHE_DIR = cache_subdir("rest_state")
+
+
+def _undriven_params(synapse):
+    return {**synapse.params,
+            "pre_synaptic": {**synapse.params["pre_synaptic"], "I_app_amp": 0.0}}
+
+
+def undriven(synapse):
+    """Copy of synapse without the HH pulse train or injected current."""
+    from simulation.synapse import TripartiteSynapse
+
+    return TripartiteSynapse(T_total=synapse.dt, dt=synapse.dt, current=0.0,
+                             stim_window=None, params=_undriven_params(synapse),
+                             record=(), alpha_feedback=synapse.alpha_feedback)
+
+
+def solve_rest_state(synapse, y0=None, tol=1e-12, max_iter=200):
+    """
+    Packed rest state of the undriven coupled rhs, starting from y0 (default:
+    the synapse's current state). Converged when the floor-projected drift
+    |f| / (|y| + atol) is below tol (per ms) everywhere.
+    """
+    rest = undriven(synapse)
+    floors = _per_state(EULER_FLOORS)
+    atol = atol_vector()
+    eye = np.eye(state_layout.N_STATE)
+
+    def residual(y):
+        f = rest.rhs(0.0, y)
+        pinned = _pinned(y, f, floors, atol)
+        f[pinned] = 0.0
+        return f, pinned, np.max(np.abs(f) / (np.abs(y) + atol))
+
+    y = np.maximum(synapse.get_state() if y0 is None else np.array(y0, dtype=np.float64), floors)
+    f, pinned, drift = residual(y)
+    h = 1e-2  # ms
+    for _ in range(max_iter):
+        if drift <= tol:
+            y[pinned] = floors[pinned]
+            return y
+        J = rest.jacobian(0.0, y)
+        J[pinned] = 0.0
+        y = np.maximum(y + np.linalg.solve(eye / h - J, f), floors)
+        f, pinned, new_drift = residual(y)
+        h = min(h * np.clip(drift / max(new_drift, 1e-300), 0.1, 10.0), 1e12)
+        drift = new_drift
+    raise RuntimeError(f"Dinlenme durumu {max_iter} iterasyonda bulunamadı (kalan sapma: {drift:.2e}/ms).")
+
+
+def rest_cache_key(synapse):
+    """Hash of everything the rest state depends on (not the drive)."""
+    from simulation.cache import code_version
+
+    payload = json.dumps({"params": _undriven_params(synapse),
+                          "alpha_feedback": synapse.alpha_feedback,
+                          "states": state_layout.STATE_NAMES,
+                          "code": code_version()},
+                         sort_keys=True, default=float)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def rest_state(synapse, cache_dir=None):
+    """
+    Cached solve_rest_state() for the synapse's parameter set. The synapse
+    must hold its default initial values (the Newton starting point).
+    cache_dir: None (REST_CACHE_DIR) or False to skip the disk cache.
+    """
+    if cache_dir is False:
+        return solve_rest_state(synapse)
+    path = os.path.join(cache_dir or REST_CACHE_DIR, rest_cache_key(synapse) + ".npy")
+    if os.path.exists(path):
+        y = np.load(path)
+        if y.shape == (state_layout.N_STATE,):
+            return y
+    y = solve_rest_state(synapse)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write-then-rename: concurrent runs never read a partial file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        np.save(fh, y)
+    os.replace(tmp, path)
+    return y
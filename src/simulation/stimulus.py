@@ -0,0 +1,215 @@
+import math
+
+import numpy as np
+
+
+# ==============================================================================
+# Stimulus protocols and the compiled drive schedule
+#
+# A protocol is a piecewise-constant applied HH current (uA/cm2) over time
+# (ms) with two methods:
+#   sample(t) : current at the time(s) t, array-safe
+#   edges(t_end): times in [0, t_end) where the current may jump
+#
+# TripartiteSynapse sums its protocols (by default the HH pulse train from
+# the pre_synaptic parameters plus the injected current inside stim_window)
+# and compiles them once per run into a Schedule on the dt grid: segment
+# start indices plus one value per segment. The time loops only advance a
+# cursor at segment starts; rhs() samples the protocols at continuous t
+# (protocol_current) and the adaptive integrators split the time axis at
+# the protocol edges (protocol_edges).
+# ==============================================================================
+
+
+class Tonic:
+    """
+    Square pulses of amp every 1000 / freq ms, each width ms long (closed
+    at both ends, as PresynapticHH.get_applied_current), from start up to
+    stop (None: no end).
+    """
+
+    def __init__(self, amp, freq, width, start=0.0, stop=None):
+        self.amp, self.freq, self.width = float(amp), float(freq), float(width)
+        self.start = float(start)
+        self.stop = math.inf if stop is None else float(stop)
+
+    def sample(self, t):
+        if self.freq <= 0 or self.amp == 0.0:
+            return 0.0 * np.asarray(t, dtype=np.float64) if isinstance(t, np.ndarray) else 0.0
+        period = 1000.0 / self.freq
+        if isinstance(t, np.ndarray):
+            on = (t >= self.start) & (t <= self.stop) & (np.mod(t - self.start, period) <= self.width)
+            return np.where(on, self.amp, 0.0)
+        if self.start <= t <= self.stop and ((t - self.start) % period) <= self.width:
+            return self.amp
+        return 0.0
+
+    def edges(self, t_end):
+        if self.freq <= 0 or self.amp == 0.0:
+            return np.empty(0)
+        onsets = np.arange(self.start, min(t_end, self.stop), 1000.0 / self.freq)
+        return np.concatenate([onsets, onsets + self.width, [self.stop]])
+
+
+class Window:
+    """Constant amp for t_on <= t <= t_off (either end may be infinite)."""
+
+    def __init__(self, amp, t_on=-math.inf, t_off=math.inf):
+        self.amp = float(amp)
+        self.t_on, self.t_off = float(t_on), float(t_off)
+
+    def sample(self, t):
+        if isinstance(t, np.ndarray):
+            return np.where((t >= self.t_on) & (t <= self.t_off), self.amp, 0.0)
+        return self.amp if self.t_on <= t <= self.t_off else 0.0
+
+    def edges(self, t_end):
+        return np.array([self.t_on, self.t_off]) if self.amp != 0.0 else np.empty(0)
+
+
+class PulseTrain:
+    """
+    Pulses of amp starting at the given onsets (ms), each width ms long;
+    overlapping pulses merge into one.
+    """
+
+    def __init__(self, amp, onsets, width):
+        self.amp, self.width = float(amp), float(width)
+        onsets = np.sort(np.asarray(onsets, dtype=np.float64))
+        # Merge overlaps: a pulse starts a new interval only after the last one ended
+        starts, ends = [], []
+        for t0 in onsets.tolist():
+            if ends and t0 <= ends[-1]:
+                ends[-1] = max(ends[-1], t0 + self.width)
+            else:
+                starts.append(t0)
+                ends.append(t0 + self.width)
+        self.starts, self.ends = np.array(starts), np.array(ends)
+
+    def sample(self, t):
+        k = np.searchsorted(self.starts, t, side="right") - 1
+        if isinstance(t, np.ndarray):
+            on = (k >= 0) & (t <= self.ends[np.maximum(k, 0)]) if self.starts.size else np.zeros(t.shape, bool)
+            return np.where(on, self.amp, 0.0)
+        return self.amp if k >= 0 and t <= self.ends[k] else 0.0
+
+    def edges(self, t_end):
+        return np.concatenate([self.starts, self.ends])
+
+
+class Waveform:
+    """
+    Arbitrary current trace: values[k] held on [t0 + k*dt, t0 + (k+1)*dt),
+    zero outside.
+    """
+
+    def __init__(self, values, dt, t0=0.0):
+        self.values = np.asarray(values, dtype=np.float64)
+        self.dt, self.t0 = float(dt), float(t0)
+
+    def sample(self, t):
+        k = np.floor((np.asarray(t, dtype=np.float64) - self.t0) / self.dt).astype(np.intp)
+        inside = (k >= 0) & (k < self.values.size)
+        out = np.where(inside, self.values[np.clip(k, 0, max(self.values.size - 1, 0))], 0.0)
+        return out if isinstance(t, np.ndarray) else float(out)
+
+    def edges(self, t_end):
+        padded = np.concatenate([[0.0], self.values, [0.0]])
+        jumps = np.flatnonzero(padded[1:] != padded[:-1])
+        return self.t0 + jumps * self.dt
+
+
+def theta_burst(amp, start, n_bursts=10, burst_freq=5.0, pulses=4, pulse_freq=100.0, width=2.0):
+    """Theta-burst protocol: n_bursts bursts at burst_freq, each pulses at pulse_freq."""
+    bursts = start + np.arange(n_bursts) * (1000.0 / burst_freq)
+    onsets = (bursts[:, None] + np.arange(pulses) * (1000.0 / pulse_freq)).ravel()
+    return PulseTrain(amp, onsets, width)
+
+
+def poisson_train(amp, rate, width, t_on, t_off, seed=None):
+    """Pulses at Poisson times of rate (Hz) in [t_on, t_off); fixed by seed."""
+    rng = np.random.default_rng(seed)
+    n = rng.poisson(rate * (t_off - t_on) * 1e-3)
+    return PulseTrain(amp, np.sort(rng.uniform(t_on, t_off, n)), width)
+
+
+def default_protocols(pre_params, current, stim_window):
+    """HH pulse train of the pre_synaptic parameters + current inside stim_window."""
+    window = (Window(current) if stim_window is None else Window(current, *stim_window))
+    return (Tonic(pre_params.get("I_app_amp", 10.0), pre_params.get("freq", 5.0),
+                  pre_params.get("pulse_width", 10.0)),
+            window)
+
+
+def protocol_current(protocols, t):
+    """Summed current of the protocols at continuous time(s) t (ms)."""
+    total = 0.0
+    for protocol in protocols:
+        total = total + protocol.sample(t)
+    return total
+
+
+def protocol_edges(protocols, t_end):
+    """Sorted protocol edges (ms) in (0, t_end)."""
+    points = [protocol.edges(t_end) for protocol in protocols]
+    points = np.unique(np.concatenate(points)) if points else np.empty(0)
+    return points[(points > 0.0) & (points < t_end)]
+
+
+# Steps sampled at a time by Schedule.compile
+COMPILE_BLOCK = 1 << 20
+
+
+class Schedule:
+    """
+    Protocols compiled on the grid t_i = i * dt, i < steps: segment k
+    covers steps starts[k] <= i < starts[k + 1] with current values[k]
+    (starts ends with the sentinel steps). values has shape (m,) or, for
+    merged ensemble schedules, (m, n).
+    """
+
+    def __init__(self, starts, values):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.float64)
+
+    @classmethod
+    def compile(cls, protocols, dt, steps):
+        # Sampled block by block: memory bounded by COMPILE_BLOCK, not steps
+        starts, values = [], []
+        last = np.nan   # differs from any current: the first step starts a segment
+        for i0 in range(0, steps, COMPILE_BLOCK):
+            i = np.arange(i0, min(i0 + COMPILE_BLOCK, steps))
+            total = protocol_current(protocols, i * dt) + np.zeros(len(i))
+            changed = np.flatnonzero(total != np.concatenate([[last], total[:-1]]))
+            starts.append(i[changed])
+            values.append(total[changed])
+            last = total[-1]
+        starts = np.concatenate(starts) if starts else np.empty(0, np.int64)
+        values = np.concatenate(values) if values else np.empty(0)
+        return cls(np.append(starts, steps), values)
+
+    @classmethod
+    def merge(cls, schedules):
+        """One schedule over the union of segment starts; values (m, n)."""
+        starts = np.unique(np.concatenate([s.starts for s in schedules]))
+        values = np.stack([s.values[np.searchsorted(s.starts, starts[:-1], side="right") - 1]
+                           for s in schedules], axis=-1)
+        return cls(starts, values)
+
+    def divergence(self):
+        """First step where the columns of a merged schedule differ (steps: never)."""
+        values = self.values.reshape(len(self.values), -1)
+        differ = np.flatnonzero(np.any(values != values[:, :1], axis=1))
+        return int(self.starts[differ[0]]) if differ.size else int(self.starts[-1])
+
+    def segment(self, i):
+        """Index of the segment holding step i."""
+        return int(np.searchsorted(self.starts, i, side="right")) - 1
+
+    def at(self, i):
+        """Current at step i."""
+        return self.values[self.segment(i)]
+
+    def dense(self):
+        """Current at every step, shape (steps,) or (steps, n)."""
+        return np.repeat(self.values, np.diff(self.starts), axis=0)
@@ -0,0 +1,322 @@
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from simulation.cache import cache_key
+from simulation.checkpoint import config_key
+from simulation.ensemble import _member_overrides
+from simulation.recorder import ChunkStore, JoinedSource, Traces, _replace_json
+from simulation.stimulus import Schedule
+from simulation.synapse import SimulationResult, TripartiteSynapse
+
+
+# ==============================================================================
+# Scenario sweeps with a shared warm-up prefix
+#
+# The scripts' scenarios differ only in their drive (the current inside
+# stim_window, or a stimulus of their own), so up to the first step where
+# two drives differ they integrate the same equations from the same state.
+# run_sweep() groups the scenarios by configuration (checkpoint.config_key),
+# runs a group's common prefix once, checkpoints it and resumes every
+# scenario of the group from there. A scenario's result joins the prefix
+# recording with its own (recorder.JoinedSource) and is bit-identical to
+# its independent run with the same seed: the checkpoint carries the
+# random generator states along.
+# ==============================================================================
+
+
+def scenario_arguments(scenarios, params=None, **kwargs):
+    """
+    TripartiteSynapse arguments of each scenario, a dict as the
+    SynapseEnsemble members ("label", "current", "params", "stimulus");
+    params and kwargs are shared by all of them.
+    """
+    overrides = _member_overrides(params or {}, scenarios)
+    return [{**kwargs, "current": s.get("current", kwargs.get("current", 0.0)),
+             "params": overrides[k], "stimulus": s.get("stimulus", kwargs.get("stimulus"))}
+            for k, s in enumerate(scenarios)]
+
+
+def shared_prefix(synapses):
+    """
+    Steps at the start the synapses run alike: up to their first drive
+    difference, 0 when their configurations differ.
+    """
+    if len({config_key(s) for s in synapses}) > 1:
+        return 0
+    steps = min(s.steps for s in synapses)
+    drive = Schedule.merge([Schedule.compile(s.stimulus, s.dt, steps) for s in synapses])
+    return drive.divergence()
+
+
+def _labels(scenarios):
+    labels = [s.get("label", str(k)) for k, s in enumerate(scenarios)]
+    if len(set(labels)) != len(labels):
+        raise ValueError(f"Senaryo etiketleri tekrar ediyor: {labels}")
+    return labels
+
+
+def _fork_groups(synapses, fork):
+    """[(scenario indices, shared prefix steps)]: one group per configuration."""
+    groups = {}
+    for k, synapse in enumerate(synapses):
+        groups.setdefault(config_key(synapse) if fork else k, []).append(k)
+    return [(group, shared_prefix([synapses[k] for k in group]) if len(group) > 1 else 0)
+            for group in groups.values()]
+
+
+def run_sweep(scenarios, params=None, fork=True, backend="python", seed=None,
+              verbose=False, **kwargs):
+    """
+    Run every scenario (see scenario_arguments; other TripartiteSynapse
+    arguments in kwargs) and return {label: SimulationResult}.
+
+    fork: run the prefix a group of scenarios shares once and go on from
+          its checkpoint; False runs each scenario from the start.
+          result.stats["prefix_ms"] / ["prefix_wall_time"] report the
+          shared part (wall_time then covers the scenario's own part).
+    backend, seed: as TripartiteSynapse.run.
+    """
+    arguments = scenario_arguments(scenarios, params, **kwargs)
+    synapses = [TripartiteSynapse(**a) for a in arguments]
+    labels = _labels(scenarios)
+
+    results = {}
+    for group, prefix_steps in _fork_groups(synapses, fork):
+        members = [synapses[k] for k in group]
+        if prefix_steps == 0:
+            for k in group:
+                if verbose:
+                    print(f"\n>>> KOŞTURULUYOR: {labels[k]}...")
+                results[labels[k]] = synapses[k].run(verbose=verbose, backend=backend, seed=seed)
+            continue
+
+        prefix_ms = prefix_steps * members[0].dt
+        if verbose:
+            print(f"\n>>> ORTAK ÖN KOŞU: 0-{prefix_ms/1000:.1f} s "
+                  f"({', '.join(labels[k] for k in group)})...")
+        with tempfile.TemporaryDirectory() as tmp:
+            snapshot = os.path.join(tmp, "prefix.npz")
+            # Half a step past the prefix: int(T_total / dt) is exactly prefix_steps
+            prefix_synapse = TripartiteSynapse(**{**arguments[group[0]],
+                                                  "T_total": (prefix_steps + 0.5) * members[0].dt})
+            prefix = prefix_synapse.run(verbose=verbose, backend=backend, seed=seed,
+                                        checkpoint=snapshot)
+            for k in group:
+                if verbose:
+                    print(f"\n>>> KOŞTURULUYOR: {labels[k]} ({prefix_ms/1000:.1f} s'den)...")
+                tail = synapses[k].run(verbose=verbose, backend=backend, resume=snapshot)
+                source = JoinedSource([prefix.traces.source, tail.traces.source])
+                results[labels[k]] = SimulationResult(
+                    np.concatenate([prefix.time, tail.time]), Traces(source, synapses[k].params),
+                    wall_time=tail.wall_time,
+                    stats={**tail.stats, "prefix_ms": prefix_ms, "prefix_wall_time": prefix.wall_time})
+    return {label: results[label] for label in labels}
+
+
+# ==============================================================================
+# Process-pool sweeps with an on-disk result cache
+#
+# run_pool() fans the scenarios out over worker processes. Every run
+# streams into workdir/runs/<run_key>/ (store/: recorder.ChunkStore,
+# checkpoint.npz: simulation.checkpoint), so a run whose store is complete
+# is never repeated, whichever sweep or label asked for it, and a run cut
+# short by a crash or Ctrl-C goes on from its last checkpoint the next
+# time. Shared prefixes are runs of their own; a forked scenario starts
+# from a copy of its prefix's store and checkpoint. workdir/manifest.json
+# lists the scenarios of the last call with their run keys and status.
+# on_result(label, store path) is called in the calling process as soon as
+# a scenario's store is complete, while the other runs go on (e.g.
+# render.RenderPool.submit to draw its figures meanwhile).
+# ==============================================================================
+
+
+def parameter_grid(axes):
+    """
+    Scenarios of every combination of the axes, e.g. {"current": [6.0, 22.0],
+    "camkii.P_half": [25e-6, 55e-6]}; parameter axes are "group.name".
+    Labels read "current=6.0,camkii.P_half=2.5e-05".
+    """
+    names = list(axes)
+    scenarios = []
+    for values in itertools.product(*(axes[name] for name in names)):
+        scenario = {"label": ",".join(f"{name}={value}" for name, value in zip(names, values)),
+                    "params": {}}
+        for name, value in zip(names, values):
+            if name == "current":
+                scenario["current"] = float(value)
+            elif name.count(".") == 1:
+                group, key = name.split(".")
+                scenario["params"].setdefault(group, {})[key] = value
+            else:
+                raise ValueError(f"Tarama ekseni 'current' veya 'grup.ad' olmalı: {name!r}")
+        scenarios.append(scenario)
+    return scenarios
+
+
+def run_key(synapse, backend="python", seed=0):
+    """
+    Hash of everything the recorded traces of a run depend on: its result
+    cache key (cache.cache_key: configuration, init, start state, drive,
+    code version, ...) plus the probes, which a pool store records alone.
+    """
+    payload = json.dumps({
+        "run": cache_key(synapse, backend, seed),
+        "probes": [(p.name, p.every, p.policy, p.unit, p.label) for p in synapse.probes],
+    }, sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _is_done(path, rows):
+    meta = os.path.join(path, "store", "meta.json")
+    if not os.path.exists(meta):
+        return False
+    store = ChunkStore.open(os.path.join(path, "store"))
+    return store.complete and store.rows == rows
+
+
+def _run_task(task):
+    """
+    Worker: run (or go on with) one run in task["path"]. Returns
+    (key, status, error message, wall time).
+    """
+    path = task["path"]
+    store, checkpoint = os.path.join(path, "store"), os.path.join(path, "checkpoint.npz")
+    start = time.time()
+    try:
+        if not os.path.exists(checkpoint) and task["prefix"] is not None:
+            # Forked scenario: start from the prefix (the checkpoint goes last, it marks the copy done)
+            shutil.rmtree(store, ignore_errors=True)
+            shutil.copytree(os.path.join(task["prefix"], "store"), store)
+            shutil.copy(os.path.join(task["prefix"], "checkpoint.npz"), checkpoint + ".tmp")
+            os.replace(checkpoint + ".tmp", checkpoint)
+        resume = checkpoint if os.path.exists(checkpoint) else None
+        synapse = TripartiteSynapse(**task["arguments"])
+        synapse.run(backend=task["backend"], seed=task["seed"], stream=store,
+                    checkpoint=checkpoint, checkpoint_every=task["checkpoint_every"], resume=resume)
+    except Exception as exc:
+        return task["key"], "failed", f"{type(exc).__name__}: {exc}", time.time() - start
+    return task["key"], "done", None, time.time() - start
+
+
+def _run_tasks(tasks, processes, on_done):
+    if not tasks:
+        return
+    if processes == 1 or len(tasks) == 1:
+        for task in tasks:
+            on_done(*_run_task(task))
+        return
+    pool = multiprocessing.Pool(min(processes, len(tasks)))
+    try:
+        for outcome in pool.imap_unordered(_run_task, tasks):
+            on_done(*outcome)
+        pool.close()
+    except BaseException:
+        # Ctrl-C or a failing callback: workers stop too; their checkpoints stay for the next call
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+def run_pool(scenarios, workdir, processes=None, params=None, fork=True, backend="python",
+             seed=0, checkpoint_every=None, on_result=None, verbose=False, **kwargs):
+    """
+    Run every scenario (see scenario_arguments; other TripartiteSynapse
+    arguments in kwargs) on a pool of processes (None: one per CPU) and
+    return {label: SimulationResult} read back from the stores in workdir.
+
+    fork:  run shared prefixes once (see run_sweep).
+    seed:  seed of every run; cached results must be reproducible, so
+           there is no unseeded mode.
+    checkpoint_every: simulated ms between the checkpoints a crashed or
+           interrupted run resumes from (None: only at the end).
+    on_result: on_result(label, store path), called here when a
+           scenario's run is complete (at once for runs found done).
+    Runs that fail are recorded in the manifest and reported together in
+    a RuntimeError after the others have finished.
+    """
+    arguments = scenario_arguments(scenarios, params, **kwargs)
+    synapses = [TripartiteSynapse(**a) for a in arguments]
+    labels = _labels(scenarios)
+    keys = [run_key(synapse, backend, seed) for synapse in synapses]
+    runs_dir = os.path.join(workdir, "runs")
+    os.makedirs(runs_dir, exist_ok=True)
+
+    def task(key, args, prefix=None):
+        return {"key": key, "path": os.path.join(runs_dir, key), "arguments": args,
+                "backend": backend, "seed": seed, "checkpoint_every": checkpoint_every,
+                "prefix": prefix}
+
+    def rows(synapse):
+        return (synapse.steps + synapse.rec_step - 1) // synapse.rec_step
+
+    manifest = {"runs": {label: {"key": key, "path": os.path.join("runs", key), "prefix": None,
+                                 "current": a["current"], "params": a["params"],
+                                 "status": "pending", "wall_time": None, "error": None}
+                         for label, key, a in zip(labels, keys, arguments)}}
+    prefix_tasks, tasks = [], []
+    for group, prefix_steps in _fork_groups(synapses, fork):
+        pending = [k for k in group if not _is_done(os.path.join(runs_dir, keys[k]), rows(synapses[k]))]
+        for k in set(group) - set(pending):
+            manifest["runs"][labels[k]]["status"] = "done"
+        prefix = None
+        if prefix_steps and len(pending) > 1:
+            prefix_args = {**arguments[group[0]],
+                           "T_total": (prefix_steps + 0.5) * synapses[group[0]].dt}
+            head = TripartiteSynapse(**prefix_args)
+            prefix = task(run_key(head, backend, seed), prefix_args)
+            if not _is_done(prefix["path"], rows(head)):
+                prefix_tasks.append(prefix)
+        for k in pending:
+            tasks.append(task(keys[k], arguments[k], prefix and prefix["path"]))
+            manifest["runs"][labels[k]]["prefix"] = prefix and os.path.join("runs", prefix["key"])
+    manifest_path = os.path.join(workdir, "manifest.json")
+    _replace_json(manifest_path, manifest)
+
+    by_key = {}
+    for label, entry in manifest["runs"].items():
+        by_key.setdefault(entry["key"], []).append(label)
+    failed = {}
+
+    def on_done(key, status, error, wall_time):
+        if status == "failed":
+            failed[key] = error
+        for label in by_key.get(key, ()):
+            manifest["runs"][label].update({"status": status, "wall_time": wall_time, "error": error})
+            if verbose:
+                print(f">>> {label}: {'tamamlandı' if status == 'done' else 'HATA: ' + error} "
+                      f"({wall_time:.1f} s)")
+        _replace_json(manifest_path, manifest)
+        if status == "done" and on_result is not None:
+            for label in by_key.get(key, ()):
+                on_result(label, os.path.join(runs_dir, key, "store"))
+
+    if verbose:
+        print(f">>> {len(tasks)} koşu ({len(prefix_tasks)} ortak ön koşu), "
+              f"{len(labels) - len(tasks)} önbellekte.")
+    if on_result is not None:
+        for label, entry in manifest["runs"].items():
+            if entry["status"] == "done":
+                on_result(label, os.path.join(workdir, entry["path"], "store"))
+    _run_tasks(prefix_tasks, processes or os.cpu_count(), on_done)
+    # Scenarios of a failed prefix cannot start
+    for t in tasks:
+        if t["prefix"] is not None and os.path.basename(t["prefix"]) in failed:
+            on_done(t["key"], "failed", f"ortak ön koşu: {failed[os.path.basename(t['prefix'])]}", 0.0)
+    tasks = [t for t in tasks if t["key"] not in failed]
+    _run_tasks(tasks, processes or os.cpu_count(), on_done)
+
+    failed_labels = [label for label, entry in manifest["runs"].items() if entry["status"] != "done"]
+    if failed_labels:
+        raise RuntimeError(f"Başarısız koşular: {failed_labels} (ayrıntılar: {manifest_path})")
+    return {label: SimulationResult(None, ChunkStore.open(os.path.join(workdir, entry["path"], "store")).traces(),
+                                    wall_time=entry["wall_time"] or 0.0)
+            for label, entry in manifest["runs"].items()}
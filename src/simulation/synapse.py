@@ -0,0 +1,733 @@
+import time
+
+import numpy as np
+
+from parameters.pre_synaptic_params import PRE_SYNAPTIC_PARAMS
+from parameters.ca_params import CA_PARAMS
+from parameters.glutamate_params import GLUTAMATE_PARAMS
+from parameters.astrocyte_params import ASTROCYTE_PARAMS
+from parameters.gliatransmitter_params import GLIATRANSMITTER_PARAMS
+from parameters.post_synaptic_params import POST_SYNAPTIC_PARAMS
+from parameters.post_synaptic_ca_params import POST_SYNAPTIC_CA_PARAMS
+from parameters.camkii_params import CAMKII_PARAMS
+from parameters.frozen import FrozenParams
+
+from models.hh import PresynapticHH
+from models.calcium_model import PresynapticCalciumDynamics
+from models.presynaptic_glutamate import GlutamateDynamics
+from models.astrocyte import AstrocyteDynamics
+from models.gliatransmitter import GliatransmitterDynamics
+from models.post_synaptic import PostSynapticDynamics
+from models.post_synaptic_ca import PostSynapticCalciumDynamics
+from models.camkii import CaMKIIDynamics
+
+from models.rate_tables import TABLE_KINDS, attach_rate_tables
+from simulation.recorder import Recorder, make_probes
+from simulation.stimulus import Schedule, default_protocols, protocol_current
+from simulation import state as state_layout
+
+
+# ==============================================================================
+# Default parameter sets, keyed by the name of their parameter module
+# (read-only, parameters.frozen; runs derive their own copy).
+# ==============================================================================
+DEFAULT_PARAMS = FrozenParams({
+    "pre_synaptic": PRE_SYNAPTIC_PARAMS,
+    "ca": CA_PARAMS,
+    "glutamate": GLUTAMATE_PARAMS,
+    "astrocyte": ASTROCYTE_PARAMS,
+    "gliatransmitter": GLIATRANSMITTER_PARAMS,
+    "post_synaptic": POST_SYNAPTIC_PARAMS,
+    "post_synaptic_ca": POST_SYNAPTIC_CA_PARAMS,
+    "camkii": CAMKII_PARAMS,
+})
+
+
+# Recorded by default (quantity names of simulation.recorder.QUANTITIES)
+DEFAULT_RECORD = ("V_pre", "Ca_fast", "Glu_syn", "Ca_astro", "IP3_astro",
+                  "Glu_extra", "V_post", "Ca_post", "CaMKII_P", "alpha")
+
+
+# Slow subsystems that may be stepped with their own (larger) dt:
+#   "ca_er"  : ER/IP3 part of PresynapticCalciumDynamics (step_slow)
+#   "astro"  : AstrocyteDynamics
+#   "camkii" : CaMKIIDynamics (+ alpha modulation)
+# Their fast inputs are averaged over each slow step.
+SLOW_SUBSYSTEMS = ("ca_er", "astro", "camkii")
+
+# Step sizes (ms) that stay close to the dt = 0.05 ms reference on the 30 s
+# protocol (forward Euler). c_slow still has a ~ms SERCA transient, so ca_er
+# is kept well below its ~1.3 ms stability limit. Peak deviation: a few %
+# during transients, CaMKII_P / alpha within 1e-3 at the end of the run.
+MULTIRATE_SLOW_DT = {"ca_er": 0.5, "astro": 5.0, "camkii": 10.0}
+
+# Gate update schemes for the dx/dt = a(1-x) - bx variables (HH m/h/n, m_Ca,
+# q, h_a, O1..O3, m_AMPA):
+#   "euler"       : forward Euler + clipping (reference)
+#   "exponential" : Rush–Larsen, exact for rates frozen over the step
+#                   (models.gating); no clipping, stays in [0, 1] at any dt.
+#                   The HH voltage likewise relaxes exactly for the frozen
+#                   conductances, which keeps spike shape at dt = 0.2 ms.
+GATE_METHODS = ("euler", "exponential")
+
+# Initial conditions:
+#   "default" : hard-coded initial values of each model (start-up transient)
+#   "rest"    : rest point of the undriven coupled system, cached on disk per
+#               parameter set (simulation.steady_state); no warm-up or
+#               glutamate muting needed.
+INIT_METHODS = ("default", "rest")
+
+# Rate function evaluation (HH gate rates, VGCC m_inf, spontaneous release,
+# the fractional Hill terms of IP3 production):
+#   "exact"            : closed-form expressions (reference)
+#   "linear", "cubic"  : lookup tables with interpolation (models.rate_tables)
+#                        built from each model's RATE_TABLES, exact outside
+#                        the table range. rhs() sees the tables too;
+#                        jacobian() and the numba backend stay exact.
+RATE_METHODS = ("exact",) + tuple(TABLE_KINDS)
+
+# CaMKII P0..P10 chain updates (see CaMKIIDynamics.CHAIN_UPDATES):
+#   "euler", "implicit" (backward Euler) or "exact" (matrix exponential) for
+#   the Ca level frozen over a CaMKII step; the last two stay stable and
+#   mass-conserving at the multi-rate step sizes (slow_dt["camkii"]).
+CAMKII_METHODS = CaMKIIDynamics.CHAIN_UPDATES
+
+# Glutamate Ca2+ sensor s0..s5, s* updates (see GlutamateDynamics.SENSOR_UPDATES):
+#   "euler" (reference, clipped) or "exact" (cached matrix exponential per
+#   quantized alpha*c_i; mass-conserving, stable beyond 5*alpha*c*dt = 1).
+SENSOR_METHODS = GlutamateDynamics.SENSOR_UPDATES
+
+# Models that declare RATE_TABLES
+TABLED_MODELS = ("hh", "ca_pre", "glu", "astro")
+
+# Units: every model but PresynapticHH works in SI (s, V, M, A) – state,
+# parameters and the signals passed between models – so the couplings carry
+# no conversions. HH keeps its classical mV / ms form (rate functions in
+# mV); its voltage is converted once where it enters the VGCC of ca_pre.
+# Plotting units are applied when traces are read (recorder.QUANTITIES).
+SI_MODELS = tuple(name for name, _ in state_layout.MODEL_ORDER if name != "hh")
+
+
+class SimulationResult:
+    """
+    Recorded traces of one TripartiteSynapse run.
+    time: recording time axis (ms); traces: name -> float32 array
+    (simulation.recorder.Traces, evaluated on first access; read back from
+    disk for streamed runs).
+    stats: solver counters of adaptive runs (steps, rejected, nfev, ...).
+    """
+
+    def __init__(self, time_ms, traces, wall_time=0.0, stats=None):
+        self._time = time_ms
+        self.traces = traces
+        self.wall_time = wall_time
+        self.stats = stats or {}
+
+    @property
+    def time(self):
+        """Recording time axis (ms); streamed runs build it from the store per access."""
+        return self.traces.source.time() if self._time is None else self._time
+
+    @property
+    def t_sec(self):
+        return self.time / 1000.0
+
+    def time_of(self, name):
+        """Time axis (ms) of one trace; probes with a larger every have their own."""
+        stride = getattr(self.traces, "stride", None)
+        return self.time if stride is None else self.time[::stride(name)]
+
+    def __getitem__(self, name):
+        return self.traces[name]
+
+    def __contains__(self, name):
+        return name in self.traces
+
+
+class TripartiteSynapse:
+    """
+    Tewari & Majumdar (2012) – coupled tripartite synapse.
+
+    Chains PresynapticHH -> PresynapticCalciumDynamics -> GlutamateDynamics
+    -> AstrocyteDynamics -> GliatransmitterDynamics -> PostSynapticDynamics
+    -> PostSynapticCalciumDynamics -> CaMKIIDynamics with the retrograde
+    alpha modulation closing the loop.
+
+    TIME BASE: T_total, dt and the stimulus window are in milliseconds.
+    UNITS: the models and their couplings are SI (see SI_MODELS);
+             traces come out in the plotting units of recorder.QUANTITIES.
+    current: extra injected HH current (uA/cm2), active inside stim_window.
+             stim_window=None keeps it on for the whole run.
+    params:  per-model overrides, e.g. {"camkii": {"P_half": 55e-6}}.
+             self.params is the derived read-only set (FrozenParams);
+             the alpha modulation is the state self.alpha, never
+             written into it.
+    slow_dt: optional multi-rate steps (ms) for SLOW_SUBSYSTEMS, e.g.
+             {"astro": 5.0, "camkii": 1.0}; each must be a multiple of dt.
+    gates:   "euler" or "exponential" gate updates (see GATE_METHODS).
+    init:    "default" or "rest" initial conditions (see INIT_METHODS).
+    rates:   "exact", "linear" or "cubic" rate functions (see RATE_METHODS).
+    rate_steps: optional table grid steps, e.g. {"hh.gates": 0.01} (mV);
+             defaults in each model's RATE_TABLES.
+    camkii_update: "euler", "implicit" or "exact" (see CAMKII_METHODS).
+    sensor_update: "euler" or "exact" glutamate sensor (see SENSOR_METHODS).
+    stimulus: protocols of the applied HH current (simulation.stimulus),
+             replacing the default drive: the pre_synaptic pulse train plus
+             current inside stim_window.
+    record:  quantity names and/or simulation.recorder.Probe objects
+             (own sample spacing, decimation policy and unit); rec_step is
+             the recording step (simulation steps) of the channel buffer.
+    """
+
+    def __init__(self, T_total=30000.0, dt=0.05, current=0.0,
+                 stim_window=(10000.0, 20000.0), params=None,
+                 record=DEFAULT_RECORD, rec_step=20, glu_mute_ms=0.0,
+                 alpha_feedback=True, slow_dt=None, gates="euler", init="default",
+                 rates="exact", rate_steps=None, camkii_update="euler",
+                 sensor_update="euler", stimulus=None):
+        self.T_total = T_total
+        self.dt = dt
+        self.current = current
+        self.stim_window = stim_window
+        self.rec_step = rec_step
+        self.glu_mute_ms = glu_mute_ms
+        self.alpha_feedback = alpha_feedback
+
+        if gates not in GATE_METHODS:
+            raise ValueError(f"Bilinmeyen kapı yöntemi: {gates!r} (seçenekler: {', '.join(GATE_METHODS)})")
+        self.gates = gates
+
+        if init not in INIT_METHODS:
+            raise ValueError(f"Bilinmeyen başlangıç koşulu: {init!r} (seçenekler: {', '.join(INIT_METHODS)})")
+        self.init = init
+
+        if rates not in RATE_METHODS:
+            raise ValueError(f"Bilinmeyen oran yöntemi: {rates!r} (seçenekler: {', '.join(RATE_METHODS)})")
+        self.rates = rates
+
+        if camkii_update not in CAMKII_METHODS:
+            raise ValueError(f"Bilinmeyen CaMKII güncellemesi: {camkii_update!r} "
+                             f"(seçenekler: {', '.join(CAMKII_METHODS)})")
+        self.camkii_update = camkii_update
+
+        if sensor_update not in SENSOR_METHODS:
+            raise ValueError(f"Bilinmeyen sensör güncellemesi: {sensor_update!r} "
+                             f"(seçenekler: {', '.join(SENSOR_METHODS)})")
+        self.sensor_update = sensor_update
+        self.rate_steps = dict(rate_steps or {})
+        classes = dict(state_layout.MODEL_ORDER)
+        known = [f"{name}.{table}" for name in TABLED_MODELS
+                 for table in classes[name].RATE_TABLES]
+        unknown = [name for name in self.rate_steps if name not in known]
+        if unknown:
+            raise ValueError(f"Bilinmeyen oran tablosu: {unknown} (seçenekler: {', '.join(known)})")
+
+        self.probes = make_probes(record, rec_step)
+        self.record = tuple(record)
+
+        self.params = DEFAULT_PARAMS.derive(params or {})
+        if stimulus is None:
+            stimulus = default_protocols(self.params["pre_synaptic"], current, stim_window)
+        self.stimulus = tuple(stimulus)
+
+        self.slow_dt = dict(slow_dt or {})
+        unknown = [name for name in self.slow_dt if name not in SLOW_SUBSYSTEMS]
+        if unknown:
+            raise ValueError(f"Bilinmeyen yavaş alt sistem: {unknown}")
+        self.slow_every = {}
+        for name in SLOW_SUBSYSTEMS:
+            ratio = self.slow_dt.get(name, dt) / dt
+            if round(ratio) < 1 or abs(ratio - round(ratio)) > 1e-9:
+                raise ValueError(f"slow_dt['{name}'] dt'nin ({dt} ms) tam katı olmalı.")
+            self.slow_every[name] = int(round(ratio))
+
+        self.reset()
+
+    def reset(self):
+        """Rebuild all eight models at their initial conditions (see init)."""
+        p = self.params
+        self.hh = PresynapticHH(p["pre_synaptic"])
+        self.ca_pre = PresynapticCalciumDynamics(p["ca"])
+        self.glu = GlutamateDynamics(p["glutamate"])
+        self.astro = AstrocyteDynamics(p["astrocyte"])
+        self.glia = GliatransmitterDynamics(p["gliatransmitter"])
+        self.post = PostSynapticDynamics(p["post_synaptic"])
+        self.post_ca = PostSynapticCalciumDynamics(p["post_synaptic_ca"])
+        self.camkii = CaMKIIDynamics(p["camkii"])
+        for model in (self.hh, self.ca_pre, self.astro, self.glia, self.post):
+            model.exp_gates = (self.gates == "exponential")
+        self.camkii.update = self.camkii_update
+        self.glu.sensor_update = self.sensor_update
+        self.rate_tables = {}
+        self.ap_templates = None
+        self.checkpoint_requested = False
+        kind = None if self.rates == "exact" else self.rates
+        for name in TABLED_MODELS:
+            steps = {key.split(".", 1)[1]: step for key, step in self.rate_steps.items()
+                     if key.split(".", 1)[0] == name}
+            tables = attach_rate_tables(getattr(self, name), kind, steps)
+            self.rate_tables.update({f"{name}.{table}": t for table, t in tables.items()})
+
+        self.base_alpha = p["glutamate"]["alpha"]
+        self.alpha = self.base_alpha
+        self.glu_syn = 0.0    # M
+        self.glu_extra = 0.0  # M
+
+        if self.init == "rest":
+            from simulation.steady_state import rest_state
+            self.set_state(rest_state(self))
+            self._sync_outputs(0.0)
+
+    def request_checkpoint(self):
+        """Ask a running run(checkpoint=...) to save at its next chance (thread/signal safe)."""
+        self.checkpoint_requested = True
+
+    def rate_table_errors(self):
+        """Largest relative interpolation error of each rate table in use."""
+        return {name: float(np.max(table.max_error()[1]))
+                for name, table in self.rate_tables.items()}
+
+    @property
+    def steps(self):
+        return int(self.T_total / self.dt)
+
+    def stimulus_current(self, t_ms):
+        """Total applied HH current (uA/cm2) of all protocols at time t_ms."""
+        return protocol_current(self.stimulus, t_ms)
+
+    def stimulus_schedule(self):
+        """The stimulus protocols compiled on this run's dt grid."""
+        return Schedule.compile(self.stimulus, self.dt, self.steps)
+
+    # ---------------------------------------------------------------------
+    # Packed state vector API (layout: simulation.state)
+    # ---------------------------------------------------------------------
+    def get_state(self):
+        return state_layout.pack(self)
+
+    def set_state(self, y):
+        state_layout.unpack(self, y)
+
+    def rhs(self, t, y):
+        """
+        dy/dt of the coupled system in the packed layout, per millisecond.
+        t in ms; y of shape (N_STATE,) or (N_STATE, k) for vectorized
+        integrators. Pure: the model objects' own states are not touched.
+
+        Unlike run(), which steps the models one after another, all
+        couplings here are evaluated at the same instant and the R-type
+        channel count is its mean (see PostSynapticCalciumDynamics).
+        """
+        S = state_layout.SLICES
+        dydt = np.empty_like(y, dtype=np.float64)
+
+        y_hh, y_ca, y_glu = y[S["hh"]], y[S["ca_pre"]], y[S["glu"]]
+        y_astro, y_glia, y_post = y[S["astro"]], y[S["glia"]], y[S["post"]]
+        y_post_ca, y_camkii = y[S["post_ca"]], y[S["camkii"]]
+
+        glu_syn = y_glu[9] if t >= self.glu_mute_ms else 0.0 * y_glu[9]
+        glu_extra = y_glia[5]
+        if self.alpha_feedback:
+            alpha = self.base_alpha * (1.0 + self.camkii.get_alpha_modulation(y_camkii[:11]))
+        else:
+            alpha = self.base_alpha
+        I_AMPA = self.post.ampa_current(y_post)
+
+        # HH (mV, per ms)
+        self.hh.derivatives(t, y_hh, out=dydt[S["hh"]], drive=self.stimulus_current(t))
+
+        # SI (per second) models
+        self.ca_pre.derivatives(y_ca, y_hh[0] * 1e-3, glu=glu_extra, out=dydt[S["ca_pre"]])
+        self.glu.derivatives(y_glu, y_ca[0], alpha=alpha, out=dydt[S["glu"]])
+        self.astro.derivatives(y_astro, glu_syn, out=dydt[S["astro"]])
+        self.glia.derivatives(y_glia, y_astro[0], out=dydt[S["glia"]])
+        self.post.derivatives(y_post, glu_syn, out=dydt[S["post"]])
+        self.post_ca.derivatives(y_post_ca, y_post[0], I_AMPA, out=dydt[S["post_ca"]])
+        self.camkii.derivatives(y_camkii, y_post_ca[0], out=dydt[S["camkii"]])
+        for name in SI_MODELS:
+            dydt[S[name]] *= 1e-3
+        return dydt
+
+    def jacobian(self, t, y):
+        """
+        Analytic d(rhs)/dy (per ms) at a single packed state y, shape
+        (N_STATE, N_STATE). Assembled from each model's jacobian(): diagonal
+        blocks plus the input couplings, with the same time scaling and
+        mean-field R-type channels as rhs().
+        """
+        S = state_layout.SLICES
+        J = np.zeros((state_layout.N_STATE, state_layout.N_STATE))
+        at = state_layout.index
+
+        y_hh, y_ca, y_glu = y[S["hh"]], y[S["ca_pre"]], y[S["glu"]]
+        y_astro, y_glia, y_post = y[S["astro"]], y[S["glia"]], y[S["post"]]
+        y_post_ca, y_camkii = y[S["post_ca"]], y[S["camkii"]]
+
+        glu_live = t >= self.glu_mute_ms
+        glu_syn = y_glu[9] if glu_live else 0.0
+        if self.alpha_feedback:
+            alpha = self.base_alpha * (1.0 + self.camkii.get_alpha_modulation(y_camkii[:11]))
+        else:
+            alpha = self.base_alpha
+        I_AMPA = float(self.post.ampa_current(y_post))
+
+        # HH (mV, per ms)
+        J[S["hh"], S["hh"]] = self.hh.jacobian(t, y_hh)
+
+        # SI (per second) models; rows scaled to per ms below
+        J_ca, d_V, d_glu = self.ca_pre.jacobian(y_ca, y_hh[0] * 1e-3, glu=y_glia[5])
+        J[S["ca_pre"], S["ca_pre"]] = J_ca
+        J[S["ca_pre"], at("hh.V")] = d_V * 1e-3
+        J[S["ca_pre"], at("glia.G_a")] = d_glu
+
+        J_glu, d_c, d_alpha = self.glu.jacobian(y_glu, y_ca[0], alpha=alpha)
+        J[S["glu"], S["glu"]] = J_glu
+        J[S["glu"], at("ca_pre.c_fast")] = d_c
+        if self.alpha_feedback:
+            d_mod = self.base_alpha * self.camkii.alpha_modulation_slope(y_camkii[:11])
+            J[S["glu"], S["camkii"].start:S["camkii"].start + 11] = np.outer(d_alpha, d_mod)
+
+        J_astro, d_g = self.astro.jacobian(y_astro, glu_syn)
+        J[S["astro"], S["astro"]] = J_astro
+        if glu_live:
+            J[S["astro"], at("glu.g")] = d_g
+
+        J_glia, d_ca = self.glia.jacobian(y_glia, y_astro[0])
+        J[S["glia"], S["glia"]] = J_glia
+        J[S["glia"], at("astro.c_a")] = d_ca
+
+        J_post, d_g = self.post.jacobian(y_post, glu_syn)
+        J[S["post"], S["post"]] = J_post
+        if glu_live:
+            J[S["post"], at("glu.g")] = d_g
+
+        # I_AMPA = g_AMPA * m * (V - V_AMPA)
+        p_post = self.post.p
+        J_pca, d_V, d_I = self.post_ca.jacobian(y_post_ca, y_post[0], I_AMPA)
+        J[S["post_ca"], S["post_ca"]] = J_pca
+        J[S["post_ca"], at("post.V_post")] = d_V + d_I * p_post['g_AMPA'] * y_post[1]
+        J[S["post_ca"], at("post.m_AMPA")] = d_I * p_post['g_AMPA'] * (y_post[0] - p_post['V_AMPA'])
+
+        J_cam, d_c = self.camkii.jacobian(y_camkii, y_post_ca[0])
+        J[S["camkii"], S["camkii"]] = J_cam
+        J[S["camkii"], at("post_ca.c_post")] = d_c
+
+        for name in SI_MODELS:
+            J[S[name]] *= 1e-3
+        return J
+
+    def run_adaptive(self, rtol=1e-5, atol=None, max_step=np.inf, verbose=False,
+                     method="dopri5"):
+        """
+        Integrate the deterministic coupled rhs with adaptive steps
+        (simulation.adaptive); drive discontinuities are hit exactly.
+        method: "dopri5" (explicit) or "rosenbrock" (stiff, uses jacobian()).
+        atol: None, scalar, or per-variable overrides (see DEFAULT_ATOL).
+        Records on the same time grid as run().
+        """
+        from simulation.adaptive import integrate, recorded_states
+
+        start_time = time.time()
+        time_ms, Y, stats = integrate(self, method=method, rtol=rtol, atol=atol,
+                                      max_step=max_step, verbose=verbose)
+        recorder = recorded_states(self, time_ms, Y)
+        self.alpha = float(recorder.data["alpha"][-1])
+        self.glu_syn = float(recorder.data["glu_syn"][-1])
+        self.glu_extra = self.glia.G_a
+        return SimulationResult(time_ms, recorder.traces(self.params),
+                                wall_time=time.time() - start_time, stats=stats)
+
+    def run(self, verbose=False, backend="python", seed=None,
+            fast_forward=False, rest_tol=0.05, ap_templates=False, template_tol=1e-3,
+            stream=None, chunk_rows=None, checkpoint=None, checkpoint_every=None,
+            resume=None):
+        """
+        Integrate the coupled system and return a SimulationResult.
+
+        backend: "python" (reference model step() methods) or "numba"
+                 (compiled loop in simulation.kernel, same arithmetic).
+        seed:    optional seed for the stochastic R-type channel draws.
+        fast_forward: skip quiescent stretches between drive edges with
+                 large stiff steps (simulation.adaptive.fast_forward);
+                 python backend only. rest_tol: relative drift per ms
+                 below which the fast states count as settled.
+                 result.stats["fast_forward_ms"] reports the skipped time.
+        ap_templates: replay recorded spike windows of V_pre instead of
+                 integrating the HH terminal (simulation.ap_templates);
+                 python backend only. template_tol: trigger state
+                 tolerance. Templates are kept across runs until reset();
+                 result.stats["spikes_replayed"] (and _recorded, _integrated)
+                 count the spike onsets.
+        stream:  directory to stream the recording into, chunk_rows
+                 recording steps at a time (simulation.recorder.ChunkStore,
+                 default STREAM_CHUNK_ROWS); memory then stays constant
+                 over the run and ChunkStore.open(stream) reads the traces
+                 while it goes on. The result reads them back from disk.
+        checkpoint: file the run state is saved to (simulation.checkpoint)
+                 every checkpoint_every ms of simulated time (None: never),
+                 when request_checkpoint() was called, and at the end.
+                 The numba backend saves between compiled chunks only.
+        resume:  checkpoint file to go on from (same configuration; T_total
+                 may be longer): the run covers its step up to T_total,
+                 bit-identical to the uninterrupted run, and the result
+                 holds the recording steps from there. With stream, the
+                 store is cut back to the checkpoint and appended to.
+        """
+        if ap_templates and (checkpoint is not None or resume is not None):
+            raise ValueError("ap_templates checkpoint/resume ile kullanılamaz.")
+        if fast_forward and backend != "python":
+            raise ValueError("fast_forward yalnızca backend='python' ile kullanılabilir.")
+        if ap_templates and backend != "python":
+            raise ValueError("ap_templates yalnızca backend='python' ile kullanılabilir.")
+        if backend == "numba" and self.rates != "exact":
+            raise ValueError("Oran tabloları yalnızca backend='python' ile kullanılabilir.")
+        if backend == "numba" and self.camkii_update != "euler":
+            raise ValueError("camkii_update yalnızca backend='python' ile değiştirilebilir.")
+        if backend == "numba" and self.sensor_update != "euler":
+            raise ValueError("sensor_update yalnızca backend='python' ile değiştirilebilir.")
+        if backend == "numba":
+            from simulation.kernel import run_numba
+            start_time = time.time()
+            time_ms, traces = run_numba(self, seed=seed, stream=stream, chunk_rows=chunk_rows,
+                                        checkpoint=checkpoint, checkpoint_every=checkpoint_every,
+                                        resume=resume)
+            return SimulationResult(time_ms, traces, wall_time=time.time() - start_time)
+        if backend != "python":
+            raise ValueError(f"Bilinmeyen backend: {backend!r} ('python' veya 'numba')")
+        # Applied HH current: cursor over the compiled segments
+        drive = self.stimulus_schedule()
+        i = 0
+        sums = (0.0, 0.0, 0.0, 0.0)
+        if resume is not None:
+            from simulation.checkpoint import restore_checkpoint
+            i, sums = restore_checkpoint(self, resume, drive)
+        elif seed is not None:
+            np.random.seed(seed)
+
+        dt = self.dt
+        dt_sec = dt * 1e-3
+        steps = self.steps
+        rec_step = self.rec_step
+        rec_size = (steps + rec_step - 1) // rec_step
+        first_row = (i + rec_step - 1) // rec_step
+
+        drive_starts, drive_values = drive.starts.tolist(), drive.values.tolist()
+        seg = drive.segment(i) if i < steps else 0
+        mute = self.glu_mute_ms
+        alpha_feedback = self.alpha_feedback
+        base_alpha = self.base_alpha
+
+        # Bound methods / dicts (attribute lookups out of the hot loop)
+        hh_step = self.hh.step
+        ca_pre = self.ca_pre
+        ca_cytosolic = ca_pre.cytosolic_ca
+        ca_fast = ca_pre.step_fast
+        ca_slow = ca_pre.step_slow
+        astro = self.astro
+        glu_step = self.glu.step
+        astro_step = self.astro.compute_derivatives
+        glia_step = self.glia.step
+        post = self.post
+        post_step = post.step
+        post_ca_step = self.post_ca.step
+        camkii_step = self.camkii.step
+        alpha_mod = self.camkii.get_alpha_modulation
+
+        # Multi-rate: slow subsystems step every k fast steps on input means
+        k_er, k_astro, k_camkii = (self.slow_every[name] for name in SLOW_SUBSYSTEMS)
+        dt_er, dt_astro, dt_camkii = k_er * dt_sec, k_astro * dt_sec, k_camkii * dt_sec
+        sum_ci, sum_glu_extra, sum_glu_syn, sum_ca_post = sums
+
+        if stream is None:
+            recorder = Recorder(self.probes, rec_step, rec_size - first_row)
+            recorder.offset = first_row
+            time_ms = np.arange(first_row, rec_size) * (rec_step * dt)
+        else:
+            recorder = Recorder.streaming(self.probes, rec_step, stream, self.params,
+                                          rec_step * dt, chunk_rows, first_row=first_row)
+            time_ms = None
+        write = recorder.sampler(self)
+
+        # Checkpoints: tested after each recording step
+        checkpointing = checkpoint is not None
+        if checkpointing:
+            from simulation.checkpoint import save_checkpoint
+            every_steps = np.inf if checkpoint_every is None else max(int(round(checkpoint_every / dt)), 1)
+            next_checkpoint = i + every_steps
+
+            def save(step):
+                nonlocal next_checkpoint
+                if recorder.store is not None:
+                    # The store holds every recording step before the checkpoint
+                    recorder.flush((step + rec_step - 1) // rec_step - recorder.offset)
+                save_checkpoint(checkpoint, self, step, (sum_ci, sum_glu_extra, sum_glu_syn, sum_ca_post),
+                                drive)
+                self.checkpoint_requested = False
+                next_checkpoint = step + every_steps
+
+        alpha = self.alpha
+        glu_syn = self.glu_syn
+        glu_extra = self.glu_extra
+        progress = max(steps // 10, 1)
+
+        # Fast-forward: quiescence is tested on slow-step boundaries, and a
+        # skip runs up to the next drive edge (on the dt grid)
+        stats = {}
+        if fast_forward:
+            from simulation.adaptive import drive_breakpoints, is_quiescent, fast_forward as skip
+            check_every = int(np.lcm.reduce([k_er, k_astro, k_camkii, max(int(round(1.0 / dt)), 1)]))
+            edges = np.union1d(drive.starts, np.round(drive_breakpoints(self, self.T_total) / dt).astype(int))
+            min_skip = max(int(round(5.0 / dt)), 1)
+            stats = {"fast_forward_ms": 0.0, "fast_forward_spans": 0, "steps": 0,
+                     "rejected": 0, "nfev": 0, "njev": 0, "max_h": 0.0}
+
+        # AP templates: replay = (trigger, V trace, states) being pasted,
+        # record = (drive, trigger, states) being taken
+        templates = None
+        replay = record = None
+        j_tpl = 0   # next sample of the template being replayed
+        if ap_templates:
+            from simulation.ap_templates import HOLD_MS, SETTLED_TOL, APTemplates
+            if self.ap_templates is None or self.ap_templates.dt != dt:
+                self.ap_templates = APTemplates(dt)
+            templates = self.ap_templates
+            templates.tol = template_tol
+            threshold, n_tpl = templates.threshold, templates.steps
+            hold_until, n_hold = 0, max(int(round(HOLD_MS / dt)), 1)
+            stats.update({"spikes_recorded": 0, "spikes_replayed": 0, "spikes_integrated": 0})
+            hh = self.hh
+
+        start_time = time.time()
+        while i < steps:
+            if fast_forward and replay is None and record is None and i % check_every == 0:
+                i_end = min(edges[np.searchsorted(edges, i, side="right")], steps)
+                if i_end - i >= min_skip and is_quiescent(self, i * dt, self.get_state(), rest_tol):
+                    # Records of iterations j in [i, i_end) hold the state at (j + 1) * dt
+                    rec_j = np.arange(-(-i // rec_step) * rec_step, i_end, rec_step)
+                    rec_t = (rec_j + 1) * dt
+                    rec_idx = iter(rec_j // rec_step)
+
+                    def on_record(t, y_t):
+                        self.set_state(y_t)
+                        self._sync_outputs(t)
+                        write(next(rec_idx))
+
+                    y = skip(self, i * dt, i_end * dt, self.get_state(), rec_t, on_record, stats)
+                    self.set_state(y)
+                    self._sync_outputs(i_end * dt)
+                    alpha, glu_syn, glu_extra = self.alpha, self.glu_syn, self.glu_extra
+                    hold_until = 0
+                    stats["fast_forward_ms"] += (i_end - i) * dt
+                    stats["fast_forward_spans"] += 1
+                    i = i_end
+                    continue
+
+            t_ms = i * dt
+            while i >= drive_starts[seg + 1]:
+                seg += 1
+
+            # Pre-synaptic
+            if replay is not None:
+                V_pre_mV = hh.V = replay[1][j_tpl]
+                j_tpl += 1
+                if j_tpl == n_tpl:
+                    hh.set_state(replay[2][-1])
+                    replay = None
+            elif templates is None:
+                V_pre_mV = hh_step(dt, t_ms, 0.0, drive_values[seg])
+            elif i < hold_until:
+                pass   # settled: V_pre_mV unchanged
+            else:
+                V_prev, m_prev, h_prev, n_prev = hh.V, hh.m, hh.h, hh.n
+                V_pre_mV = hh_step(dt, t_ms, 0.0, drive_values[seg])
+                if record is not None:
+                    record[2].append(hh.get_state())
+                    if len(record[2]) == n_tpl:
+                        templates.store(*record)
+                        record = None
+                elif V_prev < threshold <= V_pre_mV:
+                    # Spike onset; the window must lie inside the current drive segment
+                    if i + n_tpl < drive_starts[seg + 1]:
+                        trigger = hh.get_state()
+                        replay = templates.match(drive_values[seg], trigger)
+                        if replay is not None:
+                            j_tpl = 0
+                            stats["spikes_replayed"] += 1
+                        else:
+                            record = (drive_values[seg], trigger, [])
+                            stats["spikes_recorded"] += 1
+                    else:
+                        stats["spikes_integrated"] += 1
+                elif (abs(V_pre_mV - V_prev) < SETTLED_TOL and abs(hh.m - m_prev) < SETTLED_TOL
+                      and abs(hh.h - h_prev) < SETTLED_TOL and abs(hh.n - n_prev) < SETTLED_TOL):
+                    hold_until = min(drive_starts[seg + 1], i + 1 + n_hold)
+            c_i = ca_cytosolic()
+            ca_fast(dt_sec, V_pre_mV * 1e-3, c_i)
+            sum_ci += c_i
+            sum_glu_extra += glu_extra
+            if (i + 1) % k_er == 0:
+                ca_slow(dt_er, sum_glu_extra / k_er, sum_ci / k_er)
+                sum_ci = sum_glu_extra = 0.0
+            glu_syn = glu_step(dt_sec, ca_pre.c_fast, alpha)
+            if t_ms < mute:
+                glu_syn = 0.0
+
+            # Astrocyte
+            sum_glu_syn += glu_syn
+            if (i + 1) % k_astro == 0:
+                astro_step(dt_astro, sum_glu_syn / k_astro)
+                sum_glu_syn = 0.0
+            glu_extra = glia_step(dt_sec, astro.c_a)
+
+            # Post-synaptic
+            V_post = post_step(dt_sec, glu_syn, 0.0)
+            Ca_post = post_ca_step(dt_sec, V_post, post.I_AMPA)
+
+            # LTP & retrograde signalling
+            sum_ca_post += Ca_post
+            if (i + 1) % k_camkii == 0:
+                camkii_step(dt_camkii, sum_ca_post / k_camkii)
+                sum_ca_post = 0.0
+                if alpha_feedback:
+                    alpha = base_alpha * (1.0 + alpha_mod())
+
+            if i % rec_step == 0:
+                self.alpha, self.glu_syn, self.glu_extra = alpha, glu_syn, glu_extra
+                write(i // rec_step)
+                if checkpointing and (i + 1 >= next_checkpoint or self.checkpoint_requested) and i + 1 < steps:
+                    save(i + 1)
+
+            if verbose and i % progress == 0:
+                print(f"%{(i / steps) * 100:.0f} tamamlandı. (Simülasyon Zamanı: {t_ms/1000:.1f} s)")
+            i += 1
+
+        if replay is not None:
+            # Run ended inside a replayed window
+            hh.set_state(replay[2][j_tpl - 1])
+        self.alpha, self.glu_syn, self.glu_extra = alpha, glu_syn, glu_extra
+        if checkpointing:
+            save(steps)
+        recorder.finish(rec_size)
+        if verbose and fast_forward:
+            print(f"Hızlı geçiş: {stats['fast_forward_ms']/1000:.2f} s atlandı "
+                  f"({stats['fast_forward_spans']} aralık).")
+        if verbose and self.rate_tables:
+            worst, err = max(self.rate_table_errors().items(), key=lambda item: item[1])
+            print(f"Oran tabloları ({self.rates}): en büyük bağıl hata {err:.1e} ({worst}).")
+        return SimulationResult(time_ms, recorder.traces(self.params),
+                                wall_time=time.time() - start_time, stats=stats)
+
+    def _sync_outputs(self, t_ms):
+        """
+        Derived outputs (alpha, glu_syn, glu_extra, I_AMPA, i_R) from the
+        model states, as the deterministic rhs sees them at t_ms.
+        """
+        if self.alpha_feedback:
+            self.alpha = self.base_alpha * (1.0 + self.camkii.get_alpha_modulation())
+        self.glu_syn = self.glu.g if t_ms >= self.glu_mute_ms else 0.0
+        self.glu_extra = self.glia.G_a
+        self.post.I_AMPA = self.post.ampa_current(self.post.get_state())
+        p = self.post_ca.p
+        V_post = self.post.V_post
+        self.post_ca.i_R = (p['g_R'] * p['N_R'] * p['P_open'] * (V_post - p['V_R'])
+                            if V_post > -0.030 else 0.0)
@@ -3,6 +3,19 @@ import matplotlib.pyplot as plt
 import sys
 import os
 
+# Başlangıç durumu notu: eski betik HH ve Ca modellerini parametre
+# dosyasındaki başlangıç değerlerinden (V = -70 mV, m = 0.05, h = 0.6,
+# n = 0.32) adım adım çözüyordu. Bu değerler dinlenme noktası değildir;
+# ilk darbe t = 0'da başladığı için ilk spike bu kayık durumdan açılır
+# (kapılar uyarısız yaklaşık 15 ms'de oturur). Spike çekirdeği
+# (simulation.spike_kernels) ise tek bir AP dalga biçimini tablolar ve
+# bunun için uyarısız 500 ms oturtulmuş HH dinlenme durumundan başlar;
+# her spike, ilki dahil, bu durumdan açılır. Bu yüzden ilk spike'ın
+# erken geçişi eski betiğin izinden biraz farklıdır; sonraki spike'lar
+# iki yolda da oturmuş HH durumundan başlar.
+# kernel.validate() da tam ODE'yi aynı oturmuş durumdan çözer; raporlanan
+# hata yalnızca süperpozisyonun hatasıdır.
+
 # ----------------------------------------------------------------
 # 1. ORTAM VE İMPORTLAR
 # ----------------------------------------------------------------
@@ -12,9 +25,7 @@ sys.path.append(src_path)
 
 try:
     from parameters.pre_synaptic_params import PRE_SYNAPTIC_PARAMS
-    from parameters.ca_params import CA_PARAMS
-    from models.hh import PresynapticHH
-    from models.calcium_model import PresynapticCalciumDynamics
+    from simulation.spike_kernels import ca_spike_kernel
     print("Modüller başarıyla yüklendi.")
 except ImportError as e:
     print(f"HATA: Modüller bulunamadı. Lütfen 'src' klasörünü kontrol edin.\n{e}")
@@ -32,43 +43,30 @@ def run_validation_separate():
     T_total = 60000.0  # 60 Saniye
     dt = 0.05          # Hassas çözüm
     steps = int(T_total / dt)
-    time_array = np.linspace(0, T_total, steps)
-    
-    # Modelleri Başlat
-    hh_model = PresynapticHH(PRE_SYNAPTIC_PARAMS)
-    ca_pre_model = PresynapticCalciumDynamics(CA_PARAMS)
     
+    # Tek-spike çekirdeği (HH + Ca_fast yanıtı, önbellekte)
+    kernel = ca_spike_kernel(dt=dt)
+    freq = PRE_SYNAPTIC_PARAMS.get("freq", 5.0)
+    onsets = np.arange(0.0, T_total, 1000.0 / freq)
+
     # Kayıt Dizileri
     rec_step = 20
-    rec_size = steps // rec_step
-    rec_time = time_array[::rec_step]
-    
-    rec_V_pre = np.zeros(rec_size)
-    rec_Ca_Fast_nM = np.zeros(rec_size)
-    
-    print(f"Toplam Adım: {steps} (Tahmini süre: 10-15 sn)...")
+    rec_time = np.arange(0, steps, rec_step) * dt
+
+    # Çekirdeğin tam ODE'ye karşı doğrulaması (ilk 2 s)
+    report = kernel.validate(onsets[onsets < 2000.0], 2000.0, every=rec_step)
+    print(f"Çekirdek doğrulaması (2 s): en büyük hata {report['max_abs_err_uM']:.3f} uM "
+          f"(%{report['rel_err'] * 100:.2f}), çekirdek {report['kernel_ms']:.1f} ms, "
+          f"tam ODE {report['ode_ms']:.0f} ms, örtüşen spike: {report['overlapping_spikes']}")
 
     # ----------------------------------------------------------------
-    # 3. SİMÜLASYON DÖNGÜSÜ
+    # 3. SİMÜLASYON (olay güdümlü süperpozisyon)
     # ----------------------------------------------------------------
-    for i in range(steps):
-        t_ms = time_array[i]
-        dt_sec = dt * 1e-3
-        
-        # A. Voltaj (HH) - I_inj=0.0 (Sadece bazal 5Hz)
-        V_pre_mV = hh_model.step(dt, t_ms, I_inj=0.0)
-        
-        # B. Kalsiyum (Ca_fast) - Glu=0.0 (Feedback yok)
-        V_pre_volts = V_pre_mV * 1e-3
-        ca_pre_model.step(dt_sec, V_pre_volts, glu=0.0) 
-        
-        # Kayıt
-        if i % rec_step == 0:
-            idx = i // rec_step
-            rec_V_pre[idx] = V_pre_mV
-            # Birim Dönüşümü: Molar -> nM
-            rec_Ca_Fast_nM[idx] = ca_pre_model.c_fast * 1e9 
-            
+    rec_V_pre = kernel.voltage(onsets, steps, every=rec_step)
+    c_fast, info = kernel.train(onsets, steps, every=rec_step)
+    # Birim Dönüşümü: Molar -> nM
+    rec_Ca_Fast_nM = c_fast * 1e9
+
     print("Simülasyon bitti. Grafikler oluşturuluyor...")
 
     # Zaman eksenini saniyeye çevir
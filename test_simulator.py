@@ -0,0 +1,1009 @@
+# Dosya Yolu: test_simulator.py
+
+import contextlib
+import numpy as np
+import pickle
+import sys
+import os
+
+# src klasörünü yola ekle
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from simulation.synapse import TripartiteSynapse, DEFAULT_PARAMS, MULTIRATE_SLOW_DT
+from simulation import state
+from simulation.ensemble import SynapseEnsemble
+from simulation.kernel import NUMBA_AVAILABLE
+from simulation.adaptive import atol_vector
+from simulation import steady_state
+from simulation import stimulus
+from simulation.spike_kernels import ca_spike_kernel
+from simulation.recorder import ChunkStore, Probe, Recorder
+from simulation.cache import cache_key, cached_run
+from simulation.checkpoint import config_key, load_checkpoint
+from simulation.sweep import parameter_grid, run_pool, run_sweep
+from models.hh import PresynapticHH
+from models.calcium_model import PresynapticCalciumDynamics
+from models.presynaptic_glutamate import GlutamateDynamics
+from models.astrocyte import AstrocyteDynamics
+from models.gliatransmitter import GliatransmitterDynamics
+from models.post_synaptic import PostSynapticDynamics
+from models.post_synaptic_ca import PostSynapticCalciumDynamics
+from models.camkii import CaMKIIDynamics
+
+
+# Referans döngü için Tablo 4 ve 6 değerleri, tablo birimlerinde (uM, ms):
+# simülatörün SI parametrelerinden bağımsız bir kıyas noktası.
+GLUTAMATE_TABLE = {"alpha": 0.3, "beta": 3.0, "gamma": 30.0, "delta": 8.0,
+                   "a1": 50.0, "a2": 5.0, "a3": 0.85, "tau_rec": 800.0, "tau_inac": 3.0,
+                   "n_v": 2.0, "g_v": 60000.0, "g_c": 10.0}
+GLIATRANSMITTER_TABLE = {"k1_plus": 3.75e-3, "k2_plus": 2.5e-3, "k3_plus": 1.25e-2,
+                         "k1_minus": 4e-4, "k2_minus": 1e-3, "k3_minus": 1e-3,
+                         "tau_rec_a": 800.0, "tau_inac_a": 3.0, "k_rel_a": 1.0,
+                         "C_a_thresh": 0.19669, "n_a_v": 12.0, "g_a_v": 20000.0, "g_a_c": 10.0}
+
+
+def hand_coupled_loop(T_total, dt, current, stim_window, rec_step):
+    """
+    Elle zincirlenmiş referans döngü (eski betiklerdeki kopya): glutamat ve
+    gliotransmitter modelleri tablo birimlerinde (uM, ms) koşar, sinyaller
+    modeller arasında elle çevrilir.
+    """
+    P = {name: dict(p) for name, p in DEFAULT_PARAMS.items()}
+    hh = PresynapticHH(P["pre_synaptic"])
+    # Eski döngüdeki G_a girdisi: uM -> Molar iki kez, tablodaki k_g ile
+    ca = PresynapticCalciumDynamics({**P["ca"], "k_g": 0.78e-6})
+    glu = GlutamateDynamics(dict(GLUTAMATE_TABLE))
+    astro = AstrocyteDynamics(P["astrocyte"])
+    glia = GliatransmitterDynamics(dict(GLIATRANSMITTER_TABLE))
+    post = PostSynapticDynamics(P["post_synaptic"])
+    post_ca = PostSynapticCalciumDynamics(P["post_synaptic_ca"])
+    camkii = CaMKIIDynamics(P["camkii"])
+
+    rec = {"V_pre": [], "Glu_syn": [], "Ca_post": [], "CaMKII_P": [], "alpha": []}
+    glu_extra = 0.0
+    base_alpha = GLUTAMATE_TABLE["alpha"]
+    alpha = base_alpha
+    for i in range(int(T_total / dt)):
+        t_ms = i * dt
+        dt_sec = dt * 1e-3
+        I_stim = current if stim_window[0] <= t_ms <= stim_window[1] else 0.0
+
+        V_pre = hh.step(dt, t_ms, I_stim)
+        ca.step(dt_sec, V_pre * 1e-3, glu=glu_extra * 1e-6 * 1e-6)
+        glu.p['alpha'] = alpha
+        glu_syn = glu.step(dt, ca.c_fast * 1e6)
+        Ca_astro = astro.compute_derivatives(dt_sec, glu_syn * 1e-6)
+        glu_extra = glia.step(dt, Ca_astro * 1e6)
+        V_post = post.step(dt_sec, glu_syn * 1e-6, I_soma_injected=0.0)
+        Ca_post = post_ca.step(dt_sec, V_post, post.I_AMPA)
+        camkii.step(dt_sec, Ca_post)
+        alpha = base_alpha * (1.0 + camkii.get_alpha_modulation())
+
+        if i % rec_step == 0:
+            rec["V_pre"].append(V_pre)
+            rec["Glu_syn"].append(glu_syn)
+            rec["Ca_post"].append(Ca_post * 1e6)
+            rec["CaMKII_P"].append(camkii.P[1:].sum() * P["camkii"]["e_k"] * 1e6)
+            rec["alpha"].append(alpha)
+    return {k: np.array(v, dtype=np.float32) for k, v in rec.items()}
+
+
+@contextlib.contextmanager
+def isolated_caches():
+    """
+    Dinlenme durumu (init="rest") ve sonuç önbelleklerini geçici bir
+    klasöre yönlendirir; testler geliştiricinin önbelleğine yazmaz.
+    """
+    import tempfile
+    from simulation import cache
+    saved = steady_state.REST_CACHE_DIR, cache.CACHE_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        steady_state.REST_CACHE_DIR = os.path.join(tmp, "rest_state")
+        cache.CACHE_DIR = os.path.join(tmp, "runs")
+        try:
+            yield tmp
+        finally:
+            steady_state.REST_CACHE_DIR, cache.CACHE_DIR = saved
+
+
+def test_simulator_matches_hand_coupled_loop():
+    # 2 s / 22 uA/cm2: CaMKII potansiyasyonu oluşur
+    np.random.seed(0)
+    ref = hand_coupled_loop(2000.0, 0.05, 22.0, (50.0, 1950.0), rec_step=10)
+    assert ref["Glu_syn"].max() > 1000.0 and ref["Ca_post"].max() > 100.0
+    assert ref["CaMKII_P"].max() > 1.0
+
+    np.random.seed(0)
+    synapse = TripartiteSynapse(T_total=2000.0, dt=0.05, current=22.0,
+                                stim_window=(50.0, 1950.0),
+                                record=tuple(ref), rec_step=10)
+    result = synapse.run()
+
+    # SI koşusu, kayıtta tablo birimlerine çevrilmiş haliyle referansla aynı
+    for name, trace in ref.items():
+        scale = np.max(np.abs(trace))
+        assert np.max(np.abs(result[name] - trace)) <= 1e-5 * scale, name
+    assert result.time.shape == ref["V_pre"].shape
+
+
+def test_param_overrides_do_not_mutate_defaults():
+    before = dict(DEFAULT_PARAMS["camkii"])
+    synapse = TripartiteSynapse(T_total=1.0, params={"camkii": {"P_half": 55e-6}})
+    assert synapse.camkii.p["P_half"] == 55e-6
+    assert DEFAULT_PARAMS["camkii"] == before
+
+    # Alpha modülasyonu durum değişkeni: ne modül sözlüğüne ne de koşunun kümesine yazılır
+    key = synapse.params.key
+    synapse.run()
+    assert DEFAULT_PARAMS["glutamate"]["alpha"] == 0.3e9
+    assert synapse.params.key == key
+
+    # Paylaşılan kümeler salt okunur; değişiklik türetilmiş kopyayla
+    try:
+        DEFAULT_PARAMS["camkii"]["P_half"] = 55e-6
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("modül parametreleri değiştirilememeli")
+    derived = DEFAULT_PARAMS.derive({"camkii": {"P_half": 55e-6}})
+    assert derived == synapse.params and hash(derived) == hash(synapse.params)
+    assert derived["glutamate"] is DEFAULT_PARAMS["glutamate"]
+    assert DEFAULT_PARAMS["camkii"].replace(P_half=55e-6).key == derived["camkii"].key
+    assert hash(DEFAULT_PARAMS["camkii"].replace(n_h=3)) == hash(DEFAULT_PARAMS["camkii"])
+    assert pickle.loads(pickle.dumps(derived)).key == derived.key
+
+
+def test_packed_state_roundtrip():
+    synapse = TripartiteSynapse(T_total=20.0, current=22.0, stim_window=None)
+    synapse.run()
+    y = synapse.get_state()
+    assert y.shape == (state.N_STATE,) and y.dtype == np.float64
+    assert y[state.index("hh.V")] == synapse.hh.V
+    assert y[state.index("camkii.P0")] == synapse.camkii.P[0]
+
+    fresh = TripartiteSynapse(T_total=20.0)
+    fresh.set_state(y)
+    assert np.array_equal(fresh.get_state(), y)
+
+
+def test_model_derivatives_match_euler_step():
+    # Glutamat ve Astrosit adımları yalnızca eski durumu kullanır:
+    # tek bir Euler adımı, saf türev fonksiyonuyla birebir aynı olmalı.
+    params = TripartiteSynapse(T_total=1.0).params
+    glu = GlutamateDynamics(dict(params["glutamate"]))
+    y = glu.get_state()
+    dy = glu.derivatives(y, 3e-6)
+    glu.step(0.05e-3, 3e-6)
+    assert np.array_equal(y + 0.05e-3 * dy, glu.get_state())
+
+    astro = AstrocyteDynamics(params["astrocyte"])
+    y = astro.get_state()
+    dy = astro.derivatives(y, 1e-6)
+    astro.compute_derivatives(1e-4, 1e-6)
+    assert np.allclose(y + 1e-4 * dy, astro.get_state(), rtol=1e-14, atol=0)
+
+
+def test_coupled_rhs_is_pure_and_vectorized():
+    synapse = TripartiteSynapse(T_total=1.0, current=22.0, stim_window=None)
+    y0 = synapse.get_state()
+    dy = synapse.rhs(0.0, y0)
+    assert dy.shape == y0.shape and np.all(np.isfinite(dy))
+    assert np.array_equal(synapse.get_state(), y0)
+
+    Y = np.repeat(y0[:, None], 3, axis=1)
+    dY = synapse.rhs(0.0, Y)
+    assert dY.shape == Y.shape
+    assert np.allclose(dY[:, 2], dy, rtol=1e-12, atol=0)
+
+
+def test_ensemble_members_match_scalar_runs():
+    # P_open = 0: R-tipi kanallar kapalı, sonuç RNG akışından bağımsız
+    members = [
+        {"label": "a", "current": 22.0},
+        {"label": "b", "current": 10.0, "params": {"camkii": {"P_half": 55e-6}}},
+        {"label": "c", "current": 0.0, "params": {"post_synaptic_ca": {"k_s": 50.0}}},
+    ]
+    record = ("V_pre", "Glu_syn", "Glu_extra", "V_post", "Ca_post", "alpha")
+    ensemble = SynapseEnsemble(members, T_total=300.0, stim_window=(50.0, 250.0),
+                               params={"post_synaptic_ca": {"P_open": 0.0}},
+                               record=record, rec_step=10)
+    # Farklılaşan parametre dizi, ortak olanlar skaler kalır
+    assert np.array_equal(ensemble.params["camkii"]["P_half"], [25e-6, 55e-6, 25e-6])
+    assert np.isscalar(ensemble.params["camkii"]["K1"])
+    result = ensemble.run()
+
+    for k, member in enumerate(members):
+        ref = ensemble.member_synapse(k, record=record).run()
+        for name in record:
+            assert np.array_equal(result.member(member["label"])[name], ref[name]), (k, name)
+
+
+def test_numba_backend_matches_python_backend():
+    if not NUMBA_AVAILABLE:
+        return
+    kwargs = dict(T_total=600.0, current=22.0, stim_window=(50.0, 500.0),
+                  record=("V_pre", "Ca_fast", "Glu_syn", "Ca_astro", "V_post",
+                          "Ca_post", "i_R", "CaMKII_P", "alpha"), rec_step=10)
+    reference = TripartiteSynapse(**kwargs)
+    ref = reference.run(seed=3)
+    compiled = TripartiteSynapse(**kwargs)
+    res = compiled.run(backend="numba", seed=3)
+
+    # Aynı aritmetik; yalnızca np.exp (SIMD) ile libm exp son bitte ayrışabilir
+    for name in kwargs["record"]:
+        scale = np.max(np.abs(ref[name])) + 1e-30
+        assert np.allclose(res[name], ref[name], rtol=1e-6, atol=1e-6 * scale), name
+    assert np.allclose(compiled.get_state(), reference.get_state(), rtol=1e-9, atol=0)
+
+
+def test_multirate_tracks_single_rate():
+    kwargs = dict(T_total=600.0, current=22.0, stim_window=(50.0, 500.0),
+                  record=("Ca_slow", "IP3_astro", "CaMKII_P", "alpha"), rec_step=10)
+    ref = TripartiteSynapse(**kwargs).run(seed=3)
+    synapse = TripartiteSynapse(slow_dt=MULTIRATE_SLOW_DT, **kwargs)
+    assert synapse.slow_every == {"ca_er": 10, "astro": 100, "camkii": 200}
+    res = synapse.run(seed=3)
+    # Yaklaşıklık: kısa koşuda başlangıç geçişi dahil ölçeğin %5'i içinde
+    for name in kwargs["record"]:
+        scale = np.max(np.abs(ref[name]))
+        assert np.max(np.abs(res[name] - ref[name])) <= 5e-2 * scale, name
+
+    if NUMBA_AVAILABLE:
+        compiled = TripartiteSynapse(slow_dt=MULTIRATE_SLOW_DT, **kwargs).run(backend="numba", seed=3)
+        for name in kwargs["record"]:
+            assert np.allclose(compiled[name], res[name], rtol=1e-6), name
+
+
+def test_adaptive_run_hits_drive_edges():
+    from simulation.adaptive import drive_breakpoints, atol_vector
+
+    kwargs = dict(T_total=220.0, current=22.0, stim_window=(30.0, 120.0),
+                  record=("V_pre", "Ca_fast", "CaMKII_P"), rec_step=10)
+    synapse = TripartiteSynapse(**kwargs)
+    # 5 Hz iç darbe (10 ms) + uyarı penceresi
+    assert np.allclose(drive_breakpoints(synapse, synapse.T_total),
+                       [10.0, 30.0, 120.0, 200.0, 210.0])
+    atol = atol_vector({"hh.V": 1e-2})
+    assert atol[state.index("hh.V")] == 1e-2 and atol[state.index("hh.m")] == 1e-6
+
+    result = synapse.run_adaptive(rtol=1e-5)
+    assert result["V_pre"].shape == result.time.shape
+    assert result.stats["segments"] == 6 and result.stats["steps"] > 0
+
+    reference = TripartiteSynapse(**kwargs).run_adaptive(rtol=1e-7)
+    for name in ("V_pre", "Ca_fast", "CaMKII_P"):
+        scale = np.max(np.abs(reference[name]))
+        assert np.max(np.abs(result[name] - reference[name])) <= 1e-2 * scale, name
+
+
+def test_analytic_jacobian_matches_finite_differences():
+    synapse = TripartiteSynapse(T_total=130.0, current=22.0, stim_window=None)
+    synapse.run(seed=0)
+    y = synapse.get_state()
+    # Sigmoid alpha modülasyonunun dik bölgesi
+    y[state.index("camkii.P1")], y[state.index("camkii.P3")] = 0.2, 0.11
+    # IP3 üretimindeki 0.7-Hill eğimi G_a = 0'da sonsuz: türevlenebilir bir nokta seç
+    y[state.index("glia.G_a")] = 1e-8
+    t = 5.0
+
+    J = synapse.jacobian(t, y)
+    J_fd = np.empty_like(J)
+    steps = 1e-6 * np.maximum(np.abs(y), 1e4 * atol_vector())
+    for j, h in enumerate(steps):
+        dy = np.zeros_like(y)
+        dy[j] = h
+        J_fd[:, j] = (synapse.rhs(t, y + dy) - synapse.rhs(t, y - dy)) / (2 * h)
+    row_scale = np.max(np.abs(J_fd), axis=1, keepdims=True)
+    assert np.all(np.abs(J - J_fd) <= 1e-4 * row_scale)
+    assert J[state.index("glu.s1"), state.index("camkii.P3")] != 0.0
+
+
+def test_rosenbrock_takes_large_steps_at_rest():
+    kwargs = dict(T_total=120.0, current=22.0, stim_window=(20.0, 60.0),
+                  record=("Glu_syn", "Ca_ER", "Ca_post", "CaMKII_P"), rec_step=10)
+    stiff = TripartiteSynapse(**kwargs).run_adaptive(rtol=1e-4, method="rosenbrock")
+    explicit = TripartiteSynapse(**kwargs).run_adaptive(rtol=1e-5)
+    # Kararlılık sınırı (~0.07 ms) yok: adımlar ms mertebesine çıkar
+    assert stiff.stats["max_h"] > 1.0
+    assert explicit.stats["max_h"] < 0.5 and stiff.stats["steps"] < explicit.stats["steps"]
+    for name in kwargs["record"]:
+        scale = np.max(np.abs(explicit[name]))
+        assert np.max(np.abs(stiff[name] - explicit[name])) <= 1e-2 * scale, name
+
+
+def test_exponential_gates_keep_spike_shape_at_large_dt():
+    kwargs = dict(T_total=120.0, current=22.0, stim_window=None,
+                  params={"post_synaptic_ca": {"P_open": 0.0}},
+                  record=("V_pre", "Ca_fast", "m_AMPA", "O1"))
+    ref = TripartiteSynapse(dt=0.01, rec_step=20, gates="exponential", **kwargs).run()
+    coarse = TripartiteSynapse(dt=0.2, rec_step=1, gates="exponential", **kwargs)
+    res = coarse.run()
+    # Euler aynı dt'de patlar (HH g_toplam*dt/C > 2)
+    with np.errstate(all="ignore"):
+        euler = TripartiteSynapse(dt=0.2, rec_step=1, **kwargs).run()
+    assert not np.all(np.isfinite(euler["V_pre"]))
+
+    assert abs(res["V_pre"].max() - ref["V_pre"].max()) < 1.0
+    assert abs(res["Ca_fast"].max() - ref["Ca_fast"].max()) < 0.05 * ref["Ca_fast"].max()
+    for name in ("m_AMPA", "O1"):
+        assert res[name].min() >= 0.0 and res[name].max() <= 1.0
+    y = coarse.get_state()
+    assert np.all((y[state.SLICES["hh"]][1:] >= 0) & (y[state.SLICES["hh"]][1:] <= 1))
+
+    if NUMBA_AVAILABLE:
+        compiled = TripartiteSynapse(dt=0.2, rec_step=1, gates="exponential", **kwargs)
+        comp = compiled.run(backend="numba")
+        for name in kwargs["record"]:
+            scale = np.max(np.abs(res[name])) + 1e-30
+            assert np.allclose(comp[name], res[name], rtol=1e-6, atol=1e-6 * scale), name
+
+
+def test_fast_forward_skips_quiescent_intervals():
+    kwargs = dict(T_total=600.0, current=0.0, stim_window=None,
+                  record=("V_pre", "Ca_slow", "Glu_syn", "Ca_astro", "V_post",
+                          "Ca_post", "CaMKII_P"), rec_step=20)
+    ref = TripartiteSynapse(**kwargs).run(seed=1)
+    synapse = TripartiteSynapse(**kwargs)
+    res = synapse.run(seed=1, fast_forward=True)
+    # 5 Hz iç darbeler: her döngünün ikinci yarısı sessiz
+    assert res.stats["fast_forward_spans"] == 3
+    assert res.stats["fast_forward_ms"] > 250.0
+    # Yavaş durumlar sıkı; hızlı izler bir sonraki darbede küçük faz kayması taşır
+    tolerances = {"V_pre": 1e-3, "Ca_slow": 1e-3, "Ca_astro": 1e-3,
+                  "CaMKII_P": 1e-2, "Ca_post": 3e-2, "Glu_syn": 5e-2,
+                  "V_post": 1e-1}
+    for name, rel in tolerances.items():
+        scale = np.max(np.abs(ref[name]))
+        assert np.max(np.abs(res[name] - ref[name])) <= rel * scale, name
+
+    try:
+        synapse.run(backend="numba", fast_forward=True)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("numba + fast_forward reddedilmeli")
+
+
+def test_rest_state_is_cached_fixed_point():
+    with isolated_caches():
+        rest_dir = steady_state.REST_CACHE_DIR
+        # Darbe dizisi kapalı: dinlenme noktasından hiç kıpırdamamalı
+        quiet = {"pre_synaptic": {"I_app_amp": 0.0}}
+        kwargs = dict(T_total=200.0, current=0.0, stim_window=None, params=quiet,
+                      record=("V_pre", "Ca_slow", "Glu_syn", "Ca_astro", "Glu_extra",
+                              "V_post", "Ca_post", "alpha"))
+        synapse = TripartiteSynapse(init="rest", **kwargs)
+        assert os.listdir(rest_dir) == [steady_state.rest_cache_key(synapse) + ".npy"]
+        result = synapse.run(seed=0)
+        for name in kwargs["record"]:
+            trace = result[name]
+            assert np.max(np.abs(trace - trace[0])) <= 1e-5 * max(np.max(np.abs(trace)), 1e-9), name
+
+        # İkinci kurulum önbellekten okur; darbe dizisi dinlenme noktasını değiştirmez
+        cached = TripartiteSynapse(T_total=200.0, init="rest")
+        assert len(os.listdir(rest_dir)) == 1
+        assert np.array_equal(cached.get_state(), TripartiteSynapse(init="rest", **kwargs).get_state())
+
+        # Model kaynak kodu değişince eski dinlenme durumu okunmaz
+        from simulation import cache
+        key = steady_state.rest_cache_key(synapse)
+        original = cache.code_version()
+        cache._code_version = "eski model kodu"
+        try:
+            assert steady_state.rest_cache_key(synapse) != key
+        finally:
+            cache._code_version = original
+
+    try:
+        TripartiteSynapse(T_total=1.0, init="warm")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("bilinmeyen init reddedilmeli")
+
+
+def test_rate_tables_track_exact_rates():
+    kwargs = dict(T_total=200.0, current=22.0, stim_window=None, rec_step=10,
+                  params={"post_synaptic_ca": {"P_open": 0.0}},
+                  record=("V_pre", "Ca_fast", "Glu_syn", "IP3_astro", "V_post", "Ca_post"))
+    ref = TripartiteSynapse(**kwargs).run()
+    for rates, rel_table, rel_trace in (("linear", 1e-5, 5e-3), ("cubic", 1e-7, 1e-5)):
+        synapse = TripartiteSynapse(rates=rates, **kwargs)
+        errors = synapse.rate_table_errors()
+        assert set(errors) == {"hh.gates", "ca_pre.m_inf", "ca_pre.ip3_prod",
+                               "glu.spont", "astro.plc_beta"}
+        assert max(errors.values()) < rel_table, errors
+        result = synapse.run()
+        for name in kwargs["record"]:
+            scale = np.max(np.abs(ref[name]))
+            assert np.max(np.abs(result[name] - ref[name])) <= rel_trace * scale, (rates, name)
+
+    # Tablo dışı değerler tam hesaplanır; skaler ve dizi yolu aynı
+    hh = TripartiteSynapse(T_total=1.0, rates="linear").hh
+    V = np.array([-120.0, -65.3, 0.0, 80.0])
+    tabled = np.array(hh.gates_table(V))
+    exact = np.array(hh.exact_gate_rates(V))
+    assert np.array_equal(tabled[:, [0, 3]], exact[:, [0, 3]])
+    assert np.allclose(tabled, exact, rtol=1e-5, atol=1e-9)
+    assert np.allclose(hh.gates_table(-65.3), tabled[:, 1], rtol=1e-12, atol=0)
+
+    # Topluluk aynı tabloları kullanır
+    members = [{"label": "a", "current": 22.0}, {"label": "b", "current": 10.0}]
+    ensemble = SynapseEnsemble(members, rates="cubic", **{k: v for k, v in kwargs.items() if k != "current"})
+    assert set(ensemble.rate_tables) == set(errors)
+    result = ensemble.run()
+    for k, member in enumerate(members):
+        scalar = ensemble.member_synapse(k, record=kwargs["record"]).run()
+        for name in kwargs["record"]:
+            assert np.array_equal(result.member(member["label"])[name], scalar[name]), (k, name)
+
+    for bad in (dict(rates="spline"), dict(rates="linear", rate_steps={"hh.V": 0.1})):
+        try:
+            TripartiteSynapse(T_total=1.0, **bad)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{bad} reddedilmeli")
+
+
+def test_camkii_chain_updates():
+    camkii = CaMKIIDynamics(DEFAULT_PARAMS["camkii"])
+    rng = np.random.default_rng(0)
+    P = rng.random((11, 4))
+    P /= P.sum(axis=0)
+    k0, v_a, v_d = camkii.chain_rates(np.array([0.1e-6, 1e-6, 5e-6, 20e-6]), P, np.full(4, 0.1e-6))
+
+    # Bant çekirdeği = M @ P (skaler ve toplu)
+    M = camkii.chain_matrix(k0, v_a, v_d)
+    assert np.allclose(camkii.chain_derivative(P, k0, v_a, v_d), np.einsum("kij,jk->ik", M, P),
+                       rtol=1e-12, atol=1e-18)
+    assert np.allclose(camkii.chain_derivative(P[:, 2].copy(), k0[2], v_a[2], v_d[2]),
+                       camkii.chain_matrix(k0[2], v_a[2], v_d[2]) @ P[:, 2], rtol=1e-12, atol=1e-18)
+    assert np.allclose(M.sum(axis=1), 0.0, atol=1e-15)
+
+    # Sabit Ca için tam çözüm: küçük adımlı Euler ile aynı
+    dt = 20.0
+    exact = camkii.chain_propagate(P, k0, v_a, v_d, dt, "exact")
+    fine = P.copy()
+    for _ in range(4000):
+        fine += (dt / 4000) * np.einsum("kij,jk->ik", M, fine)
+    assert np.allclose(exact, fine, rtol=1e-3, atol=1e-6)
+
+    # Çok büyük adım: negatif yok, kütle korunur, denge dağılımı (M P = 0)
+    for method in ("implicit", "exact"):
+        P_inf = camkii.chain_propagate(P, k0, v_a, v_d, 1e12, method)
+        assert np.all(P_inf >= 0) and np.allclose(P_inf.sum(axis=0), 1.0, atol=1e-12)
+        assert np.allclose(np.einsum("kij,jk->ik", M, P_inf), 0.0, atol=1e-6 * np.abs(M).max())
+
+    # Topluluk toplu (batched) çözümü skaler adımla aynı
+    members = [{"label": "a", "current": 22.0}, {"label": "b", "current": 10.0}]
+    ensemble = SynapseEnsemble(members, T_total=100.0, stim_window=None,
+                               params={"post_synaptic_ca": {"P_open": 0.0}},
+                               record=("CaMKII_P", "alpha"), camkii_update="exact")
+    result = ensemble.run()
+    for k, member in enumerate(members):
+        scalar = ensemble.member_synapse(k, record=("CaMKII_P", "alpha")).run()
+        assert np.allclose(result.member(member["label"])["CaMKII_P"], scalar["CaMKII_P"], rtol=1e-6)
+
+
+def test_glutamate_sensor_exact_update():
+    glu = GlutamateDynamics(DEFAULT_PARAMS["glutamate"])
+    k = glu.p["alpha"] * 20e-6   # c_i = 20 uM
+
+    # Üreteç: sütun toplamları sıfır, derivatives() ile aynı akılar
+    S = glu.sensor_matrix(k)
+    assert np.allclose(S.sum(axis=0), 0.0, atol=1e-9)   # per s
+    y = glu.get_state()
+    assert np.allclose(S @ y[:7], glu.derivatives(y, 20e-6)[:7], rtol=1e-12, atol=1e-9)
+
+    # Sabit Ca için tam çözüm: küçük adımlı Euler ile aynı (kuantalama payı içinde)
+    s_exact = glu.sensor_propagate(y[:7], k, 1e-3)
+    fine = y[:7].copy()
+    for _ in range(20000):
+        fine += (1e-3 / 20000) * (S @ fine)
+    assert np.allclose(s_exact, fine, atol=1e-3)
+
+    # 5*alpha*c*dt = 15 >> 1: Euler kararsız, tam güncelleme kütleyi korur
+    c_i, dt = 50e-6, 0.2e-3
+    for update in GlutamateDynamics.SENSOR_UPDATES:
+        model = GlutamateDynamics(DEFAULT_PARAMS["glutamate"])
+        model.sensor_update = update
+        for _ in range(200):
+            model.step(dt, c_i)
+        if update == "exact":
+            assert np.all(model.s >= 0) and abs(model.s.sum() - 1.0) < 1e-12
+        else:
+            assert abs(model.s.sum() - 1.0) > 1e-2
+    assert len(model._sensor_cache) == 1
+
+    with isolated_caches():
+        # Topluluk toplu çözümü skaler adımla aynı
+        members = [{"label": "a", "current": 22.0}, {"label": "b", "current": 10.0}]
+        ensemble = SynapseEnsemble(members, T_total=50.0, stim_window=None, init="rest",
+                                   gates="exponential", record=("Glu_syn",), sensor_update="exact")
+        result = ensemble.run()
+        for k, member in enumerate(members):
+            scalar = ensemble.member_synapse(k, record=("Glu_syn",)).run()
+            assert np.allclose(result.member(member["label"])["Glu_syn"], scalar["Glu_syn"], rtol=1e-6, atol=1e-9)
+
+
+def test_compiled_stimulus_schedule():
+    dt, steps = 0.05, 8000
+    synapse = TripartiteSynapse(T_total=steps * dt, dt=dt, current=22.0, stim_window=(50.0, 250.0))
+
+    # Derlenmiş program = adım başına eski hesap (HH darbe dizisi + pencere)
+    drive = synapse.stimulus_schedule()
+    reference = np.array([synapse.hh.get_applied_current(i * dt) + (22.0 if 50.0 <= i * dt <= 250.0 else 0.0)
+                          for i in range(steps)])
+    assert np.array_equal(drive.dense(), reference)
+    assert len(drive.values) < 20 and drive.starts[-1] == steps
+    assert drive.at(int(round(200.0 / dt))) == 32.0
+
+    # Sürekli zaman değeri ve kenarlar (adaptif integratörün olayları)
+    points = stimulus.protocol_edges(synapse.stimulus, steps * dt)
+    assert {10.0, 50.0, 200.0, 210.0, 250.0} <= set(points.tolist())
+    assert synapse.stimulus_current(205.0) == 32.0 and synapse.stimulus_current(230.0) == 22.0
+
+    # Theta-burst, Poisson ve kullanıcı dizisi: örnekler kenarlar arasında sabit
+    protocols = (stimulus.theta_burst(15.0, start=20.0, n_bursts=3),
+                 stimulus.poisson_train(5.0, rate=50.0, width=1.0, t_on=0.0, t_off=300.0, seed=1),
+                 stimulus.Waveform([0.0, 3.0, 3.0, -1.0], dt=25.0, t0=100.0))
+    points = stimulus.protocol_edges(protocols, 400.0)
+    mids = (np.concatenate([[0.0], points]) + np.concatenate([points, [400.0]])) / 2
+    for a, b, mid in zip(np.concatenate([[0.0], points]), np.concatenate([points, [400.0]]), mids):
+        t = np.linspace(a, b, 7)[1:-1]
+        assert np.all(stimulus.protocol_current(protocols, t) == stimulus.protocol_current(protocols, mid))
+    assert stimulus.protocol_current(protocols, 21.0) == 15.0     # ilk patlamanın ilk darbesi
+    assert stimulus.protocol_current(protocols[2:], 180.0) == -1.0
+
+    # Özel programla çalıştırma: aynı akımı veren dizi aynı izleri üretir
+    kwargs = dict(T_total=300.0, dt=dt, record=("V_pre", "Glu_syn"), rec_step=10)
+    base = TripartiteSynapse(current=22.0, stim_window=(50.0, 250.0), **kwargs).run()
+    custom = TripartiteSynapse(stimulus=[stimulus.Waveform(reference[:6000], dt=dt, t0=-dt / 2)], **kwargs).run()
+    for name in ("V_pre", "Glu_syn"):
+        assert np.array_equal(base[name], custom[name])
+
+    # Topluluk: üye başına program
+    members = [{"label": "tonik", "current": 22.0},
+               {"label": "theta", "stimulus": [stimulus.theta_burst(15.0, start=20.0, n_bursts=2)]}]
+    ensemble = SynapseEnsemble(members, T_total=150.0, stim_window=(50.0, 100.0), record=("V_pre",))
+    result = ensemble.run()
+    for k, member in enumerate(members):
+        scalar = ensemble.member_synapse(k, record=("V_pre",)).run()
+        assert np.array_equal(result.member(member["label"])["V_pre"], scalar["V_pre"])
+
+
+def test_ap_templates_replay_spikes():
+    with isolated_caches():
+        kwargs = dict(T_total=650.0, current=0.0, stim_window=None, init="rest", rec_step=1,
+                      record=("V_pre", "Ca_fast", "Glu_syn"))
+        reference = TripartiteSynapse(**kwargs).run(seed=3)
+        synapse = TripartiteSynapse(**kwargs)
+        result = synapse.run(seed=3, ap_templates=True)
+
+        # İlk darbe kaydedilir, sonrakiler şablondan yapıştırılır
+        assert result.stats["spikes_recorded"] == 1 and result.stats["spikes_replayed"] == 3
+        for name, tol in (("V_pre", 1e-3), ("Ca_fast", 1e-4), ("Glu_syn", 1e-4)):
+            scale = np.max(np.abs(reference[name]))
+            assert np.max(np.abs(result[name] - reference[name])) <= tol * scale, name
+
+        # Şablonlar çalıştırmalar arasında saklanır; HH durumu şablon sonunda geri yüklenir
+        again = synapse.run(seed=3, ap_templates=True)
+        assert again.stats["spikes_recorded"] == 0 and again.stats["spikes_replayed"] == 4
+        assert abs(synapse.hh.V - TripartiteSynapse(**kwargs).hh.V) < 1.0
+
+        # Eşik altı genlik: spike yok, şablon kullanılmaz
+        quiet = TripartiteSynapse(**{**kwargs, "params": {"pre_synaptic": {"I_app_amp": 1.0}}})
+        stats = quiet.run(seed=3, ap_templates=True).stats
+        assert stats["spikes_recorded"] == stats["spikes_replayed"] == 0
+
+        # Sabit eşik üstü akım (tonik ateşleme): terminal hiçbir dönüm noktasında
+        # tutulmaz, bölüm boyunca integre edilen izle aynı kalır
+        tonic = dict(kwargs, T_total=600.0, current=12.0, params={"pre_synaptic": {"I_app_amp": 0.0}})
+        reference = TripartiteSynapse(**tonic).run(seed=3)
+        result = TripartiteSynapse(**tonic).run(seed=3, ap_templates=True)
+        V = reference["V_pre"]
+        assert np.sum((V[:-1] < -50.0) & (V[1:] >= -50.0)) > 40
+        for name in tonic["record"]:
+            scale = np.max(np.abs(reference[name]))
+            assert np.max(np.abs(result[name] - reference[name])) <= 1e-3 * scale, name
+
+
+def test_ca_spike_kernel_matches_ode():
+    kernel = ca_spike_kernel(dt=0.05)
+    # Aynı parametrelerle ikinci çağrı önbellekteki çekirdeği döndürür
+    assert ca_spike_kernel(dt=0.05) is kernel
+
+    # c_slow sabitken pencere tablosu step_fast ile birebir aynıdır
+    ca = PresynapticCalciumDynamics(DEFAULT_PARAMS["ca"])
+    ca.c_fast, ca.c_slow = 0.0, kernel.c_slow
+    ca.m_Ca = ca.vgcc_m_inf(kernel.hh_rest[0] * 1e-3)
+    trace = []
+    for V in kernel.V:
+        ca.step_fast(kernel.dt * 1e-3, V * 1e-3, max(ca.c_fast + ca.c_slow, 1e-9))
+        trace.append(ca.c_fast)
+    assert np.max(np.abs(np.array(trace) - kernel.table[0])) < 1e-15
+
+    # 5 Hz dizisi: tam ODE'ye karşı %3 içinde, örtüşen spike yok, daha hızlı
+    report = kernel.validate(np.arange(0.0, 1000.0, 200.0), 1000.0)
+    assert report["spikes"] == 5 and report["overlapping_spikes"] == 0
+    assert report["rel_err"] < 3e-2
+    assert report["kernel_ms"] < report["ode_ms"]
+
+
+def test_declarative_recorder_probes():
+    record = ("Ca_post", "CaMKII_P",
+              Probe("Ca_post", every=100, policy="max", label="Ca_post_max"),
+              Probe("Ca_post", every=100, policy="mean", label="Ca_post_mean"),
+              Probe("Ca_fast", unit="nM"))
+    kwargs = dict(T_total=300.0, current=22.0, stim_window=(50.0, 250.0),
+                  params={"post_synaptic_ca": {"P_open": 0.0}}, rec_step=10)
+    synapse = TripartiteSynapse(record=record, **kwargs)
+    result = synapse.run()
+    ref = TripartiteSynapse(record=("Ca_post", "Ca_fast", "CaMKII_P"), **kwargs).run()
+
+    # Tampon yalnızca gereken kanalları tutar; izler ilk erişimde hesaplanır
+    recorder = result.traces.source
+    assert recorder.channels == ("ca_pre.c_fast", "post_ca.c_post") + tuple(f"camkii.P{k}" for k in range(1, 11))
+    assert np.array_equal(recorder.data["post_ca.c_post"], recorder.buffer[:, 1])
+    assert not result.traces._cache
+
+    # Seyreltme: 10 kayıt adımlık bloklar, son blok eksik
+    full = ref["Ca_post"].astype(np.float64)
+    blocks = [full[k:k + 10] for k in range(0, len(full), 10)]
+    assert len(result["Ca_post_max"]) == len(blocks) == len(result.time_of("Ca_post_max"))
+    assert np.array_equal(result["Ca_post_max"], np.float32([b.max() for b in blocks]))
+    assert np.allclose(result["Ca_post_mean"], [b.mean() for b in blocks], rtol=1e-6)
+    assert np.array_equal(result.time_of("Ca_post_max"), result.time[::10])
+    assert np.array_equal(result["Ca_post"], ref["Ca_post"])
+    assert np.array_equal(result["CaMKII_P"], ref["CaMKII_P"])
+    assert np.allclose(result["Ca_fast"], ref["Ca_fast"] * 1e3, rtol=1e-6)
+
+    for bad in (Probe("Ca_post", every=15), "Ca_nowhere"):
+        try:
+            TripartiteSynapse(record=(bad,), **kwargs)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(bad)
+    try:
+        Probe("Ca_post", unit="mV")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("birim")
+
+
+def test_models_run_in_si_units():
+    record = ("Glu_syn", "G_a", "alpha", Probe("alpha", unit="1/(M*s)", label="alpha_si"))
+    synapse = TripartiteSynapse(T_total=60.0, current=22.0, stim_window=None, record=record)
+    result = synapse.run()
+
+    # Kanallar SI (M, 1/(M*s)) tutar; çizim birimine yalnızca okurken çevrilir
+    raw = result.traces.source.data
+    assert np.allclose(result["Glu_syn"], raw["glu_syn"] * 1e6, rtol=1e-6)
+    assert np.allclose(result["G_a"], raw["glia.G_a"] * 1e6, rtol=1e-6)
+    assert np.allclose(raw["alpha"], synapse.params["glutamate"]["alpha"], rtol=1e-6)
+    assert np.allclose(result["alpha"], 0.3, rtol=1e-6)
+    assert np.allclose(result["alpha_si"], 0.3e9, rtol=1e-6)
+
+    # Eşik üstü astrosit Ca'sında salınım: SI model tablo birimlerindekiyle aynı
+    si = GliatransmitterDynamics(DEFAULT_PARAMS["gliatransmitter"])
+    table = GliatransmitterDynamics(dict(GLIATRANSMITTER_TABLE))
+    for _ in range(20000):
+        G_a = si.step(0.05e-3, 0.5e-6)
+        G_a_table = table.step(0.05, 0.5)
+    assert table.R_a < 0.01 and G_a_table > 10.0
+    assert np.allclose(si.get_state()[:5], table.get_state()[:5], rtol=1e-9)
+    assert np.isclose(G_a * 1e6, G_a_table, rtol=1e-9)
+
+    # Ca modeli birim tahmin etmez: V_pre volt, glu Molar
+    ca = PresynapticCalciumDynamics(DEFAULT_PARAMS["ca"])
+    c_rest = ca.step(0.05e-3, -65e-3)
+    assert 0.0 < c_rest < 1e-6
+
+
+def test_streamed_recording_matches_memory():
+    import tempfile
+    record = ("V_pre", "Ca_fast", "CaMKII_P", Probe("Ca_post", every=50, policy="max", label="peak"))
+    kwargs = dict(T_total=300.0, current=22.0, stim_window=(50.0, 250.0),
+                  params={"post_synaptic_ca": {"P_open": 0.0}}, record=record, rec_step=10)
+    ref = TripartiteSynapse(**kwargs).run()
+    backends = ("python", "numba") if NUMBA_AVAILABLE else ("python",)
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in backends:
+            path = os.path.join(tmp, backend)
+            synapse = TripartiteSynapse(**kwargs)
+            result = synapse.run(backend=backend, stream=path, chunk_rows=64)
+
+            # 600 kayıt adımı -> 64'lük 10 parça (sonuncusu eksik), bellekte tek parça
+            store = ChunkStore.open(path)
+            assert store.complete and store.rows == 600 and store.meta["chunks"] == 10
+            assert sorted(os.listdir(path))[-1] == "meta.json"
+            assert np.array_equal(result.time, ref.time)
+            for name in result.traces:
+                if backend == "python":
+                    assert np.array_equal(result[name], ref[name]), name
+                else:
+                    scale = np.max(np.abs(ref[name])) + 1e-30
+                    assert np.allclose(result[name], ref[name], rtol=1e-6, atol=1e-6 * scale), name
+                assert np.array_equal(store.traces()[name], result[name]), name
+
+        # Koşu sürerken: yalnızca tamamlanmış parçalar görünür
+        synapse = TripartiteSynapse(**kwargs)
+        recorder = Recorder.streaming(synapse.probes, 10, os.path.join(tmp, "live"),
+                                      synapse.params, 0.5, chunk_rows=64)
+        write = recorder.sampler(synapse)
+        for row in range(100):
+            write(row)
+        live = ChunkStore.open(os.path.join(tmp, "live"))
+        assert not live.complete and live.rows == 64 and len(live.traces()["V_pre"]) == 64
+
+
+def test_checkpoint_resume_is_bit_identical():
+    import shutil
+    import tempfile
+    record = ("V_pre", "Ca_fast", "Ca_post", "i_R", "CaMKII_P", "alpha")
+    kwargs = dict(T_total=400.0, current=22.0, stim_window=(50.0, 350.0), record=record, rec_step=10)
+    ref = TripartiteSynapse(**kwargs).run(seed=3)
+    with tempfile.TemporaryDirectory() as tmp:
+        ckpt = os.path.join(tmp, "run.npz")
+
+        # Çökme: 300 ms'de hata; son periyodik checkpoint 5601. adımda (R-tipi RNG dahil)
+        crashing = TripartiteSynapse(**kwargs)
+        post_ca_step, calls = crashing.post_ca.step, [0]
+
+        def step(*args):
+            calls[0] += 1
+            if calls[0] > 6000:
+                raise RuntimeError("çökme")
+            return post_ca_step(*args)
+
+        crashing.post_ca.step = step
+        try:
+            crashing.run(seed=3, checkpoint=ckpt, checkpoint_every=40.0)
+        except RuntimeError:
+            pass
+        resumed = TripartiteSynapse(**kwargs).run(resume=ckpt)
+        assert resumed.time[0] == 280.5
+        for name in record:
+            assert np.array_equal(resumed[name], ref[name][561:]), name
+
+        # Uzatma: 250 ms'lik koşu + 150 ms, akış deposu kaldığı yerden sürer
+        store = os.path.join(tmp, "stream")
+        short = TripartiteSynapse(**{**kwargs, "T_total": 250.0})
+        short.run(seed=3, checkpoint=ckpt, stream=store, chunk_rows=7)
+        shutil.copy(ckpt, ckpt + ".250")
+        TripartiteSynapse(**kwargs).run(resume=ckpt, stream=store, chunk_rows=7)
+        # Aynı checkpoint'ten ikinci kez: depo 500 satıra geri kesilir
+        again = TripartiteSynapse(**kwargs).run(resume=ckpt + ".250", stream=store, chunk_rows=7)
+        assert ChunkStore.open(store).rows == 800
+        for name in record:
+            assert np.array_equal(again[name], ref[name]), name
+
+        # Farklı yapılandırma reddedilir
+        try:
+            TripartiteSynapse(**{**kwargs, "params": {"camkii": {"P_half": 55e-6}}}).run(resume=ckpt)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("farklı parametrelerle devam reddedilmeli")
+
+        if NUMBA_AVAILABLE:
+            compiled_ref = TripartiteSynapse(**kwargs).run(backend="numba", seed=3)
+            TripartiteSynapse(**{**kwargs, "T_total": 250.0}).run(backend="numba", seed=3, checkpoint=ckpt)
+            compiled = TripartiteSynapse(**kwargs).run(backend="numba", resume=ckpt)
+            for name in record:
+                assert np.array_equal(compiled[name], compiled_ref[name][500:]), name
+
+
+def test_sweep_forks_shared_prefix():
+    import tempfile
+    # Akımlar 120.3 ms'de ayrılır; "c" farklı parametreyle ayrı koşar
+    scenarios = [{"label": "a", "current": 22.0}, {"label": "b", "current": 10.0},
+                 {"label": "c", "current": 5.0, "params": {"camkii": {"P_half": 55e-6}}}]
+    record = ("V_pre", "Ca_post", "i_R", "CaMKII_P", Probe("V_post", every=30, policy="mean"))
+    kwargs = dict(T_total=300.0, stim_window=(120.3, 250.0), record=record, rec_step=10)
+    results = run_sweep(scenarios, seed=4, **kwargs)
+    assert results["a"].stats["prefix_ms"] == results["b"].stats["prefix_ms"] == 2406 * 0.05
+    assert "prefix_ms" not in results["c"].stats
+
+    # Ön koşudan ayrılan her senaryo bağımsız koşuyla bit düzeyinde aynı (R-tipi çekilişler dahil)
+    for scn in scenarios:
+        ref = TripartiteSynapse(current=scn["current"], params=scn.get("params"), **kwargs).run(seed=4)
+        result = results[scn["label"]]
+        assert np.array_equal(result.time, ref.time)
+        for name in ref.traces:
+            assert np.array_equal(result[name], ref[name]), (scn["label"], name)
+            assert np.array_equal(result.time_of(name), ref.time_of(name))
+
+    # Checkpoint adımından önce farklı uyarım reddedilir, sonrası serbest
+    with tempfile.TemporaryDirectory() as tmp:
+        ckpt = os.path.join(tmp, "prefix.npz")
+        TripartiteSynapse(**{**kwargs, "T_total": 150.0}).run(checkpoint=ckpt)
+        TripartiteSynapse(**{**kwargs, "stim_window": (200.0, 250.0), "current": 3.0}).run(resume=ckpt)
+        try:
+            TripartiteSynapse(**{**kwargs, "stim_window": (100.0, 250.0), "current": 3.0}).run(resume=ckpt)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("ön koşudan önce ayrılan uyarımla devam reddedilmeli")
+
+
+def test_pool_sweep_caches_and_resumes():
+    import json
+    import tempfile
+    scenarios = parameter_grid({"current": [22.0, 10.0], "camkii.P_half": [25e-6, 55e-6]})
+    assert [s["label"] for s in scenarios][:2] == ["current=22.0,camkii.P_half=2.5e-05",
+                                                   "current=22.0,camkii.P_half=5.5e-05"]
+    record = ("V_pre", "Ca_post", "i_R", Probe("V_post", every=30, policy="mean"))
+    kwargs = dict(T_total=300.0, stim_window=(120.3, 250.0), record=record, rec_step=10)
+    ref = run_sweep(scenarios, seed=4, **kwargs)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Çökme: iki ortak ön koşudan (120.3 ms) sonra ilk koşu 250 ms'de hata verir
+        original, calls = PostSynapticCalciumDynamics.step, [0]
+
+        def crashing_step(self, *args):
+            calls[0] += 1
+            if calls[0] == 2 * 2406 + 2594:
+                raise FloatingPointError("yapay çökme")
+            return original(self, *args)
+
+        PostSynapticCalciumDynamics.step = crashing_step
+        try:
+            run_pool(scenarios, tmp, processes=1, seed=4, checkpoint_every=100.0, **kwargs)
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("başarısız koşu bildirilmeli")
+        finally:
+            PostSynapticCalciumDynamics.step = original
+        with open(os.path.join(tmp, "manifest.json")) as f:
+            runs = json.load(f)["runs"]
+        assert sorted(entry["status"] for entry in runs.values()) == ["done", "done", "done", "failed"]
+        crashed = next(entry for entry in runs.values() if entry["status"] == "failed")
+        # Son checkpoint: ön koşudan 100 ms sonraki ilk kayıt adımı
+        assert int(load_checkpoint(os.path.join(tmp, crashed["path"], "checkpoint.npz"))["step"]) == 4411
+
+        # Yeniden çağrı: biten koşular önbellekten, çöken koşu checkpoint'ten sürer
+        results = run_pool(scenarios, tmp, processes=2, seed=4, checkpoint_every=100.0, **kwargs)
+        for label, expected in ref.items():
+            assert np.array_equal(results[label].time, expected.time)
+            for name in expected.traces:
+                assert np.array_equal(results[label][name], expected[name]), (label, name)
+
+    with isolated_caches():
+        # Koşu anahtarı başlangıç koşuluna ve model kaynak koduna bağlı
+        from simulation import cache
+        from simulation.sweep import run_key
+        synapse = TripartiteSynapse(**kwargs)
+        key = run_key(synapse, seed=4)
+        assert key != run_key(TripartiteSynapse(init="rest", **kwargs), seed=4)
+        original = cache.code_version()
+        cache._code_version = "eski model kodu"
+        try:
+            assert run_key(synapse, seed=4) != key
+        finally:
+            cache._code_version = original
+
+
+def test_result_cache_shares_runs():
+    import tempfile
+    kwargs = dict(T_total=200.0, current=22.0, stim_window=(50.0, 150.0), rec_step=10)
+    with tempfile.TemporaryDirectory() as tmp:
+        # İlk betik koşar, ikincisi farklı panelleri aynı koşudan okur
+        first = cached_run(TripartiteSynapse(record=("V_pre", "i_R"), **kwargs), seed=2, cache_dir=tmp)
+        synapse = TripartiteSynapse(record=("Ca_post", "CaMKII_P", "V_pre"), **kwargs)
+        second = cached_run(synapse, seed=2, cache_dir=tmp)
+        assert not first.stats["cached"] and second.stats["cached"]
+        assert set(second.traces) == {"Ca_post", "CaMKII_P", "V_pre"}
+        ref = TripartiteSynapse(record=("Ca_post", "CaMKII_P", "V_pre", "i_R"), **kwargs).run(seed=2)
+        assert np.array_equal(second.time, ref.time)
+        for name in ("Ca_post", "CaMKII_P", "V_pre"):
+            assert np.array_equal(second[name], ref[name]), name
+        assert np.array_equal(first["i_R"], ref["i_R"])
+
+        # Başka tohum ayrı girdi; sınır aşılınca en eski girdi silinir
+        cached_run(TripartiteSynapse(record=("V_pre",), **kwargs), seed=3, cache_dir=tmp, max_bytes=1)
+        assert len(os.listdir(tmp)) == 1
+        assert cached_run(synapse, seed=3, cache_dir=tmp).stats["cached"]
+        assert not cached_run(synapse, seed=2, cache_dir=tmp).stats["cached"]
+
+    # Sonuç ve dinlenme durumu önbellekleri tek kökün alt klasörleri
+    from simulation import cache, paths
+    assert os.path.dirname(cache.CACHE_DIR) == os.path.dirname(steady_state.REST_CACHE_DIR) == paths.CACHE_ROOT
+
+    with isolated_caches():
+        # Başlangıç koşulu anahtarın parçası: init ve set_state() ile verilen durum
+        keys = {cache_key(TripartiteSynapse(init=init, **kwargs), seed=2) for init in ("default", "rest")}
+        assert len(keys) == 2
+        assert config_key(TripartiteSynapse(init="rest", **kwargs)) != config_key(TripartiteSynapse(**kwargs))
+        moved = TripartiteSynapse(**kwargs)
+        y = moved.get_state()
+        y[state.index("camkii.P1")] = 0.2
+        moved.set_state(y)
+        assert cache_key(moved, seed=2) != cache_key(TripartiteSynapse(**kwargs), seed=2)
+
+
+def test_figures_render_from_stored_runs():
+    import tempfile
+    from simulation import render
+    from simulation.render import FigureSpec, RenderPool
+    scenarios = [{"label": "zayif", "current": 6.0}, {"label": "guclu", "current": 22.0}]
+    kwargs = dict(T_total=200.0, stim_window=(50.0, 150.0), record=("V_pre", "alpha"), rec_step=10)
+
+    def specs(label):
+        return [FigureSpec(f"{label}/V_pre.png", ["V_pre"], "V_pre (mV)", label),
+                FigureSpec(f"{label}/alpha.png", [("alpha", {"color": "k"})], "Alpha", label,
+                           flat=(0.3001, (0.2999, 0.3020)), figsize=(8, 5))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out, done = os.path.join(tmp, "png"), []
+        # Biten her koşu, diğerleri sürerken çizime gönderilir
+        with RenderPool(2) as renderer:
+            def on_result(label, store):
+                done.append(label)
+                renderer.submit(store, specs(label), out)
+            run_pool(scenarios, os.path.join(tmp, "runs"), processes=1, seed=0,
+                     on_result=on_result, **kwargs)
+            files = renderer.wait()
+        assert sorted(done) == ["guclu", "zayif"]
+        assert sorted(os.path.relpath(f, out) for f in files) == \
+            ["guclu/V_pre.png", "guclu/alpha.png", "zayif/V_pre.png", "zayif/alpha.png"]
+        for f in files:
+            with open(f, "rb") as fh:
+                assert fh.read(8) == b"\x89PNG\r\n\x1a\n"
+
+        # Önbellekteki koşular hemen bildirilir; aynı boyuttaki figür yeniden kullanılır
+        done.clear()
+        with RenderPool(1) as renderer:
+            results = run_pool(scenarios, os.path.join(tmp, "runs"), processes=1, seed=0,
+                               on_result=lambda label, store: (done.append(label),
+                                                               renderer.submit(store, specs(label), out)),
+                               **kwargs)
+        assert sorted(done) == ["guclu", "zayif"]
+        assert sorted(render._FIGURES) == [(8, 5), (10, 4)]
+        fig, ax = render._FIGURES[(10, 4)]
+        assert len(ax.lines) == 1
+        assert np.array_equal(ax.lines[0].get_ydata(), results["guclu"]["V_pre"])   # son çizilen
+
+        try:
+            with RenderPool(1) as renderer:
+                renderer.submit(os.path.join(tmp, "runs", "yok"), specs("yok"), out)
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("eksik depo bildirilmeli")
+
+
+if __name__ == "__main__":
+    test_simulator_matches_hand_coupled_loop()
+    test_param_overrides_do_not_mutate_defaults()
+    test_packed_state_roundtrip()
+    test_model_derivatives_match_euler_step()
+    test_coupled_rhs_is_pure_and_vectorized()
+    test_ensemble_members_match_scalar_runs()
+    test_numba_backend_matches_python_backend()
+    test_multirate_tracks_single_rate()
+    test_adaptive_run_hits_drive_edges()
+    test_analytic_jacobian_matches_finite_differences()
+    test_rosenbrock_takes_large_steps_at_rest()
+    test_exponential_gates_keep_spike_shape_at_large_dt()
+    test_fast_forward_skips_quiescent_intervals()
+    test_rest_state_is_cached_fixed_point()
+    test_rate_tables_track_exact_rates()
+    test_camkii_chain_updates()
+    test_glutamate_sensor_exact_update()
+    test_compiled_stimulus_schedule()
+    test_ap_templates_replay_spikes()
+    test_ca_spike_kernel_matches_ode()
+    test_declarative_recorder_probes()
+    test_models_run_in_si_units()
+    test_streamed_recording_matches_memory()
+    test_checkpoint_resume_is_bit_identical()
+    test_sweep_forks_shared_prefix()
+    test_pool_sweep_caches_and_resumes()
+    test_result_cache_shares_runs()
+    test_figures_render_from_stored_runs()
+    print("✅ Simülatör testleri geçti.")